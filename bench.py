@@ -0,0 +1,218 @@
+# bench.py
+"""
+Offline microbenchmarks for the functions that run on every pair every cycle.
+
+    python bench.py            # run and print
+    python bench.py --save     # run and store the results as the new baseline
+    python bench.py --check    # run and exit 1 if any case regressed vs the baseline
+
+Payloads come from fixtures/ (recorded DEX Screener + Rugcheck shapes);
+10k batches are deterministic perturbations of those fixtures.
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from filters import score_market, score_market_batch
+from pair_snapshot import PairSnapshot
+from rugcheck import evaluate_rugcheck
+from trader import BAR_SEC, update_histories, get_trade_signal, use_clock
+from log_formatter import build_alert_log
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+RESULTS_FILE = Path("bench_results.json")
+REGRESSION_TOLERANCE = 0.20   # ops/sec may drop (or bytes/op grow) by 20% before --check fails
+BATCH_SIZE = 10_000
+MIN_RUN_SEC = 0.1             # per repeat
+REPEATS = 5                   # best-of, to shrug off scheduler noise
+NOW_MS = 1_760_000_000_000    # fixtures' pairCreatedAt are relative to this
+
+
+# ---------- fixtures ----------
+def load_fixture(name: str):
+    with open(FIXTURES_DIR / name, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _jitter(obj, rng: random.Random):
+    """Scales every number by ±20% (numeric strings too), recursively."""
+    if isinstance(obj, dict):
+        return {k: (v if k in ("pairCreatedAt", "mint") else _jitter(v, rng)) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_jitter(v, rng) for v in obj]
+    if isinstance(obj, bool) or obj is None:
+        return obj
+    if isinstance(obj, (int, float)):
+        return type(obj)(obj * rng.uniform(0.8, 1.2))
+    if isinstance(obj, str):
+        try:
+            return str(float(obj) * rng.uniform(0.8, 1.2))
+        except ValueError:
+            return obj
+    return obj
+
+def expand(items: List[dict], n: int, seed: int = 7) -> List[dict]:
+    rng = random.Random(seed)
+    return [_jitter(items[i % len(items)], rng) for i in range(n)]
+
+def edge_pair() -> dict:
+    return {"pairAddress": "edge", "priceUsd": "0", "liquidity": None, "fdv": "n/a",
+            "txns": {"h1": {}, "h6": None}, "volume": {}, "priceChange": None, "pairCreatedAt": None}
+
+def parse(raw_pairs: List[dict]) -> List[PairSnapshot]:
+    return [PairSnapshot.from_api(p) for p in raw_pairs]
+
+def tracked_view(pair: PairSnapshot, report: dict, i: int = 0) -> PairSnapshot:
+    """A pair as build_alert_log sees it after scoring + tracking."""
+    view = pair.copy()
+    res = score_market(pair, now_ms=NOW_MS)
+    view.count = i % 6
+    view.market_label, view.market_score = res["label"], res["score"]
+    view.potential_multiple, view.market_checks = res["potential_multiple"], res["market"]
+    view.rug_status, view.rug_score, view.rug_reasons, view.rug_link = evaluate_rugcheck(report)
+    view.trade_signal = ("Entry", "Watching", "Exit", "No Signal")[i % 4]
+    view.trade_reasons = ["Buy/Sell ratio ≥ 2.0", "1h volume rising"] if i % 4 == 0 else []
+    return view
+
+def warm_meta(raw_pair: dict, bars: int = 72) -> dict:
+    meta, t0 = {}, datetime.utcnow() - timedelta(seconds=BAR_SEC * bars)
+    for i, p in enumerate(parse(expand([raw_pair], bars, seed=11))):
+        with use_clock(lambda: t0 + timedelta(seconds=BAR_SEC * i)):  # one bar per snapshot
+            update_histories(meta, p)
+    return meta
+
+
+# ---------- cases ----------
+def build_cases() -> List[Tuple[str, Callable[[], object], int]]:
+    """(name, zero-arg callable, pairs processed per call)."""
+    raw_pairs = load_fixture("dexscreener_pairs.json")
+    reports = load_fixture("rugcheck_reports.json")
+    big_raw = expand(raw_pairs, BATCH_SIZE)
+    big_pairs = parse(big_raw)
+    big_reports = expand(reports, BATCH_SIZE)
+    normal, edge = PairSnapshot.from_api(raw_pairs[0]), PairSnapshot.from_api(edge_pair())
+
+    views = [tracked_view(p, r, i) for i, (p, r) in enumerate(zip(parse(expand(raw_pairs, 20)), expand(reports, 20)))]
+    big_views = [tracked_view(p, r, i) for i, (p, r) in enumerate(zip(big_pairs, big_reports))]
+    edge_views = parse([{"pairAddress": "edge"}, {"baseToken": None, "liquidity": None, "rug_reasons": None}])
+
+    meta = warm_meta(raw_pairs[0])
+    edge_meta: dict = {}
+    big_metas = [(warm_meta(raw, bars=8), p) for raw, p in zip(big_raw, big_pairs)]
+
+    def trade_step(m, p):
+        update_histories(m, p)
+        return get_trade_signal(m)
+
+    return [
+        ("pair_snapshot/10k", lambda: parse(big_raw), BATCH_SIZE),
+        ("score_market/normal", lambda: score_market(normal), 1),
+        ("score_market/edge", lambda: score_market(edge), 1),
+        ("score_market/10k", lambda: [score_market(p) for p in big_pairs], BATCH_SIZE),
+        ("score_market_batch/10k", lambda: score_market_batch(big_pairs), BATCH_SIZE),
+        ("evaluate_rugcheck/normal", lambda: evaluate_rugcheck(reports[0]), 1),
+        ("evaluate_rugcheck/edge", lambda: evaluate_rugcheck(None), 1),
+        ("evaluate_rugcheck/10k", lambda: [evaluate_rugcheck(r) for r in big_reports], BATCH_SIZE),
+        ("trade_signal/normal", lambda: trade_step(meta, normal), 1),
+        ("trade_signal/edge", lambda: trade_step(edge_meta, edge), 1),
+        ("trade_signal/10k", lambda: [trade_step(m, p) for m, p in big_metas], BATCH_SIZE),
+        ("build_alert_log/normal", lambda: build_alert_log(views), len(views)),
+        ("build_alert_log/edge", lambda: build_alert_log(edge_views), len(edge_views)),
+        ("build_alert_log/10k", lambda: build_alert_log(big_views), BATCH_SIZE),
+    ]
+
+
+# ---------- measurement ----------
+def measure(fn: Callable[[], object], per_call: int,
+            min_time: float = MIN_RUN_SEC, repeats: int = REPEATS) -> Dict[str, float]:
+    fn()  # warm-up
+
+    best = 0.0
+    for _ in range(repeats):
+        calls, elapsed = 0, 0.0
+        t0 = time.perf_counter()
+        while elapsed < min_time:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - t0
+        best = max(best, calls * per_call / elapsed)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ops_per_sec": round(best, 1),
+        "peak_bytes_per_op": round(max(0, peak - base) / per_call, 1),
+    }
+
+def run(only: str = "") -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, fn, per_call in build_cases():
+        if only and only not in name:
+            continue
+        results[name] = measure(fn, per_call)
+        r = results[name]
+        print(f"⏱️ {name:<28} {r['ops_per_sec']:>14,.0f} ops/s | {r['peak_bytes_per_op']:>10,.0f} B/op")
+    return results
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b:
+            continue
+        if r["ops_per_sec"] < b["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {r['ops_per_sec']:,.0f} ops/s vs baseline {b['ops_per_sec']:,.0f}")
+        if b["peak_bytes_per_op"] and r["peak_bytes_per_op"] > b["peak_bytes_per_op"] * (1 + tolerance):
+            regressions.append(f"{name}: {r['peak_bytes_per_op']:,.0f} B/op vs baseline {b['peak_bytes_per_op']:,.0f}")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline microbenchmarks for the hot scoring/signal paths")
+    parser.add_argument("--save", action="store_true", help="store results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="exit 1 on regression vs the baseline")
+    parser.add_argument("--only", default="", help="run only cases whose name contains this")
+    parser.add_argument("--results", default=str(RESULTS_FILE), help="baseline file")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    results = run(args.only)
+    path = Path(args.results)
+
+    if args.check:
+        if not path.exists():
+            print(f"⚠️ No baseline at {path}; run with --save first")
+            return 1
+        with open(path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["cases"]
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"❌ {line}")
+        if regressions:
+            return 1
+        print("✅ No regressions")
+
+    if args.save:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "saved_at": datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cases": results,
+            }, f, indent=2)
+        print(f"💾 Baseline saved to {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
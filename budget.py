@@ -0,0 +1,172 @@
+# budget.py
+"""
+Per-cycle deadline and per-endpoint circuit breakers for the external APIs.
+
+http_client.http_get() and scan.py's async twin ask check() before every
+attempt. A request that would start after the cycle deadline, or against
+an endpoint whose breaker is open, raises Deferred at once instead of
+waiting out its timeout. The caller records what it skipped with defer(),
+and main.py / scheduler.py carry it into the next cycle.
+
+Breakers open after BREAKER_FAILURES consecutive failed attempts
+(connection errors, timeouts, 429/5xx). After BREAKER_OPEN_SEC one
+half-open probe is let through; success closes the breaker, failure
+re-opens it.
+
+The deadline and deferrals are per thread (one scheduler job = one
+thread); breakers are shared by the whole process.
+"""
+from contextlib import contextmanager
+from threading import Lock, local
+from typing import Dict, List, Optional, Tuple
+import os
+import time
+
+# ---- Configs you can tune ----
+CYCLE_BUDGET_SEC = float(os.getenv("CYCLE_BUDGET_SEC", "540"))   # main.py runs every 10 min
+MIN_REQUEST_SEC = 1.0          # don't start a request with less time left than this
+BREAKER_FAILURES = 5
+BREAKER_OPEN_SEC = 60
+
+
+class Deferred(Exception):
+    """Raised instead of making a request; reason is "deadline" or "circuit_open"."""
+
+    def __init__(self, reason: str, endpoint: str):
+        super().__init__(f"{reason}: {endpoint}")
+        self.reason = reason
+        self.endpoint = endpoint
+
+
+class CircuitBreaker:
+    """closed -> open after `failures` in a row -> half-open (one probe) -> closed | open."""
+
+    def __init__(self, name: str, failures: Optional[int] = None, open_sec: Optional[float] = None):
+        self.name = name
+        self.max_failures = BREAKER_FAILURES if failures is None else failures
+        self.open_sec = BREAKER_OPEN_SEC if open_sec is None else open_sec
+        self.state = "closed"
+        self.failures = 0
+        self.skipped = 0
+        self._opened_at = 0.0
+        self._probe_at: Optional[float] = None
+        self._lock = Lock()
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == "closed":
+                return True
+            # a probe that never reported back (e.g. an unexpected error) frees its slot after open_sec
+            probing = self._probe_at is not None and now - self._probe_at < self.open_sec
+            if now - self._opened_at >= self.open_sec and not probing:
+                self.state = "half_open"
+                self._probe_at = now
+                return True
+            self.skipped += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            if self.state != "closed":
+                print(f"🔌 {self.name}: circuit closed")
+            self.state = "closed"
+            self.failures = 0
+            self._probe_at = None
+
+    def failure(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.max_failures):
+                if self.state == "closed":
+                    print(f"🔌 {self.name}: circuit open after {self.failures} failures (probe in {self.open_sec:g}s)")
+                self.state = "open"
+                self._opened_at = now
+                self._probe_at = None
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = Lock()
+_CYCLE = local()   # .deadline (monotonic), .started, .deferred
+
+
+# ---------- breakers ----------
+def breaker_for(endpoint: str) -> CircuitBreaker:
+    with _BREAKERS_LOCK:
+        if endpoint not in _BREAKERS:
+            _BREAKERS[endpoint] = CircuitBreaker(endpoint)
+        return _BREAKERS[endpoint]
+
+def breaker_states() -> Dict[str, Dict[str, object]]:
+    """{endpoint: {"state", "failures", "skipped"}} for every breaker that has seen traffic."""
+    with _BREAKERS_LOCK:
+        return {name: {"state": b.state, "failures": b.failures, "skipped": b.skipped}
+                for name, b in _BREAKERS.items()}
+
+def reset_breakers():
+    with _BREAKERS_LOCK:
+        _BREAKERS.clear()
+
+
+# ---------- cycle deadline ----------
+@contextmanager
+def cycle(budget_sec: float = CYCLE_BUDGET_SEC):
+    """
+    Runs the block under a deadline `budget_sec` from now. Nested blocks
+    can only tighten it; deferrals are collected by the outermost block.
+    """
+    outer = getattr(_CYCLE, "deadline", None)
+    deadline = time.monotonic() + budget_sec
+    _CYCLE.deadline = deadline if outer is None else min(outer, deadline)
+    if outer is None:
+        _CYCLE.started = time.monotonic()
+        _CYCLE.deferred = {}
+    try:
+        yield
+    finally:
+        _CYCLE.deadline = outer
+
+def time_left() -> Optional[float]:
+    """Seconds until the current deadline; None outside cycle()."""
+    deadline = getattr(_CYCLE, "deadline", None)
+    return None if deadline is None else deadline - time.monotonic()
+
+def elapsed() -> float:
+    started = getattr(_CYCLE, "started", None)
+    return 0.0 if started is None else time.monotonic() - started
+
+def capped(delay: float) -> float:
+    """A backoff delay, cut to the time left (the next check() then defers)."""
+    left = time_left()
+    return delay if left is None else max(0.0, min(delay, left))
+
+def check(endpoint: str, timeout: float) -> float:
+    """
+    Raises Deferred if `endpoint` may not be called now; otherwise returns
+    the timeout to use (capped at the time left in the cycle). Callers
+    must report the attempt with breaker_for(endpoint).success()/failure().
+    """
+    left = time_left()
+    if left is not None and left < MIN_REQUEST_SEC:
+        raise Deferred("deadline", endpoint)
+    if not breaker_for(endpoint).allow():
+        raise Deferred("circuit_open", endpoint)
+    return timeout if left is None else min(timeout, left)
+
+
+# ---------- deferred work ----------
+def defer(kind: str, items, chain_id: str = ""):
+    """Records work skipped this cycle, e.g. defer("hydrate", tokens, "solana"). No-op outside cycle()."""
+    deferred = getattr(_CYCLE, "deferred", None)
+    if deferred is None or getattr(_CYCLE, "deadline", None) is None:
+        return
+    deferred.setdefault(kind, []).extend((chain_id, item) for item in items if item)
+
+def deferred() -> Dict[str, List[Tuple[str, str]]]:
+    """{kind: [(chain_id, item), ...]} deferred in the current (or last) cycle on this thread."""
+    return {kind: list(items) for kind, items in (getattr(_CYCLE, "deferred", None) or {}).items()}
+
+def deferred_summary() -> str:
+    counts = {kind: len(set(items)) for kind, items in deferred().items()}
+    return ", ".join(f"{kind} {n}" for kind, n in sorted(counts.items())) or "nothing"
@@ -0,0 +1,154 @@
+# cache.py
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Tuple
+import json
+import os
+import time
+
+
+class TTLCache:
+    """
+    In-memory cache with a per-cache TTL and LRU eviction once `maxsize`
+    entries are held. Counts hits/misses so the TTL can be tuned.
+    """
+
+    def __init__(self, ttl_sec: float, maxsize: int = 1024):
+        self.ttl_sec = ttl_sec
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_sec, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class PersistentTTLCache:
+    """
+    JSON-file backed cache with per-entry TTLs that survives restarts.
+    Expired entries are still returned (flagged not fresh) for up to
+    `stale_ttl_sec` past expiry, so callers can serve them while they
+    revalidate. Least recently used entries are evicted past `maxsize`.
+    """
+
+    def __init__(self, path, maxsize: int = 5000, stale_ttl_sec: float = 6 * 3600):
+        self.path = Path(path)
+        self.maxsize = maxsize
+        self.stale_ttl_sec = stale_ttl_sec
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, dict]" = OrderedDict()
+        self._loaded = False
+        self._dirty = False
+        self._lock = Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Failed to load {self.path}: {e}")
+            return
+        for key, entry in sorted(raw.items(), key=lambda kv: kv[1].get("used_at", 0)):
+            self._data[key] = entry
+
+    def get(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Returns (value, is_fresh); (None, False) on a miss."""
+        now = time.time()
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._data.get(key)
+            if entry is None or now > entry["expires_at"] + self.stale_ttl_sec:
+                if entry is not None:
+                    del self._data[key]
+                    self._dirty = True
+                self.misses += 1
+                return None, False
+            entry["used_at"] = now
+            self._data.move_to_end(key)
+            fresh = now <= entry["expires_at"]
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return entry["value"], fresh
+
+    def put(self, key: str, value: Any, ttl_sec: float):
+        now = time.time()
+        with self._lock:
+            self._ensure_loaded()
+            self._data[key] = {"value": value, "expires_at": now + ttl_sec, "used_at": now}
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        """Atomically rewrites the cache file if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._data, f, separators=(",", ":"))
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except Exception as e:
+                print(f"⚠️ Failed to save {self.path}: {e}")
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
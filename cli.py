@@ -0,0 +1,105 @@
+# cli.py
+"""
+Single entry point:
+
+    python cli.py scan-once [--serial] [--profile cprofile|tracemalloc] [--budget SEC]
+    python cli.py scan-once --offline          # fixtures/ instead of the network
+    python cli.py scan-once --dry-run          # live data, alerts printed, nothing kept
+    python cli.py daemon [--dry-run | --offline]
+    python cli.py replay ...                   # replay.py's options
+    python cli.py bench ...                    # bench.py's options
+    python cli.py onchain ...                  # onchain.py's options (listen/stub/replay/record)
+
+Only argparse is imported up front; each command imports what it needs
+(aiohttp, requests, numpy and python-telegram-bot are loaded on first use),
+so `--help` and cron-style one-shot runs start quickly.
+
+--dry-run runs in a scratch working directory: the state DB, Rugcheck
+cache, metrics and snapshots go there and are deleted on exit, and
+Telegram messages are printed instead of sent. --offline implies it.
+"""
+from contextlib import contextmanager
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+
+# subcommands that hand their arguments to another module's main(argv)
+PASSTHROUGH = {
+    "replay": ("replay", "replay recorded snapshots through the signal engine"),
+    "bench": ("bench", "offline microbenchmarks for the scoring/signal paths"),
+    "onchain": ("onchain", "Solana new-pool listener, replay stub and recorder"),
+}
+
+
+@contextmanager
+def _sandbox(dry_run: bool, offline: bool):
+    if not (dry_run or offline):
+        yield
+        return
+
+    import telegram_bot
+    telegram_bot.DRY_RUN = True
+    if offline:
+        from http_client import set_transport
+        from offline import FixtureTransport
+        set_transport(FixtureTransport())
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="solana_bot_dry_run_") as scratch:
+        os.chdir(scratch)
+        print(f"🧪 {'Offline' if offline else 'Dry'} run: alerts are printed, state goes to a scratch dir")
+        try:
+            yield
+        finally:
+            os.chdir(cwd)
+            if offline:
+                set_transport(None)
+
+def scan_once(args) -> int:
+    with _sandbox(args.dry_run, args.offline):
+        import main
+        budget = {} if args.budget is None else {"budget_sec": args.budget}
+        main.main(concurrent=not args.serial, profile=args.profile, **budget)
+    return 0
+
+def daemon(args) -> int:
+    with _sandbox(args.dry_run, args.offline):
+        import scheduler
+        scheduler.start()
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Solana token scanner")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    def with_modes(p):
+        p.add_argument("--dry-run", action="store_true", help="print alerts and keep no state")
+        p.add_argument("--offline", action="store_true", help="serve requests from fixtures/ (implies --dry-run)")
+        return p
+
+    once = with_modes(commands.add_parser("scan-once", help="run one scan cycle and exit"))
+    once.add_argument("--serial", action="store_true", help="use the serial (requests) path")
+    once.add_argument("--profile", choices=("cprofile", "tracemalloc"), help="capture a profile of the cycle")
+    once.add_argument("--budget", type=float, metavar="SEC", help="cycle deadline (default: budget.CYCLE_BUDGET_SEC)")
+    once.set_defaults(handler=scan_once)
+
+    with_modes(commands.add_parser("daemon", help="run the tiered scheduler")).set_defaults(handler=daemon)
+
+    for name, (_, help_text) in PASSTHROUGH.items():
+        commands.add_parser(name, help=help_text, add_help=False)
+    return parser
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in PASSTHROUGH:
+        module = importlib.import_module(PASSTHROUGH[argv[0]][0])
+        return module.main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
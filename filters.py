@@ -1,11 +1,48 @@
-from dataclasses import dataclass, asdict
-from typing import Dict, Any, List, Tuple
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+import math
 import time
 
+import numpy as np
+
+from pair_snapshot import PairSnapshot
+from rules import RULES_FILE, RuleLoader, RuleSet
+
 # ---- Configs you can tune ----
 EARLY_HOURS = 72
 LIQ_CAP_USD = 5_000_000.0
 
+# Structural bands per age category (also used by the cheap prefilter)
+EARLY_LIQ_BAND = (30_000, 300_000)
+EARLY_FDV_MAX = 1_500_000
+OLD_LIQ_MIN = 100_000
+OLD_FDV_MAX = 10_000_000
+
+# Market-quality bands per age category
+EARLY_LIQ_FDV_MIN = 0.15
+OLD_LIQ_FDV_BAND = (0.05, 0.50)
+EARLY_TURNOVER_MIN = 2.0        # 24h volume / FDV
+OLD_TURNOVER_MIN = 0.5
+EARLY_VOL_MIN = {"h1": 100_000, "h6": 500_000, "h24": 1_000_000}
+OLD_VOL_MIN = {"h1": 50_000, "h6": 300_000, "h24": 500_000}
+EARLY_BS_BAND = (0.9, 1.2)      # buy/sell ratio, h1 and h6
+OLD_BS_BAND = (0.8, 1.25)
+EARLY_MOMENTUM_MAX = {"m5": 25, "h1": 60, "h24": 400}
+OLD_H24_BAND = (-30, 150)
+
+# liq/FDV sweet spot (small market-score bonus)
+EARLY_SWEET_LIQ_FDV = (0.12, 0.35)
+OLD_SWEET_LIQ_FDV = (0.08, 0.30)
+
+# Labels need at least this much upside (see score_market)
+MIN_PASS_MULTIPLE = 10
+X100_MIN_MULTIPLE = 100
+X100_MIN_SCORE = 75
+X10_MIN_SCORE = 60
+
+# A reject that liquidity or FDV this % away would pass is a near miss (scan.py caches it briefly)
+NEAR_MISS_PCT = 10
+
 TARGET_PEAK_CAP = {
     "early": 200_000_000.0,
     "old":   50_000_000.0,
@@ -17,140 +54,139 @@ WEIGHTS = {
     "structure": 20,
 }
 
+# What a profile carries: the constants above (read when a profile is built, so sweep overrides apply)
+PROFILE_NAMES = (
+    "EARLY_HOURS", "LIQ_CAP_USD",
+    "EARLY_LIQ_BAND", "EARLY_FDV_MAX", "OLD_LIQ_MIN", "OLD_FDV_MAX",
+    "EARLY_LIQ_FDV_MIN", "OLD_LIQ_FDV_BAND", "EARLY_TURNOVER_MIN", "OLD_TURNOVER_MIN",
+    "EARLY_VOL_MIN", "OLD_VOL_MIN", "EARLY_BS_BAND", "OLD_BS_BAND",
+    "EARLY_MOMENTUM_MAX", "OLD_H24_BAND", "EARLY_SWEET_LIQ_FDV", "OLD_SWEET_LIQ_FDV",
+    "MIN_PASS_MULTIPLE", "X100_MIN_MULTIPLE", "X100_MIN_SCORE", "X10_MIN_SCORE",
+    "NEAR_MISS_PCT", "TARGET_PEAK_CAP", "WEIGHTS",
+)
+
+# Per-chain overrides of the constants above; unlisted chains use them as-is.
+# EVM launches are bigger and peak lower than Solana memecoins.
+CHAIN_PROFILES: Dict[str, Dict[str, Any]] = {
+    "solana": {},
+    "base": {
+        "TARGET_PEAK_CAP": {"early": 100_000_000.0, "old": 50_000_000.0},
+        "EARLY_LIQ_BAND": (50_000, 500_000),
+        "EARLY_FDV_MAX": 3_000_000,
+    },
+    "bsc": {
+        "TARGET_PEAK_CAP": {"early": 100_000_000.0, "old": 30_000_000.0},
+        "EARLY_LIQ_BAND": (50_000, 500_000),
+        "EARLY_FDV_MAX": 3_000_000,
+        "OLD_LIQ_MIN": 150_000,
+    },
+}
+
+def chain_profile(chain_id: str = "solana", **overrides) -> Dict[str, Any]:
+    """
+    The constants scoring reads for `chain_id`: PROFILE_NAMES with
+    CHAIN_PROFILES[chain_id] and then `overrides` applied. Pass it to
+    score_market / prefilter_market / score_market_batch (default: Solana).
+    """
+    g = globals()
+    profile = {name: g[name] for name in PROFILE_NAMES}
+    profile.update(CHAIN_PROFILES.get(chain_id) or {})
+    profile.update(overrides)
+    return profile
+
+_DEFAULT_PROFILE: Optional[Dict[str, Any]] = None
+
+def _default_profile() -> Dict[str, Any]:
+    """chain_profile() for calls that pass none, built once until invalidate_profiles()."""
+    global _DEFAULT_PROFILE
+    if _DEFAULT_PROFILE is None:
+        _DEFAULT_PROFILE = chain_profile()
+    return _DEFAULT_PROFILE
+
+def invalidate_profiles():
+    """Call after changing the constants above or CHAIN_PROFILES (sweep.overrides does)."""
+    global _DEFAULT_PROFILE
+    _DEFAULT_PROFILE = None
+
 # ---------- helpers ----------
-def _f(x, default=0.0) -> float:
-    try:
-        return float(x)
-    except Exception:
-        return float(default)
-
-def _ratio(buys, sells) -> float:
-    b = _f(buys, 0)
-    s = _f(sells, 0)
-    return b / (s if s > 0 else 1.0)
-
-def classify_age(created_ms: int, early_hours: int = EARLY_HOURS) -> str:
+def _usd(x: float) -> str:
+    """1_500_000 -> '1.5M', 100_000 -> '100k' (for reason strings)."""
+    return f"{x / 1e6:g}M" if x >= 1e6 else f"{x / 1e3:g}k"
+
+def _ratio(buys: float, sells: float) -> float:
+    return buys / (sells if sells > 0 else 1.0)
+
+def classify_age(created_ms: int, early_hours: int = EARLY_HOURS,
+                 now_ms: Optional[float] = None) -> str:
     if not created_ms:
         return "old"
-    age_h = max(0.0, (time.time() * 1000 - created_ms) / 3_600_000.0)
+    now_ms = time.time() * 1000 if now_ms is None else now_ms
+    age_h = max(0.0, (now_ms - created_ms) / 3_600_000.0)
     return "early" if age_h <= early_hours else "old"
 
 @dataclass
 class MarketChecks:
     category: str                     # "early" or "old"
-    liq_ok: bool
-    fdv_ok: bool
-    liq_fdv_ok: bool
-    turnover_ok: bool
-    vol1h_ok: bool
-    vol6h_ok: bool
-    vol24h_ok: bool
-    bs_h1_ok: bool
-    bs_h6_ok: bool
-    momentum_ok: bool
-    within_liq_cap_ok: bool
+    flags: Dict[str, bool]            # reported rule name -> passed (market_rules.json)
     reasons: List[str]
 
-def evaluate_market(pair: Dict[str, Any],
-                    liq_cap_usd: float = LIQ_CAP_USD) -> MarketChecks:
-    # safe pulls
-    v  = pair.get("volume") or {}
-    tx = pair.get("txns") or {}
-    pc = pair.get("priceChange") or {}
-    liq = _f((pair.get("liquidity") or {}).get("usd"), 0)
-    fdv = _f(pair.get("fdv", pair.get("marketCap", 0)), 0)  # prefer fdv; fallback marketCap
-    created_ms = int(pair.get("pairCreatedAt", 0) or 0)
-    cat = classify_age(created_ms)
-
-    v1h  = _f(v.get("h1"), 0)
-    v6h  = _f(v.get("h6"), 0)
-    v24h = _f(v.get("h24"), 0)
-
-    h1 = tx.get("h1") or {}
-    h6 = tx.get("h6") or {}
-
-    r_h1 = _ratio(h1.get("buys", 0), h1.get("sells", 0))
-    r_h6 = _ratio(h6.get("buys", 0), h6.get("sells", 0))
-
-    m5   = _f(pc.get("m5"), 0)
-    h1c  = _f(pc.get("h1"), 0)
-    h24c = _f(pc.get("h24"), 0)
-
-    reasons: List[str] = []
-    within_liq_cap_ok = (liq <= liq_cap_usd) if liq_cap_usd > 0 else True
-    if not within_liq_cap_ok:
-        reasons.append(f"Liquidity {liq:,.0f} exceeds cap {liq_cap_usd:,.0f}")
-
-    liq_fdv = (liq / fdv) if fdv > 0 else 0.0
-    turnover24 = (v24h / fdv) if fdv > 0 else 0.0
-
-    if cat == "early":
-        liq_ok      = 30_000 <= liq <= 300_000
-        fdv_ok      = fdv <= 1_500_000
-        liq_fdv_ok  = liq_fdv >= 0.15
-        turnover_ok = turnover24 >= 2.0
-        vol1h_ok    = v1h  >= 100_000
-        vol6h_ok    = v6h  >= 500_000
-        vol24h_ok   = v24h >= 1_000_000
-        bs_h1_ok    = 0.9 <= r_h1 <= 1.2
-        bs_h6_ok    = 0.9 <= r_h6 <= 1.2
-        momentum_ok = (m5 <= 25) and (h1c <= 60) and (h24c <= 400)
-
-        if not liq_ok:      reasons.append(f"[early] liquidity {liq:,.0f} not in 30k–300k")
-        if not fdv_ok:      reasons.append(f"[early] FDV {fdv:,.0f} > 1.5M")
-        if not liq_fdv_ok:  reasons.append(f"[early] liq/FDV {liq_fdv:.3f} < 0.15")
-        if not turnover_ok: reasons.append(f"[early] 24h turnover {turnover24:.2f} < 2.0")
-        if not vol1h_ok:    reasons.append(f"[early] 1h vol {v1h:,.0f} < 100k")
-        if not vol6h_ok:    reasons.append(f"[early] 6h vol {v6h:,.0f} < 500k")
-        if not vol24h_ok:   reasons.append(f"[early] 24h vol {v24h:,.0f} < 1M")
-        if not bs_h1_ok:    reasons.append(f"[early] h1 buy/sell {r_h1:.2f} not in [0.9,1.2]")
-        if not bs_h6_ok:    reasons.append(f"[early] h6 buy/sell {r_h6:.2f} not in [0.9,1.2]")
-        if not momentum_ok: reasons.append(f"[early] momentum guards tripped m5/h1/h24")
-    else:
-        liq_ok      = 100_000 <= liq <= liq_cap_usd
-        fdv_ok      = fdv <= 10_000_000
-        liq_fdv_ok  = 0.05 <= liq_fdv <= 0.50
-        turnover_ok = turnover24 >= 0.5
-        vol1h_ok    = v1h  >= 50_000
-        vol6h_ok    = v6h  >= 300_000
-        vol24h_ok   = v24h >= 500_000
-        bs_h1_ok    = 0.8 <= r_h1 <= 1.25
-        bs_h6_ok    = 0.8 <= r_h6 <= 1.25
-        momentum_ok = (-30 <= h24c <= 150)
-
-        if not liq_ok:      reasons.append(f"[old] liquidity {liq:,.0f} not in 100k–{liq_cap_usd:,.0f}")
-        if not fdv_ok:      reasons.append(f"[old] FDV {fdv:,.0f} > 10M")
-        if not liq_fdv_ok:  reasons.append(f"[old] liq/FDV {liq_fdv:.3f} not in [0.05,0.50]")
-        if not turnover_ok: reasons.append(f"[old] 24h turnover {turnover24:.2f} < 0.5")
-        if not vol1h_ok:    reasons.append(f"[old] 1h vol {v1h:,.0f} < 50k")
-        if not vol6h_ok:    reasons.append(f"[old] 6h vol {v6h:,.0f} < 300k")
-        if not vol24h_ok:   reasons.append(f"[old] 24h vol {v24h:,.0f} < 500k")
-        if not bs_h1_ok:    reasons.append(f"[old] h1 buy/sell {r_h1:.2f} not in [0.8,1.25]")
-        if not bs_h6_ok:    reasons.append(f"[old] h6 buy/sell {r_h6:.2f} not in [0.8,1.25]")
-        if not momentum_ok: reasons.append(f"[old] h24 change {h24c:.2f}% not in [-30,150]")
+    def as_dict(self) -> Dict[str, Any]:
+        return {"category": self.category, **self.flags, "reasons": self.reasons}
+
+# Numeric fields the market checks read, in column order for the batch scorer
+MARKET_FIELDS = ("liq", "fdv", "created_ms", "v1h", "v6h", "v24h", "r_h1", "r_h6", "m5", "h1c", "h24c")
+# ... plus the derived ratios; these are the names a rules file can test
+RULE_FIELDS = MARKET_FIELDS + ("liq_fdv", "turnover24")
+
+def _market_fields(pair: PairSnapshot) -> Tuple[float, ...]:
+    """MARKET_FIELDS of a parsed pair."""
+    return (
+        pair.liq, pair.fdv, pair.created_ms, pair.v1h, pair.v6h, pair.v24h,
+        _ratio(pair.buys_h1, pair.sells_h1), _ratio(pair.buys_h6, pair.sells_h6),
+        pair.m5, pair.h1c, pair.h24c or 0.0,
+    )
+
+def _liq_limit(liq_cap_usd: float) -> float:
+    return liq_cap_usd if liq_cap_usd > 0 else math.inf
 
+def _with_ratios(fields: Tuple[float, ...]) -> Tuple[float, ...]:
+    """MARKET_FIELDS values -> RULE_FIELDS values."""
+    fdv = fields[1]
+    liq_fdv = (fields[0] / fdv) if fdv > 0 else 0.0
+    turnover24 = (fields[5] / fdv) if fdv > 0 else 0.0
+    return fields + (liq_fdv, turnover24)
+
+def _rule_inputs(pair: PairSnapshot, now_ms: Optional[float], profile) -> Tuple[bool, Tuple[float, ...]]:
+    """(early?, RULE_FIELDS values) for one pair."""
+    fields = _market_fields(pair)
+    return classify_age(fields[2], profile["EARLY_HOURS"], now_ms) == "early", _with_ratios(fields)
+
+def _checks(rules: RuleSet, profile, flags, early: bool, liq_cap_usd: float, values) -> MarketChecks:
+    reasons = rules.reasons(profile, flags, early, liq_cap_usd, _liq_limit(liq_cap_usd), *values)
     return MarketChecks(
-        category=cat,
-        liq_ok=liq_ok,
-        fdv_ok=fdv_ok,
-        liq_fdv_ok=liq_fdv_ok,
-        turnover_ok=turnover_ok,
-        vol1h_ok=vol1h_ok,
-        vol6h_ok=vol6h_ok,
-        vol24h_ok=vol24h_ok,
-        bs_h1_ok=bs_h1_ok,
-        bs_h6_ok=bs_h6_ok,
-        momentum_ok=momentum_ok,
-        within_liq_cap_ok=within_liq_cap_ok,
-        reasons=reasons
+        category="early" if early else "old",
+        flags={rules.names[i]: bool(flags[i]) for i in rules.reported},
+        reasons=reasons,
     )
 
-def _upside_capacity(fdv: float, category: str) -> Tuple[float, float]:
+def evaluate_market(pair: PairSnapshot,
+                    liq_cap_usd: Optional[float] = None,
+                    now_ms: Optional[float] = None,
+                    profile: Optional[Dict[str, Any]] = None) -> MarketChecks:
+    profile = profile or _default_profile()
+    liq_cap_usd = profile["LIQ_CAP_USD"] if liq_cap_usd is None else liq_cap_usd
+    rules = active_rules()
+    early, values = _rule_inputs(pair, now_ms, profile)
+    flags, _, _ = rules.scalar(profile, early, liq_cap_usd, _liq_limit(liq_cap_usd), 0.0, *values)
+    rules.record(flags)
+    return _checks(rules, profile, flags, early, liq_cap_usd, values)
+
+def _upside_capacity(fdv: float, category: str, profile: Dict[str, Any]) -> Tuple[float, float]:
     """
     Returns (potential_multiple, capped_score_component_0..1).
     Map multiples to a 0..1 score: 0 at 1x, 0.5 at 10x, 1 at 100x+.
     """
-    cap = max(1.0, TARGET_PEAK_CAP.get(category, 50_000_000.0))
+    cap = max(1.0, profile["TARGET_PEAK_CAP"].get(category, 50_000_000.0))
     fdv = max(1.0, fdv)
     pot = cap / fdv
     if pot <= 1:
@@ -163,54 +199,209 @@ def _upside_capacity(fdv: float, category: str) -> Tuple[float, float]:
         s = 0.5 * (pot - 1) / 9.0
     return pot, s
 
-def score_market(pair: Dict[str, Any]) -> Dict[str, Any]:
-    m = evaluate_market(pair, liq_cap_usd=LIQ_CAP_USD)
-
-    liq = _f((pair.get("liquidity") or {}).get("usd"), 0)
-    fdv = _f(pair.get("fdv", pair.get("marketCap", 0)), 0)
-
-    # --- Upside score
-    pot_mult, pot_score = _upside_capacity(fdv, m.category)
-    upside_points = WEIGHTS["upside"] * pot_score
-
-    # --- Structure score (caps & bands)
-    structure_passes = sum([
-        1 if m.within_liq_cap_ok else 0,
-        1 if m.liq_ok else 0,
-        1 if m.fdv_ok else 0,
-    ])
-    structure_points = WEIGHTS["structure"] * (structure_passes / 3.0)
-
-    # --- Market quality score
-    sub_flags = [
-        m.liq_fdv_ok, m.turnover_ok, m.vol1h_ok, m.vol6h_ok, m.vol24h_ok,
-        m.bs_h1_ok, m.bs_h6_ok, m.momentum_ok
-    ]
-
-    # tiny bonus if liq/fdv sits in a sweet spot
-    liq_fdv = (liq / fdv) if fdv > 0 else 0.0
-    sweet = (0.12 <= liq_fdv <= 0.35) if m.category == "early" else (0.08 <= liq_fdv <= 0.30)
-    sub_passes = sum(1 for x in sub_flags if x)
-    market_points = WEIGHTS["market"] * ((sub_passes + (0.5 if sweet else 0)) / (len(sub_flags) + 0.5))
-
-    total = round(upside_points + structure_points + market_points, 2)
-
-    # Labeling
-    base_ok = all([
-        m.within_liq_cap_ok, m.liq_ok, m.fdv_ok,
-        m.turnover_ok, m.vol24h_ok, m.momentum_ok
-    ])
-
-    if base_ok and pot_mult >= 100 and total >= 75:
-        label = "x100-candidate"
-    elif base_ok and pot_mult >= 10 and total >= 60:
-        label = "x10-ready"
-    else:
-        label = "reject"
+def score_market(pair: PairSnapshot, now_ms: Optional[float] = None,
+                 profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Label + 0..100 score from the active market rules: upside (potential
+    multiple) plus each rule group's weighted share of passing checks.
+    """
+    profile = profile or _default_profile()
+    liq_cap = profile["LIQ_CAP_USD"]
+    rules = active_rules()
+    early, values = _rule_inputs(pair, now_ms, profile)
+    pot_mult, pot_score = _upside_capacity(values[1], "early" if early else "old", profile)
+
+    flags, total, base_ok = rules.scalar(profile, early, liq_cap, _liq_limit(liq_cap), pot_score, *values)
+    rules.record(flags)
+    total = round(total, 2)
 
     return {
-        "label": label,
+        "label": rules.label(profile, base_ok, pot_mult, total),
         "score": total,
         "potential_multiple": round(pot_mult, 1),
-        "market": asdict(m),
+        "market": _checks(rules, profile, flags, early, liq_cap, values).as_dict(),
     }
+
+def near_miss(pair: PairSnapshot, tolerance: Optional[float] = None,
+              now_ms: Optional[float] = None, profile: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    True if a rejected pair would get a passing label with its liquidity or
+    FDV `tolerance` (default NEAR_MISS_PCT) higher or lower (e.g. FDV just
+    over the band). Does not count towards rule_stats().
+    """
+    profile = profile or _default_profile()
+    tolerance = profile["NEAR_MISS_PCT"] / 100.0 if tolerance is None else tolerance
+    liq_cap = profile["LIQ_CAP_USD"]
+    rules = active_rules()
+    early, values = _rule_inputs(pair, now_ms, profile)
+    fields = list(values[:len(MARKET_FIELDS)])
+    for i in (0, 1):  # liq, fdv
+        for factor in (1.0 - tolerance, 1.0 + tolerance):
+            nudged = list(fields)
+            nudged[i] *= factor
+            nudged = _with_ratios(tuple(nudged))
+            pot_mult, pot_score = _upside_capacity(nudged[1], "early" if early else "old", profile)
+            _, total, base_ok = rules.scalar(profile, early, liq_cap, _liq_limit(liq_cap), pot_score, *nudged)
+            if rules.label(profile, base_ok, pot_mult, round(total, 2)) in PASS_LABELS:
+                return True
+    return False
+
+def prefilter_market(pair: PairSnapshot, liq_cap_usd: Optional[float] = None,
+                     now_ms: Optional[float] = None, profile: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Cheap, lossless pre-check on liquidity/FDV/age only.
+    Returns False only for pairs score_market() would label "reject"
+    (they fail a gate rule that reads only liq/FDV, or have too little
+    upside for any label).
+    """
+    profile = profile or _default_profile()
+    liq_cap_usd = profile["LIQ_CAP_USD"] if liq_cap_usd is None else liq_cap_usd
+    liq, fdv = pair.liq, pair.fdv
+    cat = classify_age(pair.created_ms, profile["EARLY_HOURS"], now_ms)
+
+    rules = active_rules()
+    if not rules.prefilter(profile, cat == "early", liq_cap_usd, _liq_limit(liq_cap_usd), liq, fdv):
+        return False
+    return _upside_capacity(fdv, cat, profile)[0] >= rules.min_multiple(profile)
+
+
+# ---------- vectorized batch scoring ----------
+PASS_LABELS = ("x10-ready", "x100-candidate")
+
+@dataclass
+class BatchScores:
+    """
+    Column results of score_market_batch(). Labels and scores are computed
+    for every pair; reason strings only when result(i) is asked for.
+    result(i) == score_market(pairs[i], now_ms) for the same now_ms.
+    """
+    pairs: List[PairSnapshot]
+    columns: Any                 # (n, len(MARKET_FIELDS)) float64
+    early: Any                   # bool per pair
+    flags: Dict[str, Any]        # reported rule name -> bool column
+    liq_fdv: Any
+    turnover24: Any
+    potential: Any               # raw potential multiple
+    scores: List[float]          # rounded exactly like score_market
+    labels: List[str]
+    liq_cap_usd: float
+    rules: Any = None            # the RuleSet that scored the batch
+    rule_flags: Any = None       # every rule's bool column, rule order
+    profile: Any = None          # the chain_profile() it was scored with
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def indices(self, labels=PASS_LABELS) -> List[int]:
+        return [i for i, label in enumerate(self.labels) if label in labels]
+
+    def result(self, i: int) -> Dict[str, Any]:
+        early = bool(self.early[i])
+        values = tuple(self.columns[i].tolist()) + (float(self.liq_fdv[i]), float(self.turnover24[i]))
+        flags = tuple(bool(col[i]) for col in self.rule_flags)
+        return {
+            "label": self.labels[i],
+            "score": self.scores[i],
+            "potential_multiple": round(float(self.potential[i]), 1),
+            "market": _checks(self.rules, self.profile, flags, early, self.liq_cap_usd, values).as_dict(),
+        }
+
+def market_columns(pairs: List[PairSnapshot]) -> np.ndarray:
+    """(n, len(MARKET_FIELDS)) float64 matrix of _market_fields() per pair."""
+    return np.array([_market_fields(p) for p in pairs], dtype=np.float64).reshape(-1, len(MARKET_FIELDS))
+
+def score_columns(cols: np.ndarray, now_ms, liq_cap_usd: Optional[float] = None,
+                  exact: bool = True, profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    The column-wise core of score_market_batch(). now_ms may be a scalar or
+    one timestamp per row. exact=False rounds scores with numpy (faster;
+    may differ from round() on exact .xx5 ties), for parameter sweeps.
+    """
+    profile = profile or _default_profile()
+    liq_cap_usd = profile["LIQ_CAP_USD"] if liq_cap_usd is None else liq_cap_usd
+    rules = active_rules()
+    liq, fdv, created, v1h, v6h, v24h, r_h1, r_h6, m5, h1c, h24c = cols.T
+
+    age_h = np.maximum(0.0, (now_ms - created) / 3_600_000.0)
+    early = (created != 0) & (age_h <= profile["EARLY_HOURS"])
+
+    pos = fdv > 0
+    safe_fdv = np.where(pos, fdv, 1.0)
+    liq_fdv = np.where(pos, liq / safe_fdv, 0.0)
+    turnover24 = np.where(pos, v24h / safe_fdv, 0.0)
+
+    # --- Upside score (same piecewise curve as _upside_capacity)
+    peak_cap = profile["TARGET_PEAK_CAP"]
+    cap = np.where(early,
+                   max(1.0, peak_cap.get("early", 50_000_000.0)),
+                   max(1.0, peak_cap.get("old", 50_000_000.0)))
+    pot = cap / np.maximum(1.0, fdv)
+    pot_score = np.select(
+        [pot <= 1, pot >= 100, pot >= 10],
+        [0.0, 1.0, 0.5 + 0.5 * (pot - 10) / 90.0],
+        default=0.5 * (pot - 1) / 9.0,
+    )
+
+    # --- Rule checks, group points and gates (generated from market_rules.json)
+    rule_flags, raw, base_ok = rules.columns(
+        profile, early, liq_cap_usd, _liq_limit(liq_cap_usd), pot_score,
+        liq, fdv, created, v1h, v6h, v24h, r_h1, r_h6, m5, h1c, h24c, liq_fdv, turnover24,
+    )
+    rules.record_columns(rule_flags, len(cols))
+
+    if exact:
+        # python round() so scores (and the label thresholds) match score_market exactly
+        scores = [round(x, 2) for x in raw.tolist()]
+        total = np.array(scores, dtype=np.float64)
+    else:
+        total = np.round(raw, 2)
+        scores = total
+
+    label_index = rules.label_columns(profile, base_ok, pot, total)
+    return {
+        "rules": rules, "profile": profile, "early": early, "rule_flags": rule_flags,
+        "flags": {rules.names[i]: rule_flags[i] for i in rules.reported},
+        "liq_fdv": liq_fdv, "turnover24": turnover24, "potential": pot, "scores": scores,
+        "label_index": label_index, "passed": label_index >= 0,
+    }
+
+def score_market_batch(pairs: List[PairSnapshot],
+                       now_ms: Optional[float] = None,
+                       liq_cap_usd: Optional[float] = None,
+                       profile: Optional[Dict[str, Any]] = None) -> BatchScores:
+    """
+    Vectorized score_market() over many pairs: fields are packed into
+    float64 columns once, then every rule, the upside curve, the weighted
+    score and the label are computed column-wise.
+    """
+    pairs = list(pairs)
+    profile = profile or _default_profile()
+    liq_cap_usd = profile["LIQ_CAP_USD"] if liq_cap_usd is None else liq_cap_usd
+    now_ms = time.time() * 1000 if now_ms is None else now_ms
+    cols = market_columns(pairs)
+    res = score_columns(cols, now_ms, liq_cap_usd, profile=profile)
+    names = np.array(res["rules"].labels + ("reject",))  # index -1 -> "reject"
+    labels = names[res["label_index"]].tolist()
+
+    return BatchScores(
+        pairs=pairs, columns=cols, early=res["early"], flags=res["flags"],
+        liq_fdv=res["liq_fdv"], turnover24=res["turnover24"], potential=res["potential"],
+        scores=res["scores"], labels=labels, liq_cap_usd=liq_cap_usd,
+        rules=res["rules"], rule_flags=res["rule_flags"], profile=profile,
+    )
+
+
+# ---------- declarative rules (market_rules.json, see rules.py) ----------
+# Names are checked against this module's constants; the values come from
+# the profile each call passes (chain_profile()).
+_RULES = RuleLoader(RULES_FILE, globals(), RULE_FIELDS)
+
+def active_rules() -> RuleSet:
+    """The current rule set (recompiled if market_rules.json changed)."""
+    return _RULES.get()
+
+def rule_stats(reset: bool = False) -> Dict[str, Dict[str, float]]:
+    """Per-rule fire counts (and timings with RULE_TIMING=1) since the last reset."""
+    return active_rules().stats(reset)
+
+active_rules()  # fail fast on a broken rules file at import
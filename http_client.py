@@ -0,0 +1,205 @@
+# http_client.py
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import random
+import time
+
+import budget
+import metrics
+
+# ---- Rate limits: (requests per second, burst) ----
+# Keys are host or host + path prefix; the longest matching key wins.
+# DEX Screener publishes 60 req/min for profiles/boosts and 300 req/min for pair/token lookups.
+RATE_LIMITS = {
+    "api.dexscreener.com": (5.0, 10),
+    "api.dexscreener.com/token-profiles": (1.0, 5),
+    "api.dexscreener.com/token-boosts": (1.0, 5),
+    "api.rugcheck.xyz": (3.0, 5),  # no published limit; stay polite
+}
+DEFAULT_RATE_LIMIT = (5.0, 10)
+
+# ---- Retry policy ----
+MAX_RETRIES = 3
+BACKOFF_BASE_SEC = 0.5
+BACKOFF_MAX_SEC = 8.0
+RETRY_AFTER_MAX_SEC = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+POOL_SIZE = 16
+
+
+class TokenBucket:
+    """Thread-safe token bucket. reserve() books a token and returns how long to wait for it."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_SESSIONS: Dict[str, "requests.Session"] = {}
+_BUCKETS: Dict[str, TokenBucket] = {}
+_LOCK = Lock()
+
+# Offline mode: an object with get(url, timeout) -> response (see offline.py) replaces the network
+_TRANSPORT = None
+
+STATS: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {"requests": 0, "retries": 0, "throttled": 0, "errors": 0, "deferred": 0})
+
+
+# ---------- helpers ----------
+def endpoint_name(url: str) -> str:
+    """Groups URLs per API endpoint: address-like path segments become {id}."""
+    parsed = urlparse(url)
+    parts = [
+        "{id}" if ("," in seg or len(seg) >= 25) else seg
+        for seg in parsed.path.strip("/").split("/") if seg
+    ]
+    return "/".join([parsed.netloc] + parts)
+
+def record(url: str, key: str, n: int = 1):
+    with _LOCK:
+        STATS[endpoint_name(url)][key] += n
+
+def get_stats() -> Dict[str, Dict[str, int]]:
+    with _LOCK:
+        return {ep: dict(counts) for ep, counts in STATS.items()}
+
+def reset_stats():
+    with _LOCK:
+        STATS.clear()
+
+def bucket_for(url: str) -> TokenBucket:
+    parsed = urlparse(url)
+    path_key = parsed.netloc + parsed.path
+    key = max((k for k in RATE_LIMITS if path_key.startswith(k)), key=len, default=parsed.netloc)
+    with _LOCK:
+        if key not in _BUCKETS:
+            _BUCKETS[key] = TokenBucket(*RATE_LIMITS.get(key, DEFAULT_RATE_LIMIT))
+        return _BUCKETS[key]
+
+def set_transport(transport):
+    """Routes every http_get through `transport` (None = the network again)."""
+    global _TRANSPORT
+    _TRANSPORT = transport
+
+def is_offline() -> bool:
+    return _TRANSPORT is not None
+
+def checked(url: str, timeout: float) -> float:
+    """budget.check() for url's endpoint; counts the request as deferred if it is ruled out."""
+    try:
+        return budget.check(endpoint_name(url), timeout)
+    except budget.Deferred:
+        record(url, "deferred")
+        raise
+
+def session_for(url: str) -> "requests.Session":
+    import requests  # imported on first request: keeps CLI / offline start-up fast
+    from requests.adapters import HTTPAdapter
+
+    host = urlparse(url).netloc
+    with _LOCK:
+        if host not in _SESSIONS:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSIONS[host] = session
+        return _SESSIONS[host]
+
+def retry_after_sec(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header (seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Server-requested delay if given, else full-jitter exponential backoff."""
+    if retry_after is not None:
+        return min(retry_after, RETRY_AFTER_MAX_SEC)
+    return random.uniform(0, min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * (2 ** attempt)))
+
+
+# ---------- public API ----------
+def http_get(url: str, timeout: float = 10, retries: int = MAX_RETRIES) -> "requests.Response":
+    """
+    Rate-limited GET over a pooled keep-alive session. Retries connection
+    errors and 429/5xx with jittered backoff (honoring Retry-After).
+    Returns the last response; raises if every attempt failed to connect,
+    and budget.Deferred if the cycle deadline or the endpoint's circuit
+    breaker rules the (next) attempt out.
+    """
+    endpoint = endpoint_name(url)
+    if _TRANSPORT is not None:
+        checked(url, timeout)
+        record(url, "requests")
+        return _TRANSPORT.get(url, timeout=timeout)
+
+    import requests
+    session = session_for(url)
+    bucket = bucket_for(url)
+    breaker = budget.breaker_for(endpoint)
+
+    for attempt in range(retries + 1):
+        attempt_timeout = checked(url, timeout)
+        if bucket.acquire() > 0:
+            record(url, "throttled")
+        record(url, "requests")
+        t0 = time.perf_counter()
+        try:
+            res = session.get(url, timeout=attempt_timeout)
+        except requests.RequestException:
+            metrics.observe_http(endpoint, time.perf_counter() - t0, error=True)
+            record(url, "errors")
+            breaker.failure()
+            if attempt >= retries:
+                raise
+            record(url, "retries")
+            time.sleep(budget.capped(backoff_delay(attempt)))
+            continue
+        metrics.observe_http(endpoint, time.perf_counter() - t0, error=res.status_code >= 400)
+
+        if res.status_code in RETRY_STATUSES:
+            record(url, "errors")
+            breaker.failure()
+            if attempt < retries:
+                record(url, "retries")
+                time.sleep(budget.capped(backoff_delay(attempt, retry_after_sec(res.headers.get("Retry-After")))))
+                continue
+        else:
+            breaker.success()
+        return res
+
+def http_get_json(url: str, timeout: float = 10, retries: int = MAX_RETRIES):
+    """http_get() + raise_for_status() + json()."""
+    res = http_get(url, timeout=timeout, retries=retries)
+    res.raise_for_status()
+    return res.json()
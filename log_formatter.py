@@ -1,61 +1,223 @@
-def build_alert_log(pairs: list) -> str:
-    lines = []
-
-    for data in pairs:
-        base = data.get("baseToken", {}) or {}
-        quote = data.get("quoteToken", {}) or {}
-
-        symbol = f"{base.get('symbol', 'N/A')} / {quote.get('symbol', 'N/A')}"
-        price_usd = data.get("priceUsd", "N/A")
-
-        market_cap = float(data.get("marketCap", 0) or 0)
-        liquidity = float((data.get("liquidity", {}) or {}).get("usd", 0) or 0)
-        change_24h = (data.get("priceChange", {}) or {}).get("h24", "N/A")
-        url = data.get("url", "")
-
-        rug_status = data.get("rug_status", "")
-        rug_score = int(data.get("rug_score", 0) or 0)
-        rug_reasons = data.get("rug_reasons", []) or []
-        rug_link = data.get("rug_link", "")
-
-        count = int(data.get("count", 0) or 0)
-        prefix = "🔥" if count >= 5 else "➖"
-
-        signal = data.get("trade_signal", "No Signal")
-        sig_icon = (
-            "🟢" if signal == "Entry"
-            else "🟡" if signal == "Watching"
-            else "🔴" if signal == "Exit"
-            else "⚪"
-        )
-        reasons = data.get("trade_reasons", []) or []
-        reasons_txt = (" — " + " · ".join(reasons[:2])) if reasons else ""
+import html
+import re
+from typing import NamedTuple, Optional, Tuple
 
+from cache import TTLCache
+from pair_snapshot import PairSnapshot
+
+# ---- Render cache: rendered blocks keyed by the fields they depend on ----
+RENDER_CACHE_TTL_SEC = 3600
+RENDER_CACHE_MAX = 20_000
+RENDER_CACHE = TTLCache(RENDER_CACHE_TTL_SEC, RENDER_CACHE_MAX)
+
+FORMATS = ("plain", "markdown", "html", "compact")
+
+# Count tiers shown in alerts; crossing one counts as a change worth re-sending
+COUNT_TIERS = (1, 3, 5)
+
+def count_tier(count: int) -> int:
+    return sum(1 for t in COUNT_TIERS if count >= t)
+
+def alert_state(pair: PairSnapshot) -> tuple:
+    """What a pair's alert is about: (signal, count tier, rug status). Alerts are re-sent when it changes."""
+    return (
+        pair.trade_signal,
+        count_tier(int(pair.count or 0)),
+        pair.rug_status or "",
+    )
+
+
+class AlertFields(NamedTuple):
+    """Everything a rendered block shows, parsed once per distinct pair content."""
+    symbol: str
+    price_usd: object
+    market_cap: float
+    liquidity: float
+    change_24h: object
+    url: str
+    rug_status: str
+    rug_score: int
+    rug_reasons: Tuple[str, ...]
+    rug_link: str
+    prefix: str
+    signal: str
+    sig_icon: str
+    reasons: Tuple[str, ...]
+    market_label: str
+    market_score: object
+    potential_mult: object
+    checks: Optional[Tuple[int, int]]   # (OK, total) or None when there are no checks
+
+
+def _shown(value) -> tuple:
+    # values printed as-is: 80 and 80.0 hash alike but render differently
+    return type(value), value
+
+def _plain(x: float) -> str:
+    """95.2 -> '95.2', 150.0 -> '150' (as the API's JSON numbers read)."""
+    return str(int(x)) if x.is_integer() else repr(x)
+
+def _check_counts(market_checks) -> Optional[Tuple[int, int]]:
+    return (sum(1 for v in market_checks.values() if v), len(market_checks)) if market_checks else None
+
+def render_key(pair: PairSnapshot) -> tuple:
+    """The inputs of a block, as a hashable tuple (no formatting)."""
+    return (
+        pair.base_symbol, pair.quote_symbol, pair.price_text, pair.market_cap, pair.liq, pair.h24c, pair.url,
+        pair.rug_status, pair.rug_score, tuple(pair.rug_reasons or ()), pair.rug_link,
+        pair.count, pair.trade_signal, tuple((pair.trade_reasons or ())[:2]),
+        pair.market_label, _shown(pair.market_score), _shown(pair.potential_multiple),
+        _check_counts(pair.market_checks),
+    )
+
+def parse_pair(pair: PairSnapshot) -> AlertFields:
+    count = int(pair.count or 0)
+    signal = pair.trade_signal
+    sig_icon = (
+        "🟢" if signal == "Entry"
+        else "🟡" if signal == "Watching"
+        else "🔴" if signal == "Exit"
+        else "⚪"
+    )
+
+    return AlertFields(
+        symbol=f"{pair.base_symbol} / {pair.quote_symbol}",
+        price_usd=pair.price_text,
+        market_cap=pair.market_cap,
+        liquidity=pair.liq,
+        change_24h="N/A" if pair.h24c is None else f"{_plain(pair.h24c)}%",  # no priceChange.h24 sent
+        url=pair.url,
+        rug_status=pair.rug_status or "",
+        rug_score=int(pair.rug_score or 0),
+        rug_reasons=tuple(pair.rug_reasons or ()),
+        rug_link=pair.rug_link or "",
+        prefix="🔥" if count >= 5 else "➖",
+        signal=signal,
+        sig_icon=sig_icon,
+        reasons=tuple((pair.trade_reasons or ())[:2]),
         # Market fields (new)
-        market_label = data.get("market_label", "")
-        market_score = data.get("market_score", None)
-        potential_mult = data.get("potential_multiple", None)
-        market_checks = data.get("market_checks", {})
+        market_label=pair.market_label or "",
+        market_score=pair.market_score,
+        potential_mult=pair.potential_multiple,
+        checks=_check_counts(pair.market_checks),
+    )
+
+
+# ---------- formats ----------
+_MD_SPECIAL = re.compile(r"([_*\[\]()~`>#+\-=|{}.!\\])")
+
+def _md(value) -> str:
+    """Escapes text for Telegram MarkdownV2."""
+    return _MD_SPECIAL.sub(r"\\\1", str(value))
+
+def _md_url(value) -> str:
+    """Escapes a MarkdownV2 link target: inside (...) only ) and \\ are special."""
+    return re.sub(r"([)\\])", r"\\\1", str(value))
+
+def _lines(f: AlertFields, esc=str):
+    # every literal, separators included, goes through esc: | . - etc. are reserved in MarkdownV2
+    reasons_txt = (esc(" — ") + esc(" · ").join(esc(r) for r in f.reasons)) if f.reasons else ""
+    header = f"{f.prefix} {f.sig_icon} {esc(f.signal)}{esc(' | ')}{esc(f.symbol)}{reasons_txt}"
+    metrics = esc(f"💰 Price: ${f.price_usd} | MC: ${f.market_cap:,.0f} | Liquidity: ${f.liquidity:,.0f} | 24H Change: {f.change_24h}")
+    rugline = esc(f"{f.rug_status} | Score: {f.rug_score} / 100")
+
+    market_line = f"📊 Market: {f.market_label} | Score: {f.market_score} | Pot.Mult: x{f.potential_mult}"
+    if f.checks:
+        market_line += f" | Checks: {f.checks[0]} OK / {f.checks[1]}"
+    return header, metrics, rugline, esc(market_line)
+
+def _render_plain(f: AlertFields) -> str:
+    parts = list(_lines(f))
+
+    if f.rug_reasons:
+        parts.extend([f"{r}" for r in f.rug_reasons])
+
+    if f.rug_link:
+        parts.append(f"🔍 {f.rug_link}")
+
+    parts.append(f"🔗 {f.url}")
+    parts.append("-" * 40)
+
+    return "\n".join(parts)
+
+def _render_markdown(f: AlertFields) -> str:
+    header, metrics, rugline, market_line = _lines(f, _md)
+    parts = [f"*{header}*", metrics, rugline, market_line]
+    parts.extend(_md(r) for r in f.rug_reasons)
+    if f.rug_link:
+        parts.append(f"🔍 [Rugcheck]({_md_url(f.rug_link)})")
+    parts.append(f"🔗 [DEX Screener]({_md_url(f.url)})")
+    parts.append(_md("-" * 40))
+    return "\n".join(parts)
+
+def _render_html(f: AlertFields) -> str:
+    header, metrics, rugline, market_line = _lines(f, html.escape)
+    parts = [f"<b>{header}</b>", metrics, rugline, market_line]
+    parts.extend(html.escape(str(r)) for r in f.rug_reasons)
+    if f.rug_link:
+        parts.append(f'🔍 <a href="{html.escape(str(f.rug_link))}">Rugcheck</a>')
+    parts.append(f'🔗 <a href="{html.escape(str(f.url))}">DEX Screener</a>')
+    parts.append("-" * 40)
+    return "\n".join(parts)
 
-        header = f"{prefix} {sig_icon} {signal} | {symbol}{reasons_txt}"
-        metrics = f"💰 Price: ${price_usd} | MC: ${market_cap:,.0f} | Liquidity: ${liquidity:,.0f} | 24H Change: {change_24h}%"
-        rugline = f"{rug_status} | Score: {rug_score} / 100"
+def _render_compact(f: AlertFields) -> str:
+    return (f"{f.prefix}{f.sig_icon} {f.symbol} | ${f.price_usd} | MC ${f.market_cap:,.0f} | "
+            f"Liq ${f.liquidity:,.0f} | 24H {f.change_24h} | Rug {f.rug_score} | {f.market_label} | {f.url}")
 
-        market_line = f"📊 Market: {market_label} | Score: {market_score} | Pot.Mult: x{potential_mult}"
-        if market_checks:
-            market_line += f" | Checks: {sum(1 for k,v in market_checks.items() if v)} OK / {len(market_checks)}"
+RENDERERS = {
+    "plain": _render_plain,
+    "markdown": _render_markdown,
+    "html": _render_html,
+    "compact": _render_compact,
+}
 
-        parts = [header, metrics, rugline, market_line]
 
-        if rug_reasons:
-            parts.extend([f"{r}" for r in rug_reasons])
+# ---------- public API ----------
+def render_pair(pair: PairSnapshot, fmt: str = "plain") -> str:
+    """
+    One pair's alert block. Blocks are cached by render_key(), so an
+    unchanged pair is neither re-parsed nor re-formatted; each format is
+    rendered lazily from the same parsed fields.
+    """
+    renderer = RENDERERS[fmt]
+    try:
+        key = render_key(pair)
+        entry = RENDER_CACHE.get(key)
+    except TypeError:  # unhashable field values; render uncached
+        return renderer(parse_pair(pair))
 
-        if rug_link:
-            parts.append(f"🔍 {rug_link}")
+    if entry is None:
+        entry = {"fields": parse_pair(pair)}
+        RENDER_CACHE.put(key, entry)
+    text = entry.get(fmt)
+    if text is None:
+        text = entry[fmt] = renderer(entry["fields"])
+    return text
 
-        parts.append(f"🔗 {url}")
-        parts.append("-" * 40)
+def build_alert_log(pairs: list, fmt: str = "plain") -> str:
+    return "\n".join(render_pair(pair, fmt) for pair in pairs)
 
-        lines.append("\n".join(parts))
+def chunk_messages(blocks: list, limit: int = 4000) -> list:
+    """
+    Packs rendered pair blocks into messages of at most `limit` characters,
+    never splitting a block unless it alone is too long (then by line, then hard).
+    """
+    messages, current = [], ""
+    pieces = []
+    for block in blocks:
+        if len(block) <= limit:
+            pieces.append(block)
+            continue
+        for line in block.split("\n"):
+            pieces.extend(line[i:i + limit] for i in range(0, max(len(line), 1), limit))
 
-    return "\n".join(lines)
+    for piece in pieces:
+        candidate = f"{current}\n{piece}" if current else piece
+        if len(candidate) <= limit:
+            current = candidate
+        else:
+            messages.append(current)
+            current = piece
+    if current:
+        messages.append(current)
+    return messages
@@ -1,68 +1,129 @@
-from screener import get_solana_token_profiles, get_pair_address, get_pair_details
-from filters import score_market
-from rugcheck import get_rugcheck_report, evaluate_rugcheck
-from tracker import update_pair_tracking
-from telegram_bot import send_telegram_message
-from log_formatter import build_alert_log
-from trader import enrich_with_trade_signal, load_trade_meta_from_tracked, save_trade_meta
+from typing import Optional
+
+import budget
+import metrics
+import priority
+import recorder
+from screener import get_token_candidates, PAIR_CACHE
+from scan import (
+    CHAINS, Funnel, select_candidates, scan_tokens, run_multichain_scan, reject_stats, save_reject_cache,
+    with_deferred, save_deferred,
+)
+from rugcheck import drain_refreshes, save_rugcheck_cache
+from state_store import get_store
+from http_client import get_stats, reset_stats
+from filters import rule_stats
+from tracker import covers_all_tracked, update_pair_tracking
+from telegram_bot import send_alert, flush
+from trader import load_trade_meta_from_tracked, save_trade_meta
+
+# Fetch and score tokens concurrently (aiohttp); set False for the serial path
+CONCURRENT_SCAN = True
+
+# Of the cycle budget (budget.CYCLE_BUDGET_SEC), the scan may use this share; the tracker refresh gets the rest
+SCAN_BUDGET_SHARE = 0.75
+
+def _run_cycle(concurrent: bool, budget_sec: float):
+    # Pair snapshots are run-scoped: scan fills the cache, tracker refresh reuses it
+    PAIR_CACHE.clear()
+    reset_stats()
+    rule_stats(reset=True)
+    reject_stats(reset=True)
 
-def main():
     # Load meta for currently-tracked pairs only (keeps RAM bounded)
-    load_trade_meta_from_tracked("tracked_pairs.json")
-
-    tokens = get_solana_token_profiles()
-    passed_pairs = []
-
-    for address in tokens:
-        if not address:
-            continue
-
-        pair_address = get_pair_address("solana", address)
-        if not pair_address:
-            continue
-
-        pair = get_pair_details("solana", pair_address)
-        if not pair:
-            continue
-
-        res = score_market(pair)
-        if res["label"] not in ("x10-ready", "x100-candidate"):
-            continue
-
-        pair["market_label"] = res["label"]
-        pair["market_score"] = res["score"]
-        pair["potential_multiple"] = res["potential_multiple"]
-        pair["market_checks"] = res["market"]  # raw sub-checks + reasons
-
-        base = pair.get("baseToken", {})
-        mint_address = base.get("address", "")
-
-        rugcheck_data = get_rugcheck_report(mint_address)
-        rug_status, rug_score, rug_reasons, rug_link = evaluate_rugcheck(rugcheck_data)
-
-        # Skip if rug score too low
-        if rug_score < 80:
-            continue
-
-        pair["rug_status"] = rug_status
-        pair["rug_score"] = rug_score
-        pair["rug_reasons"] = rug_reasons
-        pair["rug_link"] = rug_link
-
-        # attach trade signal
-        pair = enrich_with_trade_signal(pair)
-
-        passed_pairs.append(pair)
+    with metrics.stage("load_state"):
+        load_trade_meta_from_tracked()
+
+    with metrics.stage("discovery"):
+        # one download, split by chain; tokens the last cycle deferred go first
+        candidates = with_deferred(get_token_candidates(CHAINS))
+
+    # Cheap-first funnel per chain: discovery metadata -> hydrate -> prefilter -> score -> Rugcheck
+    funnels = {chain_id: Funnel() for chain_id in CHAINS}
+    with metrics.stage("scan"), budget.cycle(budget_sec * SCAN_BUDGET_SHARE - budget.elapsed()):
+        tokens_by_chain = {
+            chain_id: select_candidates(candidates.get(chain_id, {}), funnels[chain_id], chain_id)
+            for chain_id in CHAINS
+        }
+        if concurrent:
+            passed_pairs = run_multichain_scan(tokens_by_chain, funnels=funnels)
+        else:
+            passed_pairs = [
+                pair for chain_id, tokens in tokens_by_chain.items()
+                for pair in scan_tokens(tokens, chain_id, funnel=funnels[chain_id])
+            ]
+        save_rugcheck_cache()
+        save_reject_cache()
+        priority.save_first_seen()
+    multi = len(CHAINS) > 1
+    for chain_id, funnel in funnels.items():
+        prefix = f"scan.{chain_id}" if multi else "scan"
+        for st in funnel.stages:
+            metrics.current().record_stage(f"{prefix}.{st.name}", st.seconds, st.seen, st.kept)
+        print(f"⛓️ {chain_id}\n{funnel.report()}" if multi else funnel.report())
 
     if passed_pairs:
-        all_tracked = update_pair_tracking(passed_pairs)
+        with metrics.stage("tracker"):
+            all_tracked = update_pair_tracking(passed_pairs, chains=CHAINS)
         if all_tracked:
-            # Save TRADE_META filtered to currently tracked ids
-            active_ids = {p.get("pairAddress") for p in all_tracked if p.get("pairAddress")}
-            save_trade_meta(active_ids)
-
-            log_text = build_alert_log(all_tracked)  # includes 🔥 for count≥5
-            send_telegram_message(log_text)
+            # Save TRADE_META filtered to currently tracked ids (not just the ones refreshed)
+            with metrics.stage("save_state"):
+                save_trade_meta(get_store().tracked_ids())
+
+            with metrics.stage("alert"):
+                # only pairs whose signal / count tier / rug status changed; a partial refresh
+                # must not make the pairs it skipped look untracked
+                send_alert(all_tracked, complete=covers_all_tracked(all_tracked))
+    save_deferred()
+
+    stats = PAIR_CACHE.stats()
+    print(f"📦 Pair cache: {stats['hits']} hits / {stats['misses']} misses (hit rate {stats['hit_rate']:.0%}, size {stats['size']})")
+    rejects = reject_stats()
+    skipped = ", ".join(f"{reason} {n}" for reason, n in sorted(rejects["hits"].items()))
+    print(f"⏭️ Reject cache: {sum(rejects['hits'].values())} skipped ({skipped or 'none'}) | "
+          f"{sum(rejects['added'].values())} added")
+    ranked = priority.report(passed_pairs)
+    http_stats = get_stats()
+    for endpoint, c in sorted(http_stats.items()):
+        print(f"🌐 {endpoint}: {c['requests']} req | {c['retries']} retries | {c['throttled']} throttled | "
+              f"{c['errors']} errors | {c['deferred']} deferred")
+    breakers = budget.breaker_states()
+    for endpoint, b in sorted(breakers.items()):
+        if b["state"] != "closed":
+            print(f"🔌 {endpoint}: circuit {b['state']} ({b['skipped']} calls skipped so far)")
+    print(f"⏱️ Cycle budget: {budget.elapsed():.1f}s of {budget_sec:g}s | deferred to next cycle: {budget.deferred_summary()}")
+
+    metrics.current().set_counters("pair_cache", {k: stats[k] for k in ("hits", "misses", "size")})
+    for key in ("requests", "retries", "throttled", "errors", "deferred"):
+        metrics.current().set_counters(f"http_{key}", {ep: c[key] for ep, c in http_stats.items()})
+    for key, values in rejects.items():  # per rejection reason
+        metrics.current().set_counters(f"reject_cache_{key}", values)
+    for key, values in rule_stats().items():  # per-rule fails (+ seconds with RULE_TIMING=1)
+        metrics.current().set_counters(f"rule_{key}", values)
+    metrics.current().set_counters("priority", ranked)
+    metrics.current().set_counters("deferred", {kind: len(set(items)) for kind, items in budget.deferred().items()})
+    metrics.current().set_counters("breaker_open", {ep: int(b["state"] != "closed") for ep, b in breakers.items()})
+
+def main(concurrent: bool = CONCURRENT_SCAN, profile: Optional[str] = None,
+         budget_sec: float = budget.CYCLE_BUDGET_SEC):
+    """
+    One scan cycle. Writes per-stage timings, HTTP latency histograms and
+    counters to metrics/ (Prometheus text + JSON line).
+    profile="cprofile" | "tracemalloc" additionally captures a profile.
+    Requests that would run past budget_sec (or hit an open circuit
+    breaker) are skipped; the tokens involved are scanned next cycle.
+    """
+    cycle = metrics.start_cycle()
+    try:
+        with metrics.profiled(profile), budget.cycle(budget_sec):
+            _run_cycle(concurrent, budget_sec)
+    finally:
+        # stale Rugcheck entries are refreshed in the background; save what they fetched too
+        drain_refreshes()
+        save_rugcheck_cache()
+        cycle.write()
+        recorder.flush()
+        flush()  # alerts go out in the background; let them finish before exiting
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,241 @@
+# metrics.py
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from threading import Lock, local
+from typing import Dict, Optional
+import json
+import os
+import time
+
+# ---- Configs you can tune ----
+METRICS_DIR = Path("metrics")
+PROM_FILE = "{job}_metrics.prom"     # node_exporter textfile-collector format
+JSONL_FILE = "{job}_metrics.jsonl"   # one line per cycle
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "solana_bot"
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for le, n in zip(self.buckets + (float("inf"),), self.counts):
+            running += n
+            yield le, running
+
+
+class CycleMetrics:
+    """Everything measured during one scan cycle (or one run of a scheduler job)."""
+
+    def __init__(self, job: str = "scan"):
+        self.job = job
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.http: Dict[str, Histogram] = {}
+        self.http_errors: Dict[str, int] = {}
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self._lock = Lock()
+
+    def _stage(self, name: str) -> Dict[str, float]:
+        return self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "errors": 0, "items_in": 0, "items_out": 0})
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self._stage(name)["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                st = self._stage(name)
+                st["seconds"] += elapsed
+                st["calls"] += 1
+
+    def record_stage(self, name: str, seconds: float, items_in: int = 0, items_out: int = 0):
+        with self._lock:
+            st = self._stage(name)
+            st["seconds"] += seconds
+            st["calls"] += 1
+            st["items_in"] += items_in
+            st["items_out"] += items_out
+
+    def observe_http(self, endpoint: str, seconds: float, error: bool = False):
+        with self._lock:
+            self.http.setdefault(endpoint, Histogram()).observe(seconds)
+            if error:
+                self.http_errors[endpoint] = self.http_errors.get(endpoint, 0) + 1
+
+    def set_counters(self, name: str, values: Dict[str, int]):
+        """Attach a labelled counter family, e.g. http_client stats per endpoint."""
+        with self._lock:
+            self.counters[name] = dict(values)
+
+    # ---------- export ----------
+    def to_json(self) -> dict:
+        return {
+            "ts": datetime.utcfromtimestamp(self.started_at).isoformat(),
+            "job": self.job,
+            "cycle_seconds": round((self.finished_at or time.time()) - self.started_at, 4),
+            "stages": {k: {kk: round(vv, 4) for kk, vv in v.items()} for k, v in self.stages.items()},
+            "http": {
+                ep: {
+                    "count": h.count,
+                    "sum_seconds": round(h.total, 4),
+                    "errors": self.http_errors.get(ep, 0),
+                    "buckets": {("+Inf" if le == float("inf") else str(le)): n for le, n in h.cumulative()},
+                }
+                for ep, h in self.http.items()
+            },
+            "counters": self.counters,
+        }
+
+    def to_prometheus(self) -> str:
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        def esc(v):
+            return str(v).replace("\\", "\\\\").replace('"', '\\"')
+
+        family("cycle_seconds", "gauge", "Wall time of the last scan cycle")
+        lines.append(f"{PREFIX}_cycle_seconds {(self.finished_at or time.time()) - self.started_at:.6f}")
+        family("cycle_timestamp_seconds", "gauge", "Unix time the last scan cycle started")
+        lines.append(f"{PREFIX}_cycle_timestamp_seconds {self.started_at:.3f}")
+
+        for key, kind, help_text in (
+            ("seconds", "gauge", "Wall time per stage in the last cycle"),
+            ("calls", "gauge", "Calls per stage in the last cycle"),
+            ("errors", "gauge", "Errors per stage in the last cycle"),
+            ("items_in", "gauge", "Items entering the stage in the last cycle"),
+            ("items_out", "gauge", "Items leaving the stage in the last cycle"),
+        ):
+            family(f"stage_{key}", kind, help_text)
+            for stage, values in self.stages.items():
+                lines.append(f'{PREFIX}_stage_{key}{{stage="{esc(stage)}"}} {values[key]:g}')
+
+        family("http_request_duration_seconds", "histogram", "HTTP latency per endpoint in the last cycle")
+        for ep, h in self.http.items():
+            for le, n in h.cumulative():
+                le_txt = "+Inf" if le == float("inf") else f"{le:g}"
+                lines.append(f'{PREFIX}_http_request_duration_seconds_bucket{{endpoint="{esc(ep)}",le="{le_txt}"}} {n}')
+            lines.append(f'{PREFIX}_http_request_duration_seconds_sum{{endpoint="{esc(ep)}"}} {h.total:.6f}')
+            lines.append(f'{PREFIX}_http_request_duration_seconds_count{{endpoint="{esc(ep)}"}} {h.count}')
+
+        family("http_errors", "gauge", "Failed HTTP attempts per endpoint in the last cycle")
+        for ep, n in self.http_errors.items():
+            lines.append(f'{PREFIX}_http_errors{{endpoint="{esc(ep)}"}} {n}')
+
+        for name, values in self.counters.items():
+            family(name, "gauge", f"{name} in the last cycle")
+            for label, value in values.items():
+                lines.append(f'{PREFIX}_{name}{{key="{esc(label)}"}} {value:g}')
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, out_dir: Path = METRICS_DIR):
+        """Atomically rewrites the .prom file and appends one JSON line."""
+        self.finished_at = self.finished_at or time.time()
+        out_dir = Path(out_dir)
+        try:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            prom = out_dir / PROM_FILE.format(job=self.job)
+            tmp = prom.with_name(prom.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp, prom)
+            with open(out_dir / JSONL_FILE.format(job=self.job), "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.to_json(), separators=(",", ":")) + "\n")
+        except Exception as e:
+            print(f"⚠️ Failed to write metrics to {out_dir}: {e}")
+
+
+# ---------- current cycle (per thread, so scheduler jobs don't mix) ----------
+CURRENT = CycleMetrics()   # last cycle started on any thread; fallback for threads without one
+_LOCAL = local()
+
+def current() -> CycleMetrics:
+    return getattr(_LOCAL, "cycle", None) or CURRENT
+
+def start_cycle(job: str = "scan") -> CycleMetrics:
+    global CURRENT
+    CURRENT = _LOCAL.cycle = CycleMetrics(job)
+    return CURRENT
+
+def stage(name: str):
+    return current().stage(name)
+
+def observe_http(endpoint: str, seconds: float, error: bool = False):
+    current().observe_http(endpoint, seconds, error)
+
+
+# ---------- optional single-run profiling ----------
+@contextmanager
+def profiled(mode: Optional[str], out_dir: Path = METRICS_DIR, top: int = 40):
+    """
+    mode="cprofile"     -> <out_dir>/profile-<ts>.pstats (+ .txt summary)
+    mode="tracemalloc"  -> <out_dir>/tracemalloc-<ts>.txt (top allocation sites)
+    mode=None           -> no-op
+    """
+    if not mode:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"unknown profile mode {mode!r}; expected one of {PROFILE_MODES}")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+
+    if mode == "cprofile":
+        import cProfile
+        import io
+        import pstats
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            path = out_dir / f"profile-{stamp}.pstats"
+            prof.dump_stats(str(path))
+            buf = io.StringIO()
+            pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+            path.with_suffix(".txt").write_text(buf.getvalue(), encoding="utf-8")
+            print(f"🧪 cProfile written to {path}")
+    else:
+        import tracemalloc
+        tracemalloc.start(25)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            path = out_dir / f"tracemalloc-{stamp}.txt"
+            lines = [f"current={current} peak={peak}"]
+            lines += [str(s) for s in snapshot.statistics("lineno")[:top]]
+            path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+            print(f"🧪 tracemalloc written to {path}")
@@ -0,0 +1,91 @@
+# offline.py
+"""
+Serves DEX Screener and Rugcheck requests from fixtures/ instead of the
+network (cli.py scan-once --offline). Install with
+http_client.set_transport(FixtureTransport()).
+
+    /token-boosts/..., /token-profiles/...   -> dexscreener_discovery.json[path]
+    /token-pairs/v1/<chain>/<token>          -> pairs whose base token matches
+    /tokens/v1/<chain>/<a,b,...>             -> pairs trading any of the tokens
+    /latest/dex/pairs/<chain>/<a,b,...>      -> {"pair", "pairs"} by pairAddress
+    rugcheck .../tokens/<mint>/report        -> rugcheck_reports.json by mint
+
+Anything else is a 404. pairCreatedAt is shifted so the fixtures are as
+old now as they were when they were recorded.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+import copy
+import json
+import time
+
+# ---- Configs you can tune ----
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+RECORDED_AT_MS = 1_760_000_000_000   # "now" when the fixtures were captured (bench.NOW_MS)
+
+
+class FixtureResponse:
+    """The subset of requests.Response the scanners use."""
+
+    def __init__(self, url: str, payload: Any = None, status_code: int = 200):
+        self.url = url
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+        self._payload = payload
+
+    @property
+    def text(self) -> str:
+        return json.dumps(self._payload)
+
+    def json(self):
+        return copy.deepcopy(self._payload)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"{self.status_code} for offline url {self.url}")
+
+
+class FixtureTransport:
+    def __init__(self, fixtures_dir=FIXTURES_DIR, now_ms: Optional[float] = None):
+        fixtures_dir = Path(fixtures_dir)
+        self.discovery = _load(fixtures_dir / "dexscreener_discovery.json")
+        self.pairs: List[dict] = _load(fixtures_dir / "dexscreener_pairs.json")
+        self.reports = {r.get("mint"): r for r in _load(fixtures_dir / "rugcheck_reports.json")}
+
+        shift = (time.time() * 1000 if now_ms is None else now_ms) - RECORDED_AT_MS
+        for pair in self.pairs:
+            if pair.get("pairCreatedAt"):
+                pair["pairCreatedAt"] += shift
+
+    def get(self, url: str, timeout: float = 10) -> FixtureResponse:
+        parsed = urlparse(url)
+        parts = [p for p in parsed.path.strip("/").split("/") if p]
+        payload = None
+
+        if parsed.netloc == "api.rugcheck.xyz":
+            if len(parts) >= 2 and parts[-1] == "report":
+                payload = self.reports.get(parts[-2])
+        elif "/".join(parts) in self.discovery:
+            payload = self.discovery["/".join(parts)]
+        elif parts[:2] in (["token-pairs", "v1"], ["tokens", "v1"]) and len(parts) == 4:
+            chain_id, tokens = parts[2], set(parts[3].split(","))
+            base_only = parts[0] == "token-pairs"
+            payload = [
+                p for p in self.pairs if p.get("chainId") == chain_id
+                and ((p.get("baseToken") or {}).get("address") in tokens
+                     or (not base_only and (p.get("quoteToken") or {}).get("address") in tokens))
+            ]
+        elif parts[:3] == ["latest", "dex", "pairs"] and len(parts) == 5:
+            chain_id, ids = parts[3], set(parts[4].split(","))
+            found = [p for p in self.pairs if p.get("chainId") == chain_id and p.get("pairAddress") in ids]
+            payload = {"pair": found[0] if found else None, "pairs": found}
+
+        if payload is None:
+            return FixtureResponse(url, {"error": "not in fixtures"}, status_code=404)
+        return FixtureResponse(url, payload)
+
+
+def _load(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,444 @@
+# onchain.py
+"""
+Optional discovery source: new Raydium AMM v4 pools and pump.fun tokens
+straight from a Solana RPC websocket (logsSubscribe), seconds after they
+are created rather than when DEX Screener's boost/profile feeds list them.
+
+    SOLANA_WS_URL=wss://<rpc> python cli.py daemon   # scheduler.py starts the listener
+    python onchain.py listen [--ws URL] [--rpc URL]  # print new mints as they appear
+    python onchain.py stub [--port 8900]             # local RPC replaying recorded events
+    python onchain.py replay                         # stub + listener in one process
+    python onchain.py record --out FILE --seconds 60 # capture live events for the stub
+
+pump.fun mints are decoded from the CreateEvent in the transaction logs.
+Raydium's initialize2 log does not name the mints, so that transaction is
+fetched once (getTransaction) and the mints are read from the instruction
+accounts. Quote mints (SOL, USDC, USDT) are dropped.
+"""
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+from cache import TTLCache
+
+# ---- Configs you can tune ----
+SOLANA_WS_URL = os.getenv("SOLANA_WS_URL", "")     # empty = listener off
+SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL", "")   # default: SOLANA_WS_URL over http(s)
+COMMITMENT = "confirmed"
+PROGRAMS = {
+    "raydium": "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8",   # AMM v4
+    "pumpfun": "6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P",
+}
+QUOTE_MINTS = {
+    "So11111111111111111111111111111111111111112",    # wrapped SOL
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",   # USDC
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BJEYCNS",   # USDT
+}
+RAYDIUM_MINT_ACCOUNTS = (8, 9)   # initialize2 accounts: coin mint, pc mint
+TX_FETCH_RETRIES = 3             # getTransaction can briefly return null right after the notification
+TX_FETCH_DELAY_SEC = 0.5
+RECONNECT_MAX_SEC = 30
+SEEN_TTL_SEC = 3600              # a mint is reported once per window
+EVENTS_FILE = Path(__file__).parent / "fixtures" / "solana_pool_events.json"
+
+CREATE_EVENT = hashlib.sha256(b"event:CreateEvent").digest()[:8]   # Anchor event discriminator
+_B58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+# new mints for the scheduler: (mint, {"source", "signature", "seen_at"})
+_NEW: "queue.Queue[tuple]" = queue.Queue()
+SEEN = TTLCache(SEEN_TTL_SEC, maxsize=50_000)
+STATS: Dict[str, int] = {"notifications": 0, "pools": 0, "mints": 0, "failed_tx": 0, "reconnects": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _count(key: str, n: int = 1):
+    with _STATS_LOCK:
+        STATS[key] += n
+
+def stats() -> Dict[str, int]:
+    with _STATS_LOCK:
+        return dict(STATS)
+
+def enabled() -> bool:
+    return bool(SOLANA_WS_URL)
+
+def rpc_url_for(ws_url: str) -> str:
+    return SOLANA_RPC_URL or ws_url.replace("wss://", "https://", 1).replace("ws://", "http://", 1)
+
+
+# ---------- decoding ----------
+def b58encode(raw: bytes) -> str:
+    n = int.from_bytes(raw, "big")
+    out = ""
+    while n:
+        n, r = divmod(n, 58)
+        out = _B58[r] + out
+    return "1" * (len(raw) - len(raw.lstrip(b"\0"))) + out
+
+def pumpfun_mints(logs: List[str]) -> List[str]:
+    """Mints of the pump.fun CreateEvents in a transaction's logs (name, symbol, uri, mint, ...)."""
+    mints = []
+    for line in logs or []:
+        if not line.startswith("Program data: "):
+            continue
+        try:
+            data = base64.b64decode(line[len("Program data: "):])
+            if data[:8] != CREATE_EVENT:
+                continue
+            offset = 8
+            for _ in range(3):  # borsh strings: u32 length + bytes
+                (size,) = struct.unpack_from("<I", data, offset)
+                offset += 4 + size
+            if len(data) >= offset + 32:
+                mints.append(b58encode(data[offset:offset + 32]))
+        except Exception:
+            continue
+    return mints
+
+def is_raydium_init(logs: List[str]) -> bool:
+    return any("initialize2" in line for line in logs or [])
+
+def raydium_mints(tx: Optional[dict]) -> List[str]:
+    """Non-quote mints of the initialize2 instruction(s) in a jsonParsed getTransaction result."""
+    if not tx:
+        return []
+    instructions = list(((tx.get("transaction") or {}).get("message") or {}).get("instructions") or [])
+    for inner in (tx.get("meta") or {}).get("innerInstructions") or []:  # pools created through a router / launchpad
+        instructions.extend(inner.get("instructions") or [])
+
+    mints = []
+    for ix in instructions:
+        accounts = ix.get("accounts") or []
+        if ix.get("programId") == PROGRAMS["raydium"] and len(accounts) > max(RAYDIUM_MINT_ACCOUNTS):
+            mints.extend(accounts[i] for i in RAYDIUM_MINT_ACCOUNTS if accounts[i] not in QUOTE_MINTS)
+    return mints
+
+
+# ---------- sink ----------
+def _first_sighting(mint: str) -> bool:
+    if not mint or mint in QUOTE_MINTS or SEEN.get(mint) is not None:
+        return False
+    SEEN.put(mint, True)
+    _count("mints")
+    return True
+
+def emit(mint: str, source: str, signature: str):
+    """Queues a new mint for the scheduler (each mint once per SEEN_TTL_SEC)."""
+    if _first_sighting(mint):
+        _NEW.put((mint, {"source": source, "signature": signature, "seen_at": time.time()}))
+
+def drain() -> Dict[str, dict]:
+    """Everything emitted since the last call: {mint: {"source", "signature", "seen_at"}}."""
+    found = {}
+    while True:
+        try:
+            mint, info = _NEW.get_nowait()
+        except queue.Empty:
+            return found
+        found.setdefault(mint, info)
+
+
+# ---------- listener ----------
+class PoolListener:
+    """logsSubscribe to each program in `programs`; calls on_mint(mint, source, signature) per new token."""
+
+    def __init__(self, ws_url: str, rpc_url: Optional[str] = None,
+                 on_mint: Callable[[str, str, str], None] = emit, programs: Dict[str, str] = PROGRAMS):
+        self.ws_url = ws_url
+        self.rpc_url = rpc_url or rpc_url_for(ws_url)
+        self.on_mint = on_mint
+        self.programs = dict(programs)
+        self._tasks = set()
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """Listens until `stop` is set, reconnecting with backoff."""
+        import aiohttp
+
+        stop = stop or asyncio.Event()
+        delay = 1.0
+        async with aiohttp.ClientSession() as session:
+            while not stop.is_set():
+                try:
+                    await self._listen(session, stop)
+                    delay = 1.0
+                except Exception as e:
+                    print(f"⚠️ Solana websocket {self.ws_url}: {e}; reconnecting in {delay:g}s")
+                if stop.is_set():
+                    break
+                _count("reconnects")
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, RECONNECT_MAX_SEC)
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _listen(self, session, stop: asyncio.Event):
+        import aiohttp
+
+        async with session.ws_connect(self.ws_url, heartbeat=30) as ws:
+            requested = {}
+            for request_id, (source, program) in enumerate(self.programs.items(), 1):
+                requested[request_id] = source
+                await ws.send_json({
+                    "jsonrpc": "2.0", "id": request_id, "method": "logsSubscribe",
+                    "params": [{"mentions": [program]}, {"commitment": COMMITMENT}],
+                })
+            print(f"⚡ Listening for new pools on {self.ws_url} ({', '.join(self.programs)})")
+
+            subscriptions = {}
+            closer = asyncio.ensure_future(stop.wait())
+            try:
+                while not stop.is_set():
+                    receive = asyncio.ensure_future(ws.receive())
+                    await asyncio.wait({receive, closer}, return_when=asyncio.FIRST_COMPLETED)
+                    if not receive.done():
+                        receive.cancel()
+                        return
+                    msg = receive.result()
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        raise ConnectionError(f"websocket closed ({msg.type.name})")
+                    data = json.loads(msg.data)
+                    if data.get("id") in requested:
+                        if "error" in data:
+                            raise ConnectionError(f"logsSubscribe failed: {data['error']}")
+                        subscriptions[data["result"]] = requested.pop(data["id"])
+                    elif data.get("method") == "logsNotification":
+                        params = data.get("params") or {}
+                        source = subscriptions.get(params.get("subscription"))
+                        value = (params.get("result") or {}).get("value") or {}
+                        if source:
+                            await self.handle(session, source, value)
+            finally:
+                closer.cancel()
+
+    async def handle(self, session, source: str, value: dict):
+        """One logsNotification value: {"signature", "err", "logs"}."""
+        _count("notifications")
+        if value.get("err") is not None:  # failed transaction: nothing was created
+            return
+        signature, logs = value.get("signature", ""), value.get("logs") or []
+        if source == "pumpfun":
+            for mint in pumpfun_mints(logs):
+                _count("pools")
+                self.on_mint(mint, source, signature)
+        elif source == "raydium" and is_raydium_init(logs):
+            _count("pools")
+            # the mints need a getTransaction round trip; don't hold up the socket for it
+            task = asyncio.ensure_future(self._raydium(session, signature))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _raydium(self, session, signature: str):
+        tx = await self.get_transaction(session, signature)
+        if tx is None:
+            _count("failed_tx")
+            return
+        for mint in raydium_mints(tx):
+            self.on_mint(mint, "raydium", signature)
+
+    async def get_transaction(self, session, signature: str) -> Optional[dict]:
+        import aiohttp
+
+        payload = {
+            "jsonrpc": "2.0", "id": 1, "method": "getTransaction",
+            "params": [signature, {"encoding": "jsonParsed", "commitment": COMMITMENT,
+                                   "maxSupportedTransactionVersion": 0}],
+        }
+        for attempt in range(TX_FETCH_RETRIES):
+            try:
+                async with session.post(self.rpc_url, json=payload, timeout=aiohttp.ClientTimeout(total=10)) as res:
+                    result = (await res.json(content_type=None)).get("result")
+                if result is not None:
+                    return result
+            except Exception as e:
+                print(f"⚠️ getTransaction {signature[:12]}…: {e}")
+            await asyncio.sleep(TX_FETCH_DELAY_SEC * (attempt + 1))
+        return None
+
+
+def start_listener(ws_url: Optional[str] = None, rpc_url: Optional[str] = None) -> threading.Thread:
+    """Runs a PoolListener on a daemon thread; new mints go to drain()."""
+    listener = PoolListener(ws_url or SOLANA_WS_URL, rpc_url)
+    thread = threading.Thread(target=lambda: asyncio.run(listener.run()), name="solana-pools", daemon=True)
+    thread.start()
+    return thread
+
+
+# ---------- replay stub + recorder ----------
+def load_events(path=EVENTS_FILE) -> dict:
+    """{"events": [{"at", "program", "value"}], "transactions": {signature: getTransaction result}}."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+async def serve_stub(path=EVENTS_FILE, host: str = "127.0.0.1", port: int = 8900, speed: float = 1.0):
+    """
+    A local stand-in for a Solana RPC node: the websocket answers
+    logsSubscribe and then replays the recorded notifications for the
+    subscribed programs (at their recorded pace / speed); POST answers
+    getTransaction from the recording. Returns the aiohttp runner.
+    """
+    from aiohttp import web
+
+    recorded = load_events(path)
+
+    async def replay(ws, subscriptions):
+        await asyncio.sleep(0.1)  # let every logsSubscribe land first
+        started = time.monotonic()
+        for event in recorded["events"]:
+            wait = event.get("at", 0) / max(speed, 1e-9) - (time.monotonic() - started)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            sub_id = subscriptions.get(event["program"])
+            if sub_id is None or ws.closed:
+                continue
+            await ws.send_json({"jsonrpc": "2.0", "method": "logsNotification", "params": {
+                "subscription": sub_id,
+                "result": {"context": {"slot": 0}, "value": event["value"]},
+            }})
+
+    async def handler(request):
+        if request.method == "POST":
+            body = await request.json()
+            result = None
+            if body.get("method") == "getTransaction":
+                result = recorded["transactions"].get(body["params"][0])
+            return web.json_response({"jsonrpc": "2.0", "id": body.get("id"), "result": result})
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscriptions, replaying = {}, None
+        async for msg in ws:
+            body = json.loads(msg.data)
+            if body.get("method") != "logsSubscribe":
+                await ws.send_json({"jsonrpc": "2.0", "id": body.get("id"),
+                                    "error": {"code": -32601, "message": "Method not found"}})
+                continue
+            subscriptions[body["params"][0]["mentions"][0]] = len(subscriptions) + 1
+            await ws.send_json({"jsonrpc": "2.0", "id": body.get("id"), "result": len(subscriptions)})
+            replaying = replaying or asyncio.ensure_future(replay(ws, subscriptions))
+        if replaying:
+            replaying.cancel()
+        return ws
+
+    app = web.Application()
+    app.router.add_route("*", "/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+class _RecordingListener(PoolListener):
+    """Keeps every notification (and fetched transaction) in the stub's file format."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = time.monotonic()
+        self.recorded = {"recorded_at_ms": int(time.time() * 1000), "events": [], "transactions": {}}
+
+    async def handle(self, session, source, value):
+        self.recorded["events"].append({
+            "at": round(time.monotonic() - self.started, 3), "program": self.programs[source], "value": value,
+        })
+        await super().handle(session, source, value)
+
+    async def get_transaction(self, session, signature):
+        tx = await super().get_transaction(session, signature)
+        if tx is not None:
+            self.recorded["transactions"][signature] = tx
+        return tx
+
+
+async def _run_for(listener: PoolListener, seconds: Optional[float]):
+    stop = asyncio.Event()
+    task = asyncio.ensure_future(listener.run(stop))
+    try:
+        await asyncio.wait_for(asyncio.shield(task), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+    stop.set()
+    await task
+
+def _printer(started: float):
+    def on_mint(mint, source, signature):
+        if _first_sighting(mint):
+            print(f"⚡ +{time.monotonic() - started:6.2f}s {source:<8} {mint}  (tx {signature[:16]}…)")
+    return on_mint
+
+async def _replay(path, speed: float, seconds: float):
+    runner = await serve_stub(path, port=0, speed=speed)
+    port = runner.addresses[0][1]
+    listener = PoolListener(f"ws://127.0.0.1:{port}/", on_mint=_printer(time.monotonic()))
+    try:
+        await _run_for(listener, seconds)
+    finally:
+        await runner.cleanup()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="onchain.py", description="Solana new-pool listener")
+    commands = parser.add_subparsers(dest="command", required=True)
+    listen = commands.add_parser("listen", help="print new mints from an RPC websocket")
+    record = commands.add_parser("record", help="capture events into a replay file")
+    for p in (listen, record):
+        p.add_argument("--ws", default=SOLANA_WS_URL, help="RPC websocket (default: $SOLANA_WS_URL)")
+        p.add_argument("--rpc", default=None, help="RPC http endpoint (default: derived from --ws)")
+        p.add_argument("--seconds", type=float, default=None, help="stop after this long")
+    record.add_argument("--out", required=True)
+    stub = commands.add_parser("stub", help="serve a recorded file as a local RPC (ws + getTransaction)")
+    replay = commands.add_parser("replay", help="stub + listener in one process")
+    for p in (stub, replay):
+        p.add_argument("--events", default=str(EVENTS_FILE))
+        p.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    stub.add_argument("--port", type=int, default=8900)
+    replay.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+        asyncio.run(_replay(args.events, args.speed, args.seconds))
+        print(f"📦 {stats()}")
+        return 0
+
+    if args.command == "stub":
+        async def serve():
+            await serve_stub(args.events, port=args.port, speed=args.speed)
+            print(f"🧪 Replaying {args.events} on ws://127.0.0.1:{args.port}/ (Ctrl+C to stop)")
+            await asyncio.Event().wait()
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if not args.ws:
+        print("❌ No websocket endpoint: pass --ws or set SOLANA_WS_URL")
+        return 1
+    if args.command == "listen":
+        try:
+            asyncio.run(_run_for(PoolListener(args.ws, args.rpc, on_mint=_printer(time.monotonic())), args.seconds))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    listener = _RecordingListener(args.ws, args.rpc, on_mint=_printer(time.monotonic()))
+    try:
+        asyncio.run(_run_for(listener, args.seconds))
+    except KeyboardInterrupt:
+        pass
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(listener.recorded, f, indent=2)
+    print(f"💾 {len(listener.recorded['events'])} events, {len(listener.recorded['transactions'])} transactions -> {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
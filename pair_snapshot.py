@@ -0,0 +1,110 @@
+# pair_snapshot.py
+"""
+PairSnapshot: one DEX Screener pair, parsed once into the fields the bot
+reads (numbers as floats; websites, socials and info blobs are dropped),
+plus the market / Rugcheck / trade fields the pipeline attaches to it.
+
+screener.py converts every API payload on arrival; filters, trader,
+tracker, log_formatter and the Telegram sender only ever see snapshots.
+"""
+from copy import copy
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+
+def _f(x, default: float = 0.0) -> float:
+    try:
+        return float(x)
+    except Exception:
+        return float(default)
+
+def _d(x) -> dict:
+    return x if isinstance(x, dict) else {}
+
+
+@dataclass(slots=True)
+class PairSnapshot:
+    pair_address: str = ""
+    chain_id: str = ""
+    url: str = ""
+    base_address: str = ""
+    base_symbol: str = "N/A"
+    quote_symbol: str = "N/A"
+    price_text: str = "N/A"          # priceUsd as sent; alerts show it verbatim
+    price: float = 0.0
+    liq: float = 0.0
+    fdv: float = 0.0                 # fdv, else marketCap (what the market checks use)
+    market_cap: float = 0.0
+    created_ms: int = 0
+    v1h: float = 0.0
+    v6h: float = 0.0
+    v24h: float = 0.0
+    buys_h1: float = 0.0
+    sells_h1: float = 0.0
+    buys_h6: float = 0.0
+    sells_h6: float = 0.0
+    m5: float = 0.0                  # price change, %
+    h1c: float = 0.0
+    h24c: Optional[float] = None     # None: the API sent no priceChange.h24 (alerts show N/A)
+
+    # attached by scan.py / tracker.py / trader.py
+    count: int = 0
+    market_label: Optional[str] = None
+    market_score: Optional[float] = None
+    potential_multiple: Optional[float] = None
+    market_checks: Optional[Dict[str, Any]] = None
+    rug_status: Optional[str] = None
+    rug_score: Optional[int] = None
+    rug_reasons: Optional[List[str]] = None
+    rug_link: Optional[str] = None
+    trade_signal: str = "No Signal"
+    trade_reasons: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_api(cls, raw: Dict[str, Any]) -> "PairSnapshot":
+        """Parses a raw DEX Screener pair; missing or malformed numbers become 0."""
+        base = _d(raw.get("baseToken"))
+        quote = _d(raw.get("quoteToken"))
+        volume = _d(raw.get("volume"))
+        txns = _d(raw.get("txns"))
+        h1, h6 = _d(txns.get("h1")), _d(txns.get("h6"))
+        change = _d(raw.get("priceChange"))
+        return cls(
+            pair_address=raw.get("pairAddress") or "",
+            chain_id=raw.get("chainId") or "",
+            url=raw.get("url", ""),
+            base_address=base.get("address", ""),
+            base_symbol=base.get("symbol", "N/A"),
+            quote_symbol=quote.get("symbol", "N/A"),
+            price_text=str(raw["priceUsd"]) if "priceUsd" in raw else "N/A",
+            price=_f(raw.get("priceUsd")),
+            liq=_f(_d(raw.get("liquidity")).get("usd")),
+            fdv=_f(raw.get("fdv", raw.get("marketCap", 0))),
+            market_cap=_f(raw.get("marketCap")),
+            created_ms=int(_f(raw.get("pairCreatedAt") or 0)),
+            v1h=_f(volume.get("h1")),
+            v6h=_f(volume.get("h6")),
+            v24h=_f(volume.get("h24")),
+            buys_h1=_f(h1.get("buys")),
+            sells_h1=_f(h1.get("sells")),
+            buys_h6=_f(h6.get("buys")),
+            sells_h6=_f(h6.get("sells")),
+            m5=_f(change.get("m5")),
+            h1c=_f(change.get("h1")),
+            h24c=None if change.get("h24") is None else _f(change["h24"]),
+        )
+
+    def copy(self) -> "PairSnapshot":
+        """Shallow copy (caches hand these out so attached fields stay per caller)."""
+        return copy(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PairSnapshot":
+        """Inverse of to_dict(); unknown keys are ignored."""
+        return cls(**{k: v for k, v in data.items() if k in FIELD_NAMES})
+
+
+FIELD_NAMES = frozenset(f.name for f in fields(PairSnapshot))
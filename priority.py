@@ -0,0 +1,170 @@
+# priority.py
+"""
+Evaluation order for discovered tokens. Each cycle can only hydrate and
+score so much before its deadline (budget.py), so candidates are ranked by
+cheap signals we already hold and the highest expected value goes first:
+
+  boost         largest boost amount seen (boost feeds)
+  sources       which discovery feeds listed it (and carried-over tokens)
+  age_sec       time since the token was first discovered (newer = better)
+  tracked       already a tracked pair
+  market_score  its last market score, if tracked (0..100)
+
+A ranker maps those signals to a float (higher = sooner). It is pluggable:
+PRIORITY_RANKER names one of RANKERS, or set_ranker(fn) installs any
+callable. Each rank() is measured; report() adds where the tokens that
+went on to pass were ranked, which is how rankers are compared.
+"""
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional
+import math
+import os
+import time
+
+from cache import PersistentTTLCache
+from state_store import get_store
+
+# ---- Configs you can tune ----
+PRIORITY_RANKER = os.getenv("PRIORITY_RANKER", "expected_value")
+FEED_WEIGHTS = {                 # per discovery feed; a token takes its best feed
+    "deferred": 1.0,             # carried over from a cycle that ran out of budget
+    "boosts_top": 0.8,
+    "boosts_latest": 0.6,
+    "profiles_latest": 0.3,
+}
+BOOST_FULL = 500                 # boost amount that earns the full boost weight (log scale)
+RECENCY_HALF_LIFE_SEC = 1800     # first seen this long ago = half the recency weight
+WEIGHTS = {"boost": 1.0, "feed": 1.0, "recency": 1.0, "tracked": 0.5, "market_score": 1.5}
+
+FIRST_SEEN_FILE = "first_seen.json"
+FIRST_SEEN_TTL_SEC = 24 * 3600
+FIRST_SEEN = PersistentTTLCache(FIRST_SEEN_FILE, maxsize=50_000, stale_ttl_sec=0)
+
+Ranker = Callable[[dict], float]
+
+
+# ---------- rankers ----------
+def expected_value(signals: dict) -> float:
+    """Weighted sum of the signals, each scaled to 0..1."""
+    boost = min(1.0, math.log1p(max(0.0, signals["boost"])) / math.log1p(BOOST_FULL))
+    feed = max((FEED_WEIGHTS.get(s, 0.0) for s in signals["sources"]), default=0.0)
+    recency = 0.5 ** (signals["age_sec"] / RECENCY_HALF_LIFE_SEC)
+    score = signals["market_score"]
+    return (WEIGHTS["boost"] * boost + WEIGHTS["feed"] * feed + WEIGHTS["recency"] * recency
+            + WEIGHTS["tracked"] * signals["tracked"]
+            + WEIGHTS["market_score"] * (0.0 if score is None else min(1.0, max(0.0, score / 100.0))))
+
+def discovery_order(signals: dict) -> float:
+    """The feeds' own order (everything ties; sorting is stable). A baseline for report()."""
+    return 0.0
+
+RANKERS: Dict[str, Ranker] = {
+    "expected_value": expected_value,
+    "discovery_order": discovery_order,
+}
+
+_RANKER: Optional[Ranker] = None
+_LOCK = Lock()
+_STATS = {"tokens": 0, "tracked": 0, "new": 0, "ms": 0.0}
+_POSITIONS: Dict[tuple, float] = {}   # (chain, token) -> rank / ranked, 0 = first; last rank() per chain
+
+
+def set_ranker(fn: Optional[Ranker]):
+    """Installs a ranker (None = back to PRIORITY_RANKER)."""
+    global _RANKER
+    _RANKER = fn
+
+def ranker() -> Ranker:
+    if _RANKER is not None:
+        return _RANKER
+    if PRIORITY_RANKER not in RANKERS:
+        print(f"⚠️ Unknown PRIORITY_RANKER {PRIORITY_RANKER!r}; using expected_value")
+        return expected_value
+    return RANKERS[PRIORITY_RANKER]
+
+def ranker_name() -> str:
+    return getattr(ranker(), "__name__", "custom")
+
+
+# ---------- signals ----------
+def _tracked_scores(chain_id: str, store=None) -> Dict[str, Optional[float]]:
+    """{mint: last market_score} for the chain's tracked pairs."""
+    scores = {}
+    for entry in (store or get_store()).load_pairs(chain=chain_id).values():
+        if entry.get("mint"):
+            scores[entry["mint"]] = entry.get("market_score")
+    return scores
+
+def signals(chain_id: str, candidates: Dict[str, dict], store=None, now: Optional[float] = None) -> Dict[str, dict]:
+    """{token: signals} for a chain's candidates ({token: {"boost", "sources"}}); records first sightings."""
+    now = time.time() if now is None else now
+    tracked = _tracked_scores(chain_id, store)
+    out = {}
+    for address, info in candidates.items():
+        key = f"{chain_id}:{address}"
+        first_seen, _ = FIRST_SEEN.get(key)
+        if first_seen is None:
+            first_seen = now
+            FIRST_SEEN.put(key, now, FIRST_SEEN_TTL_SEC)
+        out[address] = {
+            "boost": float(info.get("boost") or 0.0),
+            "sources": tuple(info.get("sources") or ()),
+            "age_sec": max(0.0, now - first_seen),
+            "tracked": address in tracked,
+            "market_score": tracked.get(address),
+        }
+    return out
+
+
+# ---------- ranking ----------
+def rank(chain_id: str, candidates: Dict[str, dict], store=None, now: Optional[float] = None) -> List[str]:
+    """Candidate tokens, highest priority first (ties keep discovery order)."""
+    t0 = time.perf_counter()
+    sigs = signals(chain_id, candidates, store, now)
+    try:
+        fn = ranker()
+        priority = {address: float(fn(s)) for address, s in sigs.items()}
+    except Exception as e:
+        print(f"⚠️ Ranker {ranker_name()} failed ({e}); keeping discovery order")
+        priority = dict.fromkeys(sigs, 0.0)
+    ordered = sorted(sigs, key=lambda a: -priority[a])
+
+    with _LOCK:
+        for key in [k for k in _POSITIONS if k[0] == chain_id]:
+            del _POSITIONS[key]
+        for i, address in enumerate(ordered):
+            _POSITIONS[(chain_id, address)] = i / len(ordered)
+        _STATS["tokens"] += len(ordered)
+        _STATS["tracked"] += sum(s["tracked"] for s in sigs.values())
+        _STATS["new"] += sum(s["age_sec"] == 0 for s in sigs.values())
+        _STATS["ms"] += (time.perf_counter() - t0) * 1000
+    return ordered
+
+def save_first_seen():
+    FIRST_SEEN.save()
+
+
+# ---------- metrics ----------
+def report(passed_pairs: Iterable = (), reset: bool = True) -> Dict[str, float]:
+    """
+    Counters for the rank() calls since the last reset, plus where the
+    passed pairs' tokens sat in the order (rank / ranked: 0 = first).
+    Prints one line when anything was ranked.
+    """
+    with _LOCK:
+        positions = [p for p in (_POSITIONS.get((pair.chain_id, pair.base_address)) for pair in passed_pairs)
+                     if p is not None]
+        stats = dict(_STATS, ms=round(_STATS["ms"], 2), passed=len(positions))
+        if positions:
+            stats["passed_top_quartile"] = sum(p < 0.25 for p in positions)
+            stats["passed_mean_rank_pct"] = round(100 * sum(positions) / len(positions), 1)
+        if reset:
+            _STATS.update(tokens=0, tracked=0, new=0, ms=0.0)
+            _POSITIONS.clear()
+
+    if stats["tokens"]:
+        passed = (f" | passed tokens ranked {stats['passed_mean_rank_pct']:.0f}% down on average, "
+                  f"{stats['passed_top_quartile']}/{len(positions)} in the top quarter") if positions else ""
+        print(f"🎯 Priority ({ranker_name()}): {stats['tokens']} ranked in {stats['ms']:.1f} ms "
+              f"({stats['tracked']} tracked, {stats['new']} new){passed}")
+    return stats
@@ -0,0 +1,220 @@
+# recorder.py
+"""
+Optional raw snapshot archive for offline replay (see replay.py).
+
+Every pair fetched from DEX Screener is buffered as one row; flush() writes
+the buffer as a compressed columnar part file (np.savez_compressed, one
+array per column) under an hourly partition:
+
+    snapshots/2026-10-18/14/part-1760796000123-0001.npz
+
+Parts are immutable, so appending never rewrites older data.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+import itertools
+import math
+import os
+import time
+
+import numpy as np
+
+from pair_snapshot import PairSnapshot
+
+# ---- Configs you can tune ----
+RECORD_SNAPSHOTS = os.getenv("RECORD_SNAPSHOTS", "0") == "1"
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "snapshots"))
+FLUSH_ROWS = 20_000           # flush early if a cycle buffers this many rows
+
+# column -> path into the DEX Screener pair
+NUM_COLUMNS = {
+    "price": ("priceUsd",),
+    "liq": ("liquidity", "usd"),
+    "fdv": ("fdv",),
+    "mcap": ("marketCap",),
+    "v1h": ("volume", "h1"),
+    "v6h": ("volume", "h6"),
+    "v24h": ("volume", "h24"),
+    "buys_h1": ("txns", "h1", "buys"),
+    "sells_h1": ("txns", "h1", "sells"),
+    "buys_h6": ("txns", "h6", "buys"),
+    "sells_h6": ("txns", "h6", "sells"),
+    "m5": ("priceChange", "m5"),
+    "h1c": ("priceChange", "h1"),
+    "h6c": ("priceChange", "h6"),
+    "h24c": ("priceChange", "h24"),
+}
+STR_COLUMNS = {
+    "pair": ("pairAddress",),
+    "chain": ("chainId",),
+    "mint": ("baseToken", "address"),
+    "symbol": ("baseToken", "symbol"),
+}
+# ts (unix seconds) and created_ms are stored as their own columns
+
+
+def _dig(pair: dict, path) -> object:
+    value = pair
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+def _num(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class SnapshotRecorder:
+    """Buffers pair snapshots and writes them as hourly-partitioned columnar parts."""
+
+    def __init__(self, root=SNAPSHOT_DIR, flush_rows: int = FLUSH_ROWS):
+        self.root = Path(root)
+        self.flush_rows = flush_rows
+        self._rows: List[tuple] = []
+        self._lock = Lock()
+        self._seq = itertools.count(1)
+
+    def add(self, pairs: Iterable[dict], ts: Optional[float] = None):
+        ts = time.time() if ts is None else ts
+        rows = []
+        for pair in pairs:
+            if not pair or not pair.get("pairAddress"):
+                continue
+            created = _num(pair.get("pairCreatedAt"))
+            rows.append((
+                ts,
+                0 if math.isnan(created) else int(created),
+                *(_num(_dig(pair, path)) for path in NUM_COLUMNS.values()),
+                *(str(_dig(pair, path) or "") for path in STR_COLUMNS.values()),
+            ))
+        with self._lock:
+            self._rows.extend(rows)
+            full = len(self._rows) >= self.flush_rows
+        if full:
+            self.flush()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def flush(self) -> List[Path]:
+        """Writes buffered rows (one part per hour they span). Returns the files written."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return []
+
+        written = []
+        by_hour: Dict[str, List[tuple]] = {}
+        for row in rows:
+            hour = datetime.fromtimestamp(row[0], tz=timezone.utc).strftime("%Y-%m-%d/%H")
+            by_hour.setdefault(hour, []).append(row)
+
+        for hour, part in by_hour.items():
+            cols = list(zip(*part))
+            arrays = {"ts": np.array(cols[0], dtype=np.float64), "created_ms": np.array(cols[1], dtype=np.int64)}
+            offset = 2
+            for i, name in enumerate(NUM_COLUMNS):
+                arrays[name] = np.array(cols[offset + i], dtype=np.float64)
+            offset += len(NUM_COLUMNS)
+            for i, name in enumerate(STR_COLUMNS):
+                arrays[name] = np.array(cols[offset + i], dtype=str)
+
+            out_dir = self.root / hour
+            path = out_dir / f"part-{int(time.time() * 1000)}-{next(self._seq):04d}.npz"
+            try:
+                out_dir.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(path.name + ".tmp")
+                with open(tmp, "wb") as f:
+                    np.savez_compressed(f, **arrays)
+                os.replace(tmp, path)
+                written.append(path)
+            except Exception as e:
+                print(f"⚠️ Failed to write snapshots to {path}: {e}")
+        return written
+
+
+# ---------- reading ----------
+def _utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+def _partition_hours(root: Path, start: Optional[datetime], end: Optional[datetime]):
+    for day_dir in sorted(p for p in root.glob("*") if p.is_dir()):
+        for hour_dir in sorted(p for p in day_dir.glob("*") if p.is_dir()):
+            try:
+                hour = _utc(datetime.strptime(f"{day_dir.name}/{hour_dir.name}", "%Y-%m-%d/%H"))
+            except ValueError:
+                continue
+            if start and hour.timestamp() + 3600 <= _utc(start).timestamp():
+                continue
+            if end and hour >= _utc(end):
+                continue
+            yield hour_dir
+
+def load_snapshots(root=SNAPSHOT_DIR, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+    """
+    All columns for snapshots in [start, end) (naive datetimes are UTC), sorted
+    by (pair, ts). Only partitions overlapping the window are opened.
+    """
+    root = Path(root)
+    parts = [path for hour_dir in _partition_hours(root, start, end) for path in sorted(hour_dir.glob("part-*.npz"))]
+    names = ["ts", "created_ms", *NUM_COLUMNS, *STR_COLUMNS]
+    if not parts:
+        return {name: np.array([], dtype=str if name in STR_COLUMNS else np.float64) for name in names}
+
+    chunks = {name: [] for name in names}
+    for path in parts:
+        with np.load(path, allow_pickle=False) as data:
+            for name in names:
+                chunks[name].append(data[name])
+    frame = {name: np.concatenate(arrays) for name, arrays in chunks.items()}
+
+    keep = np.ones(len(frame["ts"]), dtype=bool)
+    if start:
+        keep &= frame["ts"] >= _utc(start).timestamp()
+    if end:
+        keep &= frame["ts"] < _utc(end).timestamp()
+    order = np.lexsort((frame["ts"][keep], frame["pair"][keep]))
+    return {name: col[keep][order] for name, col in frame.items()}
+
+def row_to_pair(frame: Dict[str, np.ndarray], i: int) -> PairSnapshot:
+    """Rebuilds the PairSnapshot for row i (recorded fields only; NaN reads as missing)."""
+    def num(name):
+        v = float(frame[name][i])
+        return 0.0 if math.isnan(v) else v
+
+    price, fdv, mcap = (float(frame[name][i]) for name in ("price", "fdv", "mcap"))
+    return PairSnapshot(
+        pair_address=str(frame["pair"][i]),
+        chain_id=str(frame["chain"][i]),
+        base_address=str(frame["mint"][i]),
+        base_symbol=str(frame["symbol"][i]),
+        price_text="N/A" if math.isnan(price) else repr(price),
+        price=num("price"),
+        liq=num("liq"),
+        fdv=fdv if not math.isnan(fdv) else num("mcap"),
+        market_cap=num("mcap"),
+        created_ms=int(frame["created_ms"][i]),
+        v1h=num("v1h"), v6h=num("v6h"), v24h=num("v24h"),
+        buys_h1=num("buys_h1"), sells_h1=num("sells_h1"),
+        buys_h6=num("buys_h6"), sells_h6=num("sells_h6"),
+        m5=num("m5"), h1c=num("h1c"), h24c=None if math.isnan(float(frame["h24c"][i])) else num("h24c"),
+    )
+
+
+# ---------- process-wide recorder ----------
+RECORDER = SnapshotRecorder()
+
+def record_pairs(pairs: Iterable[dict]):
+    if RECORD_SNAPSHOTS:
+        RECORDER.add(pairs)
+
+def flush():
+    if RECORD_SNAPSHOTS:
+        RECORDER.flush()
@@ -0,0 +1,160 @@
+# replay.py
+"""
+Offline replay of recorded snapshots (recorder.py) through the live signal
+engine, on a simulated clock, with forward returns per emitted signal.
+
+    python replay.py --start 2026-10-01 --end 2026-10-08 --horizons 1h,6h,24h
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+import trader
+from recorder import SNAPSHOT_DIR, load_snapshots, row_to_pair
+
+# ---- Configs you can tune ----
+HORIZONS = ("1h", "6h", "24h")
+FORWARD_TOLERANCE = 0.5       # a future snapshot may be up to this fraction of the horizon late
+SIGNALS = ("Entry", "Watching", "Exit", "No Signal")
+
+_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_horizon(text: str) -> int:
+    """'90m' / '6h' / '1d' -> seconds."""
+    text = text.strip().lower()
+    return int(float(text[:-1]) * _UNITS[text[-1]]) if text[-1] in _UNITS else int(text)
+
+
+class SimClock:
+    """The wall clock trader._now() sees during replay."""
+    __slots__ = ("t",)
+
+    def __init__(self, t: float = 0.0):
+        self.t = t
+
+    def now(self) -> datetime:
+        return datetime.utcfromtimestamp(self.t)
+
+
+def replay_signals(frame: Dict[str, np.ndarray], max_len: int = trader.HISTORY_LEN) -> np.ndarray:
+    """
+    Feeds each pair's snapshots, in time order, through update_histories +
+    get_trade_signal with fresh meta per pair. Returns the signal per row.
+    """
+    n = len(frame["ts"])
+    signals = np.empty(n, dtype=object)
+    clock = SimClock()
+    pair_col, ts_col = frame["pair"], frame["ts"]
+
+    with trader.use_clock(clock.now):
+        meta, current = {}, None
+        for i in range(n):
+            if pair_col[i] != current:
+                meta, current = {}, pair_col[i]
+            clock.t = float(ts_col[i])
+            trader.update_histories(meta, row_to_pair(frame, i), max_len=max_len)
+            signals[i] = trader.get_trade_signal(meta)[0]
+    return signals
+
+def forward_returns(frame: Dict[str, np.ndarray], horizon_sec: int,
+                    tolerance: float = FORWARD_TOLERANCE) -> np.ndarray:
+    """% price change from each row to the same pair's first snapshot >= horizon later (NaN if none)."""
+    ts, price, pairs = frame["ts"], frame["price"], frame["pair"]
+    out = np.full(len(ts), np.nan)
+    if not len(ts):
+        return out
+
+    starts = np.flatnonzero(np.r_[True, pairs[1:] != pairs[:-1]])
+    ends = np.r_[starts[1:], len(ts)]
+    for lo, hi in zip(starts, ends):
+        t = ts[lo:hi]
+        j = np.searchsorted(t, t + horizon_sec, side="left")
+        ok = j < len(t)
+        jj = np.where(ok, j, 0)
+        ok &= (t[jj] - t) <= horizon_sec * (1 + tolerance)
+        p0, p1 = price[lo:hi], price[lo:hi][jj]
+        ok &= (p0 > 0) & np.isfinite(p1)
+        out[lo:hi][ok] = (p1[ok] / p0[ok] - 1) * 100
+    return out
+
+def summarize(signals: np.ndarray, fwd: Dict[str, np.ndarray]) -> List[dict]:
+    """One row per signal: count + mean/median/hit-rate of forward returns per horizon."""
+    rows = []
+    for signal in SIGNALS:
+        mask = signals == signal
+        row = {"signal": signal, "n": int(mask.sum())}
+        for label, values in fwd.items():
+            v = values[mask]
+            v = v[np.isfinite(v)]
+            row[label] = {
+                "n": int(len(v)),
+                "mean_pct": round(float(v.mean()), 2) if len(v) else None,
+                "median_pct": round(float(np.median(v)), 2) if len(v) else None,
+                "hit_rate": round(float((v > 0).mean()), 3) if len(v) else None,
+            }
+        rows.append(row)
+    return rows
+
+def backtest(frame: Dict[str, np.ndarray], horizons: Sequence[str] = HORIZONS) -> dict:
+    t0 = time.perf_counter()
+    signals = replay_signals(frame)
+    fwd = {h: forward_returns(frame, parse_horizon(h)) for h in horizons}
+    wall = time.perf_counter() - t0
+
+    ts = frame["ts"]
+    span = float(ts.max() - ts.min()) if len(ts) else 0.0
+    return {
+        "rows": int(len(ts)),
+        "pairs": int(len(np.unique(frame["pair"]))) if len(ts) else 0,
+        "simulated_sec": round(span, 1),
+        "wall_sec": round(wall, 3),
+        "speedup": round(span / wall) if wall and span else None,
+        "signals": summarize(signals, fwd),
+    }
+
+def format_report(result: dict, horizons: Sequence[str]) -> str:
+    lines = [
+        f"🧪 {result['rows']:,} snapshots | {result['pairs']:,} pairs | "
+        f"{result['simulated_sec'] / 3600:,.1f}h simulated in {result['wall_sec']:.2f}s"
+        + (f" (x{result['speedup']:,})" if result["speedup"] else ""),
+        f"{'signal':<10} {'n':>7} " + " ".join(f"{h + ' mean/med/hit':>26}" for h in horizons),
+    ]
+    for row in result["signals"]:
+        cells = []
+        for h in horizons:
+            c = row[h]
+            cells.append(f"{'-':>26}" if c["mean_pct"] is None else
+                         f"{c['mean_pct']:>8.2f}% {c['median_pct']:>7.2f}% {c['hit_rate']:>6.0%}")
+        lines.append(f"{row['signal']:<10} {row['n']:>7} " + " ".join(cells))
+    return "\n".join(lines)
+
+def _date(text: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(text) if text else None
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded snapshots through the trade signal engine")
+    parser.add_argument("--root", default=str(SNAPSHOT_DIR), help="snapshot archive (recorder.py)")
+    parser.add_argument("--start", help="UTC start, ISO format (inclusive)")
+    parser.add_argument("--end", help="UTC end, ISO format (exclusive)")
+    parser.add_argument("--horizons", default=",".join(HORIZONS), help="forward-return horizons, e.g. 30m,1h,6h")
+    parser.add_argument("--json", action="store_true", help="print the raw result as JSON")
+    args = parser.parse_args(argv)
+
+    horizons = [h.strip() for h in args.horizons.split(",") if h.strip()]
+    frame = load_snapshots(args.root, _date(args.start), _date(args.end))
+    if not len(frame["ts"]):
+        print(f"⚠️ No snapshots under {args.root} for that window")
+        return 1
+
+    result = backtest(frame, horizons)
+    print(json.dumps(result, indent=2) if args.json else format_report(result, horizons))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
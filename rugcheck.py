@@ -1,14 +1,39 @@
-import requests
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Set
+from cache import PersistentTTLCache
+from budget import Deferred
+from http_client import http_get
 
 RUGCHECK_BASE_URL = "https://api.rugcheck.xyz/v1/tokens"
 
+# ---- Report cache (on disk, survives restarts) ----
+RUG_CACHE_FILE = "rugcheck_cache.json"
+RUG_CACHE_MAX = 5000
+RUG_STALE_SEC = 6 * 3600   # how long past expiry a stale entry may still be served
+RUG_TTL_SEC = {            # per last status; Risky tokens are re-checked sooner
+    "safe": 3600,
+    "risky": 900,
+    "danger": 3600,
+    "rugged": 24 * 3600,
+}
+REFRESH_DRAIN_SEC = 15     # how long a one-shot run waits for background refreshes before saving
+
+RUG_CACHE = PersistentTTLCache(RUG_CACHE_FILE, maxsize=RUG_CACHE_MAX, stale_ttl_sec=RUG_STALE_SEC)
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rugcheck-refresh")
+_REFRESHING = set()
+_PENDING: Set[Future] = set()   # submitted refreshes not finished yet (see drain_refreshes)
+_REFRESHING_LOCK = Lock()
+
 def get_rugcheck_report(mint: str):
     url = f"{RUGCHECK_BASE_URL}/{mint}/report"
     try:
-        resp = requests.get(url, timeout=5)
+        resp = http_get(url, timeout=5)
         if resp.status_code != 200:
             return None
         return resp.json()
+    except Deferred:
+        raise  # not a failed fetch: the caller defers this mint
     except Exception as e:
         return None
 
@@ -75,3 +100,97 @@ def evaluate_rugcheck(report: dict):
     rugcheck_link = f"https://rugcheck.xyz/tokens/{report.get('mint')}"
 
     return status, score, reasons, rugcheck_link
+
+
+# ---------- cached access ----------
+def slim_report(report: dict) -> dict:
+    """Keeps only what evaluate_rugcheck() reads; evaluates identically to the full report."""
+    return {
+        "mint": report.get("mint"),
+        "rugged": report.get("rugged"),
+        "topHolders": [{"pct": h["pct"]} for h in report.get("topHolders", [])[:10]],
+        "totalHolders": report.get("totalHolders", 0),
+        "markets": [
+            {"lp": {"lpLockedPct": m.get("lp", {}).get("lpLockedPct", 0)}}
+            for m in report.get("markets", [])
+        ],
+        "creatorBalance": report.get("creatorBalance", 1),
+        "transferFee": {"pct": report.get("transferFee", {}).get("pct", 0)},
+        "mintAuthority": report.get("mintAuthority"),
+        "freezeAuthority": report.get("freezeAuthority"),
+        "risks": [{"description": r.get("description")} for r in report.get("risks", [])],
+        "graphInsidersDetected": report.get("graphInsidersDetected", 0),
+    }
+
+def _ttl_for(status: str) -> float:
+    key = status.split()[-1].lower() if status else "rugged"
+    return RUG_TTL_SEC.get(key, min(RUG_TTL_SEC.values()))
+
+def store_rugcheck_report(mint: str, report):
+    """Evaluates a freshly fetched report and caches both. Failed fetches are not cached."""
+    evaluation = evaluate_rugcheck(report)
+    if report is not None:
+        RUG_CACHE.put(mint, {
+            "report": slim_report(report),
+            "evaluation": list(evaluation),
+        }, _ttl_for(evaluation[0]))
+    return evaluation
+
+def _refresh(mint: str):
+    try:
+        report = get_rugcheck_report(mint)
+        if report is not None:  # keep serving the stale entry if Rugcheck is down
+            store_rugcheck_report(mint, report)
+    finally:
+        with _REFRESHING_LOCK:
+            _REFRESHING.discard(mint)
+
+def _revalidate_in_background(mint: str):
+    with _REFRESHING_LOCK:
+        if mint in _REFRESHING:
+            return
+        _REFRESHING.add(mint)
+    future = _REFRESH_POOL.submit(_refresh, mint)
+    with _REFRESHING_LOCK:
+        _PENDING.add(future)
+    future.add_done_callback(_forget)
+
+def _forget(future: Future):
+    with _REFRESHING_LOCK:
+        _PENDING.discard(future)
+
+def drain_refreshes(timeout: float = REFRESH_DRAIN_SEC) -> int:
+    """
+    Waits up to `timeout` for background refreshes, so a one-shot run saves
+    them before exiting. Returns how many are still running.
+    """
+    with _REFRESHING_LOCK:
+        pending = list(_PENDING)
+    if not pending:
+        return 0
+    _, not_done = wait(pending, timeout=timeout)
+    if not_done:
+        print(f"⚠️ {len(not_done)} Rugcheck refresh(es) still running; they are retried next run")
+    return len(not_done)
+
+def get_cached_evaluation(mint: str):
+    """
+    Cached (status, score, reasons, link) or None on a miss.
+    Stale entries are returned as-is and refreshed in the background.
+    """
+    entry, fresh = RUG_CACHE.get(mint)
+    if entry is None:
+        return None
+    if not fresh:
+        _revalidate_in_background(mint)
+    return tuple(entry["evaluation"])
+
+def get_rugcheck_evaluation(mint: str):
+    """Cache-first replacement for evaluate_rugcheck(get_rugcheck_report(mint))."""
+    cached = get_cached_evaluation(mint)
+    if cached is not None:
+        return cached
+    return store_rugcheck_report(mint, get_rugcheck_report(mint))
+
+def save_rugcheck_cache():
+    RUG_CACHE.save()
@@ -0,0 +1,400 @@
+# rules.py
+"""
+Declarative market rules (market_rules.json) compiled into plain Python.
+
+A rules file lists checks (field bands per age category), the group and
+weight each one scores into, which ones gate every label, the labels and
+the reason shown when a check fails. load_rules() turns it into generated
+functions with one comparison chain per predicate and no per-rule
+dispatch, i.e. the same code a hand-written filter would be. Constants are
+read from the profile passed to each call (filters.chain_profile), so one
+rule set serves every chain and sweep combination. The scalar path (score_market) and the numpy path
+(score_market_batch / sweeps) come from the same spec and always agree.
+
+RuleLoader re-reads the file when it changes; a broken edit is reported
+and the previous rules stay active.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from string import Formatter
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import io
+import json
+import os
+import re
+import time
+import tokenize
+
+import numpy as np
+
+# ---- Configs you can tune ----
+RULES_FILE = Path(os.getenv("MARKET_RULES", Path(__file__).with_name("market_rules.json")))
+RELOAD_CHECK_SEC = 2.0        # how often a long-running process stats the rules file
+RULE_TIMING = os.getenv("RULE_TIMING", "0") == "1"   # per-rule timers (two clock reads per rule per pair)
+
+CATEGORIES = ("early", "old")
+PARAMS = ("liq_cap", "liq_limit")   # liq_limit = liq_cap, or +inf when there is no cap
+
+_CONST = re.compile(r"^([A-Z][A-Z0-9_]*)(?:\.([A-Za-z0-9_]+))?$")
+_USD = re.compile(r"^usd\((.+)\)$")
+_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class RuleError(ValueError):
+    """The rules file is invalid."""
+
+
+@dataclass
+class RuleSet:
+    """A compiled rules file plus how often / how long each rule ran."""
+    names: Tuple[str, ...]          # every rule, file order
+    reported: Tuple[int, ...]       # rules shown in market_checks
+    labels: Tuple[str, ...]         # best first
+    scalar: Callable                # (profile, early, liq_cap, liq_limit, upside, *fields) -> (flags, total, base_ok)
+    columns: Callable               # same on numpy columns
+    reasons: Callable               # (profile, flags, early, liq_cap, liq_limit, *fields) -> [str]
+    label: Callable                 # (profile, base_ok, pot, total) -> label or "reject"
+    label_columns: Callable         # (profile, base_ok, pot, total) -> index into labels, -1 = reject
+    prefilter: Callable             # (profile, early, liq_cap, liq_limit, liq, fdv) -> gates on liq/fdv only
+    min_multiple: Callable          # (profile) -> lowest min_multiple of any label
+    source: str = ""
+    seconds: List[float] = field(default_factory=list)
+    evaluated: int = 0
+    fired: List[int] = field(default_factory=list)
+    _lock: Any = field(default_factory=Lock, repr=False)
+
+    def record(self, flags: Sequence[bool]):
+        with self._lock:
+            self.evaluated += 1
+            fired = self.fired
+            for i, ok in enumerate(flags):
+                if not ok:
+                    fired[i] += 1
+
+    def record_columns(self, flag_cols: Sequence[np.ndarray], n: int):
+        with self._lock:
+            self.evaluated += n
+            for i, col in enumerate(flag_cols):
+                self.fired[i] += n - int(np.count_nonzero(col))
+
+    def stats(self, reset: bool = False) -> Dict[str, Dict[str, float]]:
+        """{"evaluated": {"pairs": n}, "fired": {rule: fails}, "seconds": {rule: s}} (seconds only with RULE_TIMING)."""
+        with self._lock:
+            out = {
+                "evaluated": {"pairs": self.evaluated},
+                "fired": dict(zip(self.names, self.fired)),
+            }
+            if RULE_TIMING:
+                out["seconds"] = {name: round(s, 6) for name, s in zip(self.names, self.seconds)}
+            if reset:
+                self.evaluated = 0
+                self.fired[:] = [0] * len(self.names)
+                self.seconds[:] = [0.0] * len(self.names)
+        return out
+
+
+# ---------- spec -> expressions ----------
+def _ref(value, env: Dict[str, Any], names: Sequence[str]) -> str:
+    """A number, a field/param name, or NAME / NAME.key / NAME.0 of a filters constant."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise RuleError(f"bad value {value!r}")
+    if not isinstance(value, str):
+        return repr(value)
+    if value in names:
+        return value
+    m = _CONST.match(value)
+    if not m or m.group(1) not in env:
+        raise RuleError(f"unknown name {value!r}")
+    expr, key = m.group(1), m.group(2)
+    if key is not None:
+        expr += f"[{key}]" if key.isdigit() else f"[{key!r}]"
+    try:
+        float(eval(expr, {m.group(1): env[m.group(1)]}))  # pattern-checked: a constant lookup only
+    except Exception:
+        raise RuleError(f"{value!r} is not a number in filters") from None
+    return expr
+
+def _template(text: str, env: Dict[str, Any], names: Sequence[str]) -> str:
+    """'FDV {fdv:,.0f} > {usd(EARLY_FDV_MAX)}' -> a string expression."""
+    parts = []
+    try:
+        parsed = list(Formatter().parse(text))
+    except ValueError as e:
+        raise RuleError(f"reason {text!r}: {e}") from None
+    for literal, name, spec, conversion in parsed:
+        if literal:
+            parts.append(repr(literal))
+        if name is None:
+            continue
+        if conversion or "{" in (spec or ""):
+            raise RuleError(f"reason {text!r}: only {{value[:format]}} is supported")
+        usd = _USD.match(name)
+        expr = f"_usd({_ref(usd.group(1), env, names)})" if usd else _ref(name, env, names)
+        parts.append(f"format({expr}, {spec or ''!r})")
+    return " + ".join(parts) or "''"
+
+def _predicate(pred: dict, env, names, fields, vector: bool) -> str:
+    if not isinstance(pred, dict) or pred.get("field") not in fields:
+        raise RuleError(f"predicate {pred!r}: 'field' must be one of {', '.join(fields)}")
+    if "min" not in pred and "max" not in pred:
+        raise RuleError(f"predicate {pred!r} needs min and/or max")
+    x = pred["field"]
+    lo = _ref(pred["min"], env, names) if "min" in pred else None
+    hi = _ref(pred["max"], env, names) if "max" in pred else None
+    if vector:
+        if lo is not None and hi is not None:
+            return f"(({lo} <= {x}) & ({x} <= {hi}))"
+        return f"({lo} <= {x})" if lo is not None else f"({x} <= {hi})"
+    if lo is not None and hi is not None:
+        return f"{lo} <= {x} <= {hi}"
+    return f"{x} >= {lo}" if lo is not None else f"{x} <= {hi}"
+
+def _conjunction(preds: List[dict], env, names, fields, vector: bool) -> str:
+    exprs = [_predicate(p, env, names, fields, vector) for p in preds]
+    if len(exprs) == 1:
+        return exprs[0]
+    return " & ".join(exprs) if vector else " and ".join(f"({e})" for e in exprs)
+
+def _parse_rule(spec: dict, env, names, fields) -> dict:
+    name = spec.get("name") if isinstance(spec, dict) else None
+    if not name or not _NAME.match(name):
+        raise RuleError(f"rule {spec!r} needs an identifier 'name'")
+    preds = {}
+    for cat in CATEGORIES:
+        chosen = spec.get(cat, spec.get("all"))
+        if not chosen or not isinstance(chosen, list):
+            raise RuleError(f"{name}: needs 'all' or '{cat}' predicates")
+        preds[cat] = chosen
+    reason = spec.get("reason")
+    report = spec.get("report", True)
+    if reason is not None and not report:
+        raise RuleError(f"{name}: an unreported rule can't have a reason")
+    reasons = {cat: (reason.get(cat, reason.get("all")) if isinstance(reason, dict) else reason) for cat in CATEGORIES}
+    weight = spec.get("weight", 1)
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+        raise RuleError(f"{name}: weight must be a number >= 0")
+    rule = {
+        "name": name,
+        "group": spec.get("group"),
+        "gate": bool(spec.get("gate", False)),
+        "weight": weight,
+        "report": bool(report),
+        "preds": preds,
+        "reasons": {cat: (_template(r, env, names) if r else None) for cat, r in reasons.items()},
+    }
+    for cat in CATEGORIES:  # validates every predicate once, up front
+        _conjunction(preds[cat], env, names, fields, vector=False)
+    return rule
+
+
+# ---------- code generation ----------
+def _points(rules: List[dict], weights: Dict[str, str], vector: bool) -> str:
+    """upside + each group's weighted share of passing rules (groups in first-use order)."""
+    terms = [f"{weights['upside']} * upside"] if "upside" in weights else []
+    groups = list(dict.fromkeys(r["group"] for r in rules if r["group"] in weights and r["group"] != "upside"))
+    for group in groups:
+        members = [(i, r["weight"]) for i, r in enumerate(rules) if r["group"] == group and r["weight"]]
+        if not members:
+            continue
+        parts = []
+        for i, w in members:
+            if w == 1:
+                parts.append(f"f{i}.astype(np.int64)" if vector and not parts else f"f{i}")
+            else:
+                parts.append(f"np.where(f{i}, {w!r}, 0.0)" if vector else f"({w!r} if f{i} else 0)")
+        total = 0
+        for _, w in members:
+            total += w
+        terms.append(f"{weights[group]} * (({' + '.join(parts)}) / {float(total)!r})")
+    return " + ".join(terms) or "0.0"
+
+def _constants(body: List[str], env) -> List[str]:
+    """The filters constants a generated function body names (string literals don't count)."""
+    found = []
+    tokens = tokenize.generate_tokens(io.StringIO("\n".join(line.strip() for line in body) + "\n").readline)
+    for tok in tokens:
+        if tok.type == tokenize.NAME and _CONST.match(tok.string) and tok.string in env and tok.string not in found:
+            found.append(tok.string)
+    return found
+
+def _source(rules: List[dict], weights: Dict[str, str], labels: List[Tuple[str, str, str]],
+            env, names, fields, timing: bool) -> str:
+    args = ", ".join(fields)
+    n = len(rules)
+    flags = ", ".join(f"f{i}" for i in range(n)) + ("," if n == 1 else "")
+    gates = [f"f{i}" for i, r in enumerate(rules) if r["gate"]]
+    out = ["def _make(_pc, _T):"]
+
+    def function(header, body):
+        # constants come from the profile argument, bound once per call
+        out.append(f"    def {header}:")
+        out.extend(f"        {name} = profile[{name!r}]" for name in _constants(body, env))
+        out.extend(body)
+
+    def assign(indent, i, expr):
+        pad = " " * indent
+        if timing:
+            return [f"{pad}_t = _pc()", f"{pad}f{i} = {expr}", f"{pad}_T[{i}] += _pc() - _t"]
+        return [f"{pad}f{i} = {expr}"]
+
+    # scalar
+    body = []
+    for cat, head in (("early", "if early:"), ("old", "else:")):
+        body.append(f"        {head}")
+        for i, r in enumerate(rules):
+            body += assign(12, i, _conjunction(r["preds"][cat], env, names, fields, vector=False))
+    body.append(f"        return ({flags}), {_points(rules, weights, False)}, {' and '.join(gates) or 'True'}")
+    function(f"scalar(profile, early, liq_cap, liq_limit, upside, {args})", body)
+
+    # numpy columns
+    body = []
+    for i, r in enumerate(rules):
+        e = _conjunction(r["preds"]["early"], env, names, fields, vector=True)
+        o = _conjunction(r["preds"]["old"], env, names, fields, vector=True)
+        body += assign(8, i, e if e == o else f"np.where(early, {e}, {o})")
+    body.append(f"        return [{flags}], {_points(rules, weights, True)}, "
+                f"{' & '.join(gates) or 'np.ones(len(early), dtype=bool)'}")
+    function(f"columns(profile, early, liq_cap, liq_limit, upside, {args})", body)
+
+    # reasons (only for failed, reported rules)
+    body = [f"        ({flags}) = flags", "        out = []"]
+    for cat, head in (("early", "if early:"), ("old", "else:")):
+        body.append(f"        {head}")
+        body += [f"            if not f{i}: out.append({r['reasons'][cat]})"
+                 for i, r in enumerate(rules) if r["reasons"][cat]] or ["            pass"]
+    body.append("        return out")
+    function(f"reasons(profile, flags, early, liq_cap, liq_limit, {args})", body)
+
+    # labels
+    body = []
+    for name, mult, score in labels:
+        body.append(f"        if base_ok and pot >= {mult} and total >= {score}:")
+        body.append(f"            return {name!r}")
+    body.append("        return 'reject'")
+    function("label(profile, base_ok, pot, total)", body)
+    conds = ", ".join(f"base_ok & (pot >= {mult}) & (total >= {score})" for _, mult, score in labels)
+    function("label_columns(profile, base_ok, pot, total)",
+             [f"        return np.select([{conds}], {list(range(len(labels)))!r}, default=-1)"])
+    function("min_multiple(profile)", [f"        return min(({', '.join(m for _, m, _ in labels)},))"])
+
+    # lossless prefilter: gates that only read liq / fdv
+    cheap = {"liq", "fdv"}
+    pre = [r for r in rules if r["gate"] and all(p["field"] in cheap for c in CATEGORIES for p in r["preds"][c])]
+    body = []
+    for cat, head in (("early", "if early:"), ("old", "else:")):
+        body.append(f"        {head}")
+        exprs = [f"({_conjunction(r['preds'][cat], env, names, fields, vector=False)})" for r in pre]
+        body.append(f"            return {' and '.join(exprs) or 'True'}")
+    function("prefilter(profile, early, liq_cap, liq_limit, liq, fdv)", body)
+
+    out.append("    return scalar, columns, reasons, label, label_columns, prefilter, min_multiple")
+    return "\n".join(out) + "\n"
+
+def compile_rules(spec: dict, env: Dict[str, Any], fields: Sequence[str], timing: bool = RULE_TIMING,
+                  source: str = "<rules>") -> RuleSet:
+    """
+    Compiles a parsed rules file. env is the module whose constants the rules
+    name (filters' globals; it must also provide np and _usd); it validates
+    the names, while the values are read from the profile each generated
+    function takes first. fields are the per-pair values passed after it, in order.
+    """
+    if not isinstance(spec, dict) or not isinstance(spec.get("rules"), list) or not spec["rules"]:
+        raise RuleError("expected {\"rules\": [...], \"weights\": {...}, \"labels\": [...]}")
+    fields = tuple(fields)
+    names = fields + PARAMS
+    rules = [_parse_rule(r, env, names, fields) for r in spec["rules"]]
+    rule_names = [r["name"] for r in rules]
+    if len(set(rule_names)) != len(rule_names):
+        raise RuleError("rule names must be unique")
+
+    weights = {group: _ref(w, env, names) for group, w in (spec.get("weights") or {}).items()}
+    labels = []
+    for item in spec.get("labels") or []:
+        try:
+            labels.append((str(item["label"]), _ref(item["min_multiple"], env, names),
+                           _ref(item["min_score"], env, names)))
+        except (KeyError, TypeError):
+            raise RuleError(f"label {item!r} needs label, min_multiple and min_score") from None
+    if not labels:
+        raise RuleError("at least one label is required")
+
+    text = _source(rules, weights, labels, env, names, fields, timing)
+    try:
+        scratch: Dict[str, Any] = {"np": env["np"], "_usd": env["_usd"]}
+        exec(compile(text, source, "exec"), scratch)
+    except SyntaxError as e:
+        raise RuleError(f"generated code does not compile: {e}") from None
+    make = scratch["_make"]
+    seconds = [0.0] * len(rules)
+    scalar, columns, reasons, label, label_columns, prefilter, min_multiple = make(time.perf_counter, seconds)
+
+    return RuleSet(
+        names=tuple(rule_names),
+        reported=tuple(i for i, r in enumerate(rules) if r["report"]),
+        labels=tuple(name for name, _, _ in labels),
+        scalar=scalar, columns=columns, reasons=reasons, label=label, label_columns=label_columns,
+        prefilter=prefilter, min_multiple=min_multiple,
+        source=text, seconds=seconds, fired=[0] * len(rules),
+    )
+
+def load_rules(path, env: Dict[str, Any], fields: Sequence[str], timing: bool = RULE_TIMING) -> RuleSet:
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            spec = json.load(f)
+        except json.JSONDecodeError as e:
+            raise RuleError(f"invalid JSON: {e}") from None
+    return compile_rules(spec, env, fields, timing, source=str(path))
+
+
+# ---------- hot reload ----------
+class RuleLoader:
+    """
+    Holds the active RuleSet and swaps it when the file's mtime changes
+    (checked at most every check_sec). A file that fails to compile is
+    reported once and the previous rules keep running.
+    """
+
+    def __init__(self, path, env: Dict[str, Any], fields: Sequence[str], check_sec: float = RELOAD_CHECK_SEC):
+        self.path = Path(path)
+        self.env = env
+        self.fields = tuple(fields)
+        self.check_sec = check_sec
+        self.rules: Optional[RuleSet] = None
+        self._mtime: Optional[int] = None
+        self._next_check = 0.0
+        self._lock = Lock()
+
+    def get(self) -> RuleSet:
+        now = time.monotonic()
+        if now >= self._next_check or self.rules is None:
+            self._next_check = now + self.check_sec
+            self.reload()
+        return self.rules
+
+    def reload(self, force: bool = False) -> bool:
+        """Recompiles if the file changed (or force). Returns True if new rules were installed."""
+        with self._lock:
+            try:
+                mtime = self.path.stat().st_mtime_ns
+            except OSError as e:
+                if self.rules is None:
+                    raise RuleError(f"{self.path}: {e}") from None
+                return False
+            if mtime == self._mtime and not force:
+                return False
+
+            self._mtime = mtime  # a broken file is reported once, not on every check
+            try:
+                rules = load_rules(self.path, self.env, self.fields)
+            except (OSError, RuleError) as e:
+                if self.rules is None:
+                    raise
+                print(f"⚠️ {self.path} not reloaded, keeping the previous rules: {e}")
+                return False
+
+            first = self.rules is None
+            self.rules = rules
+        if not first:
+            print(f"🔁 Reloaded {len(rules.names)} market rules from {self.path}")
+        return True
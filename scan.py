@@ -0,0 +1,454 @@
+# scan.py
+import asyncio
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+from threading import Lock
+import time
+
+import budget
+import metrics
+import priority
+from cache import PersistentTTLCache
+from http_client import (
+    MAX_RETRIES, RETRY_STATUSES, backoff_delay, bucket_for, checked, endpoint_name, is_offline, record,
+    retry_after_sec,
+)
+from pair_snapshot import PairSnapshot
+from screener import DEX_BASE, cache_pairs, chunked, get_pairs_for_tokens, pick_token_pairs
+from filters import PASS_LABELS, chain_profile, near_miss, score_market, prefilter_market
+from state_store import get_store
+from rugcheck import RUGCHECK_BASE_URL, get_cached_evaluation, get_rugcheck_evaluation, store_rugcheck_report
+from trader import enrich_with_trade_signal
+
+if TYPE_CHECKING:
+    import aiohttp  # annotations only; imported lazily where used (slow to import)
+
+# ---- Configs you can tune ----
+MIN_RUG_SCORE = 80
+
+# Chains scanned each cycle (DEX Screener chainIds); e.g. SCAN_CHAINS=solana,base,bsc
+CHAINS = tuple(c.strip() for c in os.getenv("SCAN_CHAINS", "solana").split(",") if c.strip())
+# Rugcheck only covers Solana mints; other chains skip that stage
+RUGCHECK_CHAINS = {"solana"}
+
+# max in-flight requests per host
+DEX_CONCURRENCY = 8
+RUGCHECK_CONCURRENCY = 4
+
+DEX_TIMEOUT_SEC = 10
+RUGCHECK_TIMEOUT_SEC = 5
+
+# discovery-stage prune; 0 keeps every token
+MIN_BOOST_AMOUNT = 0
+
+# ---- Negative cache (on disk): rejected tokens are skipped before any request ----
+REJECT_CACHE_FILE = "reject_cache.json"
+REJECT_CACHE_MAX = 20_000
+REJECT_TTL_SEC = {              # per rejection reason
+    "rugged": 24 * 3600,
+    "rug_score": 6 * 3600,      # Rugcheck score < MIN_RUG_SCORE
+    "market": 3600,             # score_market / prefilter reject
+    "market_near": 300,         # ... that liquidity/FDV NEAR_MISS_PCT away would pass
+}
+
+REJECT_CACHE = PersistentTTLCache(REJECT_CACHE_FILE, maxsize=REJECT_CACHE_MAX, stale_ttl_sec=0)
+_REJECT_LOCK = Lock()
+REJECT_HITS: Dict[str, int] = {}
+REJECT_ADDED: Dict[str, int] = {}
+
+# ---- Deferred tokens (budget.py): what a cycle had no time for is scanned first next cycle ----
+DEFERRED_MAX_AGE_SEC = 3600     # older leftovers are dropped (discovery lists them again if still live)
+DEFERRED_SOURCE = "deferred"    # candidate "sources" entry for carried-over tokens
+
+
+# ---------- funnel accounting ----------
+@dataclass
+class StageStats:
+    name: str
+    seen: int = 0
+    kept: int = 0
+    seconds: float = 0.0
+
+    @property
+    def dropped(self) -> int:
+        return self.seen - self.kept
+
+class Funnel:
+    """Per-stage in/out counts and wall time for one scan."""
+
+    def __init__(self):
+        self.stages: List[StageStats] = []
+
+    @contextmanager
+    def stage(self, name: str, seen: int):
+        st = StageStats(name, seen=seen, kept=seen)
+        t0 = time.perf_counter()
+        try:
+            yield st
+        finally:
+            st.seconds += time.perf_counter() - t0
+            self.stages.append(st)
+
+    def filter(self, name: str, items: Iterable, keep: Callable) -> list:
+        items = list(items)
+        with self.stage(name, len(items)) as st:
+            kept = [x for x in items if keep(x)]
+            st.kept = len(kept)
+        return kept
+
+    def report(self) -> str:
+        return "\n".join(
+            f"🔻 {st.name:<10} in {st.seen:>4} | dropped {st.dropped:>4} | kept {st.kept:>4} | {st.seconds * 1000:.0f} ms"
+            for st in self.stages
+        )
+
+
+# ---------- negative cache ----------
+def _reject_key(chain_id: str, address: str) -> str:
+    return f"{chain_id}:{address}"
+
+def is_rejected(chain_id: str, address: str) -> bool:
+    reason, fresh = REJECT_CACHE.get(_reject_key(chain_id, address))
+    if reason is None or not fresh:
+        return False
+    with _REJECT_LOCK:
+        REJECT_HITS[reason] = REJECT_HITS.get(reason, 0) + 1
+    return True
+
+def remember_reject(chain_id: str, address: Optional[str], reason: str):
+    if not address or reason not in REJECT_TTL_SEC:
+        return
+    REJECT_CACHE.put(_reject_key(chain_id, address), reason, REJECT_TTL_SEC[reason])
+    with _REJECT_LOCK:
+        REJECT_ADDED[reason] = REJECT_ADDED.get(reason, 0) + 1
+
+def reject_stats(reset: bool = False) -> Dict[str, Dict[str, int]]:
+    """Per-reason {"hits": skipped tokens, "added": new rejects} since the last reset."""
+    with _REJECT_LOCK:
+        stats = {"hits": dict(REJECT_HITS), "added": dict(REJECT_ADDED)}
+        if reset:
+            REJECT_HITS.clear()
+            REJECT_ADDED.clear()
+    return stats
+
+def save_reject_cache():
+    REJECT_CACHE.save()
+
+def _rug_reason(evaluation) -> Optional[str]:
+    status, _, _, link = evaluation
+    if not link:  # evaluate_rugcheck(None): the fetch failed, not a verdict
+        return None
+    return "rugged" if "Rugged" in status else "rug_score"
+
+
+# ---------- shared scoring steps ----------
+def qualify_market(pair: PairSnapshot, profile: Optional[dict] = None) -> bool:
+    """Scores the pair (under `profile`, default Solana) and attaches market fields. False if it is rejected."""
+    res = score_market(pair, profile=profile)
+    if res["label"] not in PASS_LABELS:
+        return False
+
+    pair.market_label = res["label"]
+    pair.market_score = res["score"]
+    pair.potential_multiple = res["potential_multiple"]
+    pair.market_checks = res["market"]  # raw sub-checks + reasons
+    return True
+
+def apply_rugcheck(pair: PairSnapshot, evaluation) -> bool:
+    """Attaches the evaluate_rugcheck() result to the pair. False if score too low."""
+    rug_status, rug_score, rug_reasons, rug_link = evaluation
+    if rug_score < MIN_RUG_SCORE:
+        return False
+
+    pair.rug_status = rug_status
+    pair.rug_score = rug_score
+    pair.rug_reasons = rug_reasons
+    pair.rug_link = rug_link
+    return True
+
+def _mint_of(pair: PairSnapshot) -> str:
+    return pair.base_address
+
+def _unique_pairs(tokens: List[str], pairs: Dict[str, PairSnapshot],
+                  token_of: Optional[Dict[str, str]] = None) -> List[PairSnapshot]:
+    """Resolved pairs in token order, each pairAddress once. Fills token_of[pairAddress]."""
+    ordered, seen = [], set()
+    token_of = {} if token_of is None else token_of
+    for address in tokens:
+        pair = pairs.get(address) if address else None
+        if not pair or pair.pair_address in seen:
+            continue
+        seen.add(pair.pair_address)
+        token_of[pair.pair_address] = address
+        ordered.append(pair)
+    return ordered
+
+def _skip_rejected(chain_id: str, tokens: List[str], funnel: Funnel) -> List[str]:
+    return funnel.filter("rejected", tokens, lambda address: not is_rejected(chain_id, address))
+
+def _market_stages(chain_id: str, pairs: List[PairSnapshot], funnel: Funnel, token_of: Dict[str, str]) -> List[PairSnapshot]:
+    """prefilter -> score under the chain profile; rejects go to the negative cache."""
+    profile = chain_profile(chain_id)
+    kept = funnel.filter("prefilter", pairs, lambda pair: prefilter_market(pair, profile=profile))
+    kept = funnel.filter("score", kept, lambda pair: qualify_market(pair, profile))
+    passed = {id(pair) for pair in kept}
+    for pair in pairs:
+        if id(pair) not in passed:
+            remember_reject(chain_id, token_of.get(pair.pair_address),
+                            "market_near" if near_miss(pair, profile=profile) else "market")
+    return kept
+
+def _rugcheck_or_defer(mint: str):
+    """get_rugcheck_evaluation(), or None if the request was ruled out (budget.Deferred)."""
+    try:
+        return get_rugcheck_evaluation(mint)
+    except budget.Deferred:
+        return None
+
+def _apply_rugchecks(chain_id: str, pairs: List[PairSnapshot], evaluations, token_of: Dict[str, str]) -> List[PairSnapshot]:
+    """evaluations: one per pair; None = deferred (neither kept nor rejected; rescanned next cycle)."""
+    kept = []
+    for pair, evaluation in zip(pairs, evaluations):
+        if evaluation is None:
+            budget.defer("rugcheck", [token_of.get(pair.pair_address)], chain_id)
+        elif apply_rugcheck(pair, evaluation):
+            kept.append(pair)
+        else:
+            reason = _rug_reason(evaluation)
+            if reason:
+                remember_reject(chain_id, token_of.get(pair.pair_address), reason)
+    return kept
+
+
+# ---------- deferred tokens ----------
+def with_deferred(candidates: Dict[str, Dict[str, dict]], store=None) -> Dict[str, Dict[str, dict]]:
+    """Puts the tokens earlier cycles deferred ahead of this cycle's discovery candidates (per chain)."""
+    carried = (store or get_store()).take_deferred_tokens(DEFERRED_MAX_AGE_SEC)
+    merged = {}
+    for chain_id in list(candidates) + [c for c in carried if c not in candidates]:
+        found = candidates.get(chain_id, {})
+        chain = {}
+        for a in carried.get(chain_id, []):  # rediscovered ones keep their feeds and are marked carried too
+            info = found.get(a, {"boost": 0.0, "sources": []})
+            chain[a] = dict(info, sources=list(info.get("sources", ())) + [DEFERRED_SOURCE])
+        chain.update((a, info) for a, info in found.items() if a not in chain)
+        merged[chain_id] = chain
+    return merged
+
+def deferred_tokens() -> set:
+    """(chain, token) pairs this cycle deferred before a verdict (hydrate or Rugcheck)."""
+    work = budget.deferred()
+    return {item for kind in ("hydrate", "rugcheck") for item in work.get(kind, ())}
+
+def save_deferred(store=None) -> int:
+    tokens = deferred_tokens()
+    if tokens:
+        (store or get_store()).defer_tokens(tokens)
+    return len(tokens)
+
+
+def select_candidates(candidates: Dict[str, dict], funnel: Optional[Funnel] = None,
+                      chain_id: str = "solana") -> List[str]:
+    """Stage 1: prune on discovery metadata we already have (no requests), best candidates first."""
+    funnel = funnel or Funnel()
+    kept = funnel.filter("discovery", candidates.items(),
+                         lambda kv: kv[1].get("boost", 0) >= MIN_BOOST_AMOUNT
+                         or DEFERRED_SOURCE in kv[1].get("sources", ()))
+    with funnel.stage("priority", len(kept)):
+        return priority.rank(chain_id, dict(kept))
+
+
+# ---------- serial path ----------
+def scan_tokens(tokens: List[str], chain_id: str = "solana",
+                funnel: Optional[Funnel] = None,
+                pairs: Optional[Dict[str, PairSnapshot]] = None) -> List[PairSnapshot]:
+    """`pairs` ({token: PairSnapshot}) skips the hydrate request for callers that already resolved them."""
+    funnel = funnel or Funnel()
+    tokens = _skip_rejected(chain_id, tokens, funnel)
+
+    # one batched request resolves + hydrates up to 30 tokens
+    token_of: Dict[str, str] = {}
+    with funnel.stage("hydrate", len(tokens)) as st:
+        resolved = get_pairs_for_tokens(chain_id, tokens) if pairs is None else pairs
+        pairs = _unique_pairs(tokens, resolved, token_of)
+        st.kept = len(pairs)
+
+    pairs = _market_stages(chain_id, pairs, funnel, token_of)
+    if chain_id in RUGCHECK_CHAINS:
+        with funnel.stage("rugcheck", len(pairs)) as st:
+            evaluations = [_rugcheck_or_defer(_mint_of(pair)) for pair in pairs]
+            pairs = _apply_rugchecks(chain_id, pairs, evaluations, token_of)
+            st.kept = len(pairs)
+
+    # attach trade signal
+    return [enrich_with_trade_signal(pair) for pair in pairs]
+
+
+# ---------- concurrent path ----------
+class _HostLimiter:
+    """One semaphore per host so DEX Screener and Rugcheck are throttled separately."""
+
+    def __init__(self, limits: Dict[str, int]):
+        self._sems = {host: asyncio.Semaphore(n) for host, n in limits.items()}
+
+    def for_url(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._sems:
+            self._sems[host] = asyncio.Semaphore(1)
+        return self._sems[host]
+
+async def _get_json(session: "aiohttp.ClientSession", limiter: _HostLimiter, url: str,
+                    timeout: float, raise_for_status: bool = True):
+    """Async twin of http_client.http_get: same rate buckets, retry policy, breakers and stats."""
+    import aiohttp
+
+    bucket = bucket_for(url)
+    breaker = budget.breaker_for(endpoint_name(url))
+    for attempt in range(MAX_RETRIES + 1):
+        attempt_timeout = checked(url, timeout)  # budget.Deferred past the deadline / while the circuit is open
+        wait = bucket.reserve()
+        if wait > 0:
+            record(url, "throttled")
+            await asyncio.sleep(wait)
+        record(url, "requests")
+        t0 = time.perf_counter()
+        try:
+            async with limiter.for_url(url):
+                t0 = time.perf_counter()  # latency excludes the wait for a host slot
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=attempt_timeout)) as res:
+                    metrics.observe_http(endpoint_name(url), time.perf_counter() - t0, error=res.status >= 400)
+                    if res.status in RETRY_STATUSES:
+                        breaker.failure()
+                    else:
+                        breaker.success()
+                    if res.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                        delay = backoff_delay(attempt, retry_after_sec(res.headers.get("Retry-After")))
+                    else:
+                        if res.status in RETRY_STATUSES:
+                            record(url, "errors")
+                        if not raise_for_status and res.status != 200:
+                            return None
+                        res.raise_for_status()
+                        return await res.json(content_type=None)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            metrics.observe_http(endpoint_name(url), time.perf_counter() - t0, error=True)
+            record(url, "errors")
+            breaker.failure()
+            if attempt >= MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+        else:
+            record(url, "errors")
+        record(url, "retries")
+        await asyncio.sleep(budget.capped(delay))
+
+async def _fetch_token_pairs(session, limiter, chain_id: str, chunk: List[str]) -> Dict[str, PairSnapshot]:
+    try:
+        url = f"{DEX_BASE}/tokens/v1/{chain_id}/{','.join(chunk)}"
+        data = await _get_json(session, limiter, url, DEX_TIMEOUT_SEC)
+        if not isinstance(data, list):
+            return {}
+        picked = pick_token_pairs(data, chunk)
+        return dict(zip(picked, cache_pairs(picked.values())))
+    except budget.Deferred:
+        budget.defer("hydrate", chunk, chain_id)
+    except Exception as e:
+        print(f"⚠️ Failed to fetch pairs for {len(chunk)} tokens: {e}")
+    return {}
+
+async def _fetch_rugcheck(session, limiter, mint: str):
+    try:
+        url = f"{RUGCHECK_BASE_URL}/{mint}/report"
+        return await _get_json(session, limiter, url, RUGCHECK_TIMEOUT_SEC, raise_for_status=False)
+    except budget.Deferred:
+        raise
+    except Exception:
+        return None
+
+async def _evaluate_rugcheck(session, limiter, mint: str):
+    """Like _rugcheck_or_defer(): None if the request was ruled out."""
+    cached = get_cached_evaluation(mint)
+    if cached is not None:
+        return cached
+    try:
+        return store_rugcheck_report(mint, await _fetch_rugcheck(session, limiter, mint))
+    except budget.Deferred:
+        return None
+
+async def _scan_chain(session, limiter, chain_id: str, tokens: List[str], funnel: Funnel) -> List[PairSnapshot]:
+    """hydrate -> prefilter -> score -> Rugcheck for one chain; no trade signals yet."""
+    tokens = _skip_rejected(chain_id, tokens, funnel)
+    token_of: Dict[str, str] = {}
+    with funnel.stage("hydrate", len(tokens)) as st:
+        chunks = await asyncio.gather(*(
+            _fetch_token_pairs(session, limiter, chain_id, chunk)
+            for chunk in chunked(a for a in dict.fromkeys(tokens) if a)
+        ))
+        resolved = {}
+        for picked in chunks:
+            resolved.update(picked)
+        pairs = _unique_pairs(tokens, resolved, token_of)
+        st.kept = len(pairs)
+
+    pairs = _market_stages(chain_id, pairs, funnel, token_of)
+
+    if chain_id in RUGCHECK_CHAINS:
+        with funnel.stage("rugcheck", len(pairs)) as st:
+            evaluations = await asyncio.gather(*(
+                _evaluate_rugcheck(session, limiter, _mint_of(pair)) for pair in pairs
+            ))
+            pairs = _apply_rugchecks(chain_id, pairs, evaluations, token_of)
+            st.kept = len(pairs)
+    return pairs
+
+async def scan_chains_async(tokens_by_chain: Dict[str, List[str]],
+                            funnels: Optional[Dict[str, Funnel]] = None,
+                            dex_concurrency: int = DEX_CONCURRENCY,
+                            rugcheck_concurrency: int = RUGCHECK_CONCURRENCY) -> List[PairSnapshot]:
+    """
+    Scans several chains at once over ONE aiohttp session and one set of
+    per-host limits, so an extra chain only adds its own per-pair requests.
+    funnels (filled in place) gets one Funnel per chain.
+    """
+    import aiohttp  # only the concurrent path needs it (slow to import)
+
+    funnels = {} if funnels is None else funnels
+    limiter = _HostLimiter({
+        urlparse(DEX_BASE).netloc: dex_concurrency,
+        urlparse(RUGCHECK_BASE_URL).netloc: rugcheck_concurrency,
+    })
+
+    async with aiohttp.ClientSession() as session:
+        results = await asyncio.gather(*(
+            _scan_chain(session, limiter, chain_id, tokens, funnels.setdefault(chain_id, Funnel()))
+            for chain_id, tokens in tokens_by_chain.items()
+        ))
+
+    return [enrich_with_trade_signal(pair) for pairs in results for pair in pairs]
+
+async def scan_tokens_async(tokens: List[str],
+                            chain_id: str = "solana",
+                            funnel: Optional[Funnel] = None,
+                            dex_concurrency: int = DEX_CONCURRENCY,
+                            rugcheck_concurrency: int = RUGCHECK_CONCURRENCY) -> List[PairSnapshot]:
+    """
+    Same result as scan_tokens(), but fetches and scores tokens concurrently.
+    Trade signals are attached afterwards in token order, so TRADE_META
+    evolves exactly as it does on the serial path.
+    """
+    return await scan_chains_async({chain_id: tokens}, {chain_id: funnel or Funnel()},
+                                   dex_concurrency, rugcheck_concurrency)
+
+def run_concurrent_scan(tokens: List[str], **kwargs) -> List[PairSnapshot]:
+    return asyncio.run(scan_tokens_async(tokens, **kwargs))
+
+def run_multichain_scan(tokens_by_chain: Dict[str, List[str]],
+                        funnels: Optional[Dict[str, Funnel]] = None, **kwargs) -> List[PairSnapshot]:
+    if is_offline():  # fixtures are served through http_get; there is no socket to overlap
+        funnels = {} if funnels is None else funnels
+        return [pair for chain_id, tokens in tokens_by_chain.items()
+                for pair in scan_tokens(tokens, chain_id, funnel=funnels.setdefault(chain_id, Funnel()))]
+    return asyncio.run(scan_chains_async(tokens_by_chain, funnels, **kwargs))
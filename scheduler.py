@@ -1,17 +1,256 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from main import main
+from datetime import datetime
+from threading import Lock
 import time
 
-# Run once immediately
-main()
+import budget
+import metrics
+import onchain
+import priority
+import recorder
+from cache import TTLCache
+from filters import rule_stats
+from screener import get_token_candidates, get_pairs_for_tokens
+from scan import (
+    CHAINS, Funnel, select_candidates, run_multichain_scan, scan_tokens, reject_stats, save_reject_cache,
+    with_deferred, deferred_tokens, save_deferred, is_rejected,
+)
+from rugcheck import get_rugcheck_evaluation, save_rugcheck_cache
+from state_store import get_store
+from tracker import (
+    record_passed_pairs, refresh_tracked, load_tracked_views, split_hot_cold,
+    decay_stale, tracked_mints, update_rug_fields, covers_all_tracked,
+)
+from telegram_bot import send_alert
+from trader import load_trade_meta_from_tracked, save_trade_meta
 
-# Start the recurring schedule (10 mins)
-scheduler = BackgroundScheduler(timezone='Asia/Ho_Chi_Minh')
-scheduler.add_job(main, 'interval', minutes=10)
-scheduler.start()
+# ---- Configs you can tune ----
+TIMEZONE = "Asia/Ho_Chi_Minh"
+DISCOVERY_EVERY_SEC = 60     # new token profiles/boosts
+HOT_EVERY_SEC = 60           # tracked pairs with Entry/Watching or a big 5m move
+COLD_EVERY_SEC = 600         # everything else tracked + decay + alerts
+RUGCHECK_EVERY_SEC = 900     # re-evaluate tracked mints (cache TTLs decide what is refetched)
+RESCAN_AFTER_SEC = 600       # a discovered token is scored at most once per window
+ONCHAIN_EVERY_SEC = 5        # new mints from onchain.py (only with SOLANA_WS_URL set)
+ONCHAIN_PENDING_SEC = 300    # keep retrying a mint DEX Screener has no pair for yet this long
 
-try:
-    while True:
-        time.sleep(60)  # Keep the script running
-except KeyboardInterrupt:
-    scheduler.shutdown()
+
+# (chain, token) pairs scored recently; discovery only scores what is new (or due again)
+RECENTLY_SCANNED = TTLCache(RESCAN_AFTER_SEC, maxsize=20_000)
+# on-chain mints waiting for a DEX Screener pair: {mint: {"source", "signature", "seen_at"}}
+PENDING_MINTS = {}
+# discovery and on-chain scans both update trader.TRADE_META and the tracker
+SCAN_LOCK = Lock()
+
+
+# ---------- jobs ----------
+def discovery_job():
+    with SCAN_LOCK:
+        _discover()
+
+def _discover():
+    with metrics.stage("discovery"):
+        candidates = with_deferred(get_token_candidates(CHAINS))
+    due = {
+        chain_id: {a: c for a, c in candidates.get(chain_id, {}).items()
+                   if RECENTLY_SCANNED.get((chain_id, a)) is None}
+        for chain_id in CHAINS
+    }
+    due = {chain_id: tokens for chain_id, tokens in due.items() if tokens}
+    if not due:
+        return
+
+    with metrics.stage("load_state"):
+        load_trade_meta_from_tracked()
+
+    rule_stats(reset=True)
+    reject_stats(reset=True)
+    funnels = {chain_id: Funnel() for chain_id in due}
+    with metrics.stage("scan"):
+        tokens_by_chain = {chain_id: select_candidates(c, funnels[chain_id], chain_id) for chain_id, c in due.items()}
+        passed_pairs = run_multichain_scan(tokens_by_chain, funnels=funnels)
+        save_rugcheck_cache()
+        save_reject_cache()
+        priority.save_first_seen()
+    deferred = deferred_tokens()  # no verdict yet: not "recently scanned", first in line next tick
+    save_deferred()
+    multi = len(CHAINS) > 1
+    for chain_id, funnel in funnels.items():
+        for address in tokens_by_chain[chain_id]:
+            if (chain_id, address) not in deferred:
+                RECENTLY_SCANNED.put((chain_id, address), True)
+        prefix = f"scan.{chain_id}" if multi else "scan"
+        for st in funnel.stages:
+            metrics.current().record_stage(f"{prefix}.{st.name}", st.seconds, st.seen, st.kept)
+        print(f"⛓️ {chain_id}\n{funnel.report()}" if multi else funnel.report())
+    for key, values in reject_stats().items():
+        metrics.current().set_counters(f"reject_cache_{key}", values)
+    for key, values in rule_stats().items():
+        metrics.current().set_counters(f"rule_{key}", values)
+    metrics.current().set_counters("priority", priority.report(passed_pairs))
+
+    if passed_pairs:
+        # decay is time-based on the cold loop; a fast loop must not decay
+        with metrics.stage("tracker"):
+            record_passed_pairs(passed_pairs, decay=False)
+        with metrics.stage("save_state"):
+            save_trade_meta(get_store().tracked_ids())
+
+def onchain_job():
+    """Scores mints onchain.py saw created, as soon as DEX Screener lists a pair for them."""
+    now = time.time()
+    fresh = onchain.drain()
+    PENDING_MINTS.update(fresh)
+    expired = [m for m, info in PENDING_MINTS.items() if now - info["seen_at"] > ONCHAIN_PENDING_SEC]
+    for mint in expired:
+        del PENDING_MINTS[mint]
+    due = [m for m in PENDING_MINTS
+           if RECENTLY_SCANNED.get(("solana", m)) is None and not is_rejected("solana", m)]
+    for mint in set(PENDING_MINTS) - set(due):  # discovery got there first
+        del PENDING_MINTS[mint]
+    if not due:
+        return
+    if not SCAN_LOCK.acquire(blocking=False):
+        return  # discovery is scanning; the mints stay pending for the next tick
+
+    try:
+        with metrics.stage("onchain_resolve"):
+            resolved = get_pairs_for_tokens("solana", due)
+        if not resolved:
+            if fresh:
+                print(f"⚡ On-chain: {len(fresh)} new mint(s), none listed on DEX Screener yet ({len(due)} pending)")
+            return
+
+        with metrics.stage("load_state"):
+            load_trade_meta_from_tracked()
+        funnel = Funnel()
+        with metrics.stage("scan"):
+            tokens = list(resolved)
+            passed_pairs = scan_tokens(tokens, "solana", funnel, pairs=resolved)
+            save_rugcheck_cache()
+            save_reject_cache()
+        deferred = deferred_tokens()
+        save_deferred()
+        scanned = time.time()
+        latencies = sorted(scanned - PENDING_MINTS[m]["seen_at"] for m in tokens)
+        for mint in tokens:
+            if ("solana", mint) not in deferred:
+                RECENTLY_SCANNED.put(("solana", mint), True)
+                del PENDING_MINTS[mint]
+        for st in funnel.stages:
+            metrics.current().record_stage(f"onchain.{st.name}", st.seconds, st.seen, st.kept)
+
+        if passed_pairs:
+            with metrics.stage("tracker"):
+                record_passed_pairs(passed_pairs, decay=False)
+            with metrics.stage("save_state"):
+                save_trade_meta(get_store().tracked_ids())
+    finally:
+        SCAN_LOCK.release()
+
+    print(f"⚡ On-chain: {len(tokens)} of {len(due)} pending mints listed and scanned, {len(passed_pairs)} passed | "
+          f"detection -> scan {latencies[len(latencies) // 2]:.1f}s median, {latencies[-1]:.1f}s max "
+          f"| {len(PENDING_MINTS)} pending")
+    metrics.current().set_counters("onchain", {
+        **onchain.stats(), "scanned": len(tokens), "passed": len(passed_pairs), "pending": len(PENDING_MINTS),
+        "latency_max_ms": int(latencies[-1] * 1000),
+    })
+
+def hot_refresh_job():
+    hot_ids, _ = split_hot_cold()
+    if hot_ids:
+        hot_pairs = refresh_tracked(hot_ids)
+        with metrics.stage("alert"):
+            send_alert(hot_pairs, complete=False)  # signal flips go out without waiting for the digest
+
+def cold_refresh_job():
+    with metrics.stage("decay"):
+        decay_stale(COLD_EVERY_SEC)
+    _, cold_ids = split_hot_cold()
+    refresh_tracked(cold_ids)
+
+    # everything tracked (hot pairs come from the pair cache); only changes are sent
+    all_tracked = load_tracked_views()
+    with metrics.stage("alert"):
+        # a pair whose refresh failed or was deferred is missing, not untracked
+        send_alert(all_tracked, complete=covers_all_tracked(all_tracked))
+
+def rugcheck_job():
+    mints = tracked_mints()
+    evaluations = {}
+    with metrics.stage("rugcheck"):
+        for pair_id, mint in mints.items():
+            try:
+                evaluations[pair_id] = get_rugcheck_evaluation(mint)
+            except budget.Deferred:
+                budget.defer("rugcheck", [pair_id])  # re-checked on the next run
+    update_rug_fields(evaluations)
+    save_rugcheck_cache()
+
+JOBS = (
+    ("discovery", discovery_job, DISCOVERY_EVERY_SEC),
+    ("hot_refresh", hot_refresh_job, HOT_EVERY_SEC),
+    ("cold_refresh", cold_refresh_job, COLD_EVERY_SEC),
+    ("rugcheck", rugcheck_job, RUGCHECK_EVERY_SEC),
+)
+
+
+# ---------- overlap protection ----------
+def guarded(name, fn, budget_sec=None):
+    """
+    Wraps a job so a run that is still going makes the next tick a no-op
+    (instead of queueing or running twice). Each run writes its own metrics
+    and, given budget_sec, skips requests that would run past it (budget.py).
+    """
+    lock = Lock()
+
+    def run():
+        if not lock.acquire(blocking=False):
+            print(f"⏭️ {name} still running; skipping this tick")
+            return False
+        try:
+            cycle = metrics.start_cycle(name)
+            try:
+                with budget.cycle(budget_sec or float("inf")):
+                    fn()
+                if budget.deferred():
+                    print(f"⏱️ {name}: deferred to the next run: {budget.deferred_summary()}")
+                cycle.set_counters("deferred", {k: len(set(v)) for k, v in budget.deferred().items()})
+            except Exception as e:
+                print(f"❌ {name} job failed: {e}")
+            finally:
+                cycle.write()
+                recorder.flush()
+            return True
+        finally:
+            lock.release()
+
+    run.__name__ = f"{name}_guarded"
+    return run
+
+def build_scheduler(jobs=JOBS) -> "BackgroundScheduler":
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler = BackgroundScheduler(timezone=TIMEZONE)
+    now = datetime.now(scheduler.timezone)
+    for name, fn, every_sec in jobs:
+        scheduler.add_job(
+            guarded(name, fn, budget_sec=every_sec), "interval", seconds=every_sec, id=name,
+            max_instances=1, coalesce=True, next_run_time=now,  # first run immediately
+        )
+    return scheduler
+
+def start():
+    jobs = JOBS
+    if onchain.enabled() and "solana" in CHAINS:
+        onchain.start_listener()
+        jobs = JOBS + (("onchain", onchain_job, ONCHAIN_EVERY_SEC),)
+    scheduler = build_scheduler(jobs)
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(60)  # Keep the script running
+    except KeyboardInterrupt:
+        scheduler.shutdown()
+
+if __name__ == "__main__":
+    start()
@@ -1,38 +1,87 @@
-import requests
+import budget
+from cache import TTLCache
+from http_client import http_get_json
+from pair_snapshot import PairSnapshot
+from recorder import record_pairs
 
 DEX_BASE = "https://api.dexscreener.com"
 
-def get_solana_token_profiles():
-    endpoints = [
-        f"{DEX_BASE}/token-boosts/latest/v1",
-        f"{DEX_BASE}/token-boosts/top/v1",
-        f"{DEX_BASE}/token-profiles/latest/v1"
-    ]
+# ---- Pair snapshot cache (shared by scan + tracker within a run) ----
+PAIR_CACHE_TTL_SEC = 120
+PAIR_CACHE_MAX = 5000
+PAIR_CACHE = TTLCache(PAIR_CACHE_TTL_SEC, PAIR_CACHE_MAX)
+
+def cache_pairs(pairs):
+    """
+    Parses raw API pairs into PairSnapshots (None for empty entries), in
+    order, and caches them. Every fetched payload passes through here; the
+    raw form is archived first when recording is on.
+    """
+    pairs = list(pairs)
+    record_pairs(pairs)
+    snapshots = []
+    for raw in pairs:
+        pair = PairSnapshot.from_api(raw) if raw else None
+        # store copies: callers attach scoring fields to the snapshots they get back
+        if pair and pair.pair_address:
+            PAIR_CACHE.put(pair.pair_address, pair.copy())
+        snapshots.append(pair)
+    return snapshots
+
+def get_cached_pair(pair_address):
+    pair = PAIR_CACHE.get(pair_address)
+    return pair.copy() if pair else None
 
-    token_addresses = set()
+DISCOVERY_ENDPOINTS = {
+    "boosts_latest": "/token-boosts/latest/v1",
+    "boosts_top": "/token-boosts/top/v1",
+    "profiles_latest": "/token-profiles/latest/v1",
+}
 
-    for url in endpoints:
+def get_token_candidates(chains=None):
+    """
+    One download of every discovery feed, grouped by chain, keeping the
+    cheap metadata each feed already gives us:
+      {chainId: {tokenAddress: {"boost": max boost amount seen, "sources": [feed names]}}}
+    chains=None keeps every chain in the responses.
+    """
+    wanted = set(chains) if chains is not None else None
+    by_chain = {chain: {} for chain in chains or ()}
+
+    for source, path in DISCOVERY_ENDPOINTS.items():
+        url = f"{DEX_BASE}{path}"
         try:
-            res = requests.get(url, timeout=10)
-            res.raise_for_status()
-            data = res.json()
+            data = http_get_json(url, timeout=10)
 
             for item in data:
-                if item.get("chainId") == "solana":
-                    token_addr = item.get("tokenAddress")
-                    if token_addr:
-                        token_addresses.add(token_addr)
+                chain_id = item.get("chainId")
+                if not chain_id or (wanted is not None and chain_id not in wanted):
+                    continue
+                token_addr = item.get("tokenAddress")
+                if token_addr:
+                    info = by_chain.setdefault(chain_id, {}).setdefault(token_addr, {"boost": 0.0, "sources": []})
+                    boost = item.get("totalAmount", item.get("amount")) or 0
+                    info["boost"] = max(info["boost"], float(boost))
+                    if source not in info["sources"]:
+                        info["sources"].append(source)
+        except budget.Deferred:
+            budget.defer("discovery", [source])
         except Exception as e:
             print(f"❌ Failed to fetch from {url}: {e}")
 
-    return list(token_addresses)
+    return by_chain
+
+def get_solana_token_candidates():
+    """get_token_candidates() for Solana only: {tokenAddress: {"boost", "sources"}}."""
+    return get_token_candidates(["solana"])["solana"]
+
+def get_solana_token_profiles():
+    return list(get_solana_token_candidates())
 
 def get_pair_address(chain_id, token_address):
     try:
         url = f"{DEX_BASE}/token-pairs/v1/{chain_id}/{token_address}"
-        res = requests.get(url, timeout=10)
-        res.raise_for_status()
-        data = res.json()
+        data = http_get_json(url, timeout=10)
         if isinstance(data, list) and data:
             return data[0].get("pairAddress")
     except Exception as e:
@@ -40,12 +89,91 @@ def get_pair_address(chain_id, token_address):
     return None
 
 def get_pair_details(chain_id, pair_address):
+    cached = get_cached_pair(pair_address)
+    if cached:
+        return cached
     try:
         url = f"{DEX_BASE}/latest/dex/pairs/{chain_id}/{pair_address}"
-        res = requests.get(url, timeout=10)
-        res.raise_for_status()
-        data = res.json()
-        return data.get("pair")
+        data = http_get_json(url, timeout=10)
+        return cache_pairs([data.get("pair")])[0]
     except Exception as e:
         print(f"⚠️ Failed to fetch pair data for {pair_address}: {e}")
     return None
+
+# ---------- batched lookups ----------
+# Multi-address endpoints accept up to 30 comma-separated addresses
+BATCH_SIZE = 30
+
+def chunked(items, size=BATCH_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def pick_token_pairs(pairs, token_addresses):
+    """
+    Maps each token to the first pair in `pairs` that trades it,
+    preferring pairs where it is the base token (like get_pair_address).
+    """
+    wanted = set(token_addresses)
+    by_base, by_quote = {}, {}
+    for pair in pairs or []:
+        base = (pair.get("baseToken") or {}).get("address")
+        quote = (pair.get("quoteToken") or {}).get("address")
+        if base in wanted:
+            by_base.setdefault(base, pair)
+        if quote in wanted:
+            by_quote.setdefault(quote, pair)
+
+    resolved = {}
+    for token in token_addresses:
+        pair = by_base.get(token) or by_quote.get(token)
+        if pair:
+            resolved[token] = pair
+    return resolved
+
+def get_pairs_for_tokens(chain_id, token_addresses):
+    """
+    Resolves AND hydrates many tokens at once via /tokens/v1.
+    Returns {tokenAddress: PairSnapshot}; tokens without a pair are omitted.
+    """
+    resolved = {}
+    for chunk in chunked(a for a in dict.fromkeys(token_addresses) if a):
+        try:
+            url = f"{DEX_BASE}/tokens/v1/{chain_id}/{','.join(chunk)}"
+            data = http_get_json(url, timeout=10)
+            if isinstance(data, list):
+                picked = pick_token_pairs(data, chunk)
+                resolved.update(zip(picked, cache_pairs(picked.values())))
+        except budget.Deferred:
+            budget.defer("hydrate", chunk, chain_id)
+        except Exception as e:
+            print(f"⚠️ Failed to fetch pairs for {len(chunk)} tokens: {e}")
+    return resolved
+
+def get_pairs_details(chain_id, pair_addresses, fresh=False):
+    """
+    Fetches latest details for many pairs at once.
+    Returns {pairAddress: PairSnapshot}; pairs that could not be fetched
+    (or were deferred, see budget.py) are omitted.
+    fresh=True skips cached snapshots (results still refill the cache).
+    """
+    details, missing = {}, []
+    for pair_address in dict.fromkeys(pair_addresses):
+        cached = get_cached_pair(pair_address) if pair_address and not fresh else None
+        if cached:
+            details[pair_address] = cached
+        elif pair_address:
+            missing.append(pair_address)
+
+    for chunk in chunked(missing):
+        try:
+            url = f"{DEX_BASE}/latest/dex/pairs/{chain_id}/{','.join(chunk)}"
+            data = http_get_json(url, timeout=10)
+            pairs = [p for p in data.get("pairs") or [] if p.get("pairAddress")]
+            for pair in cache_pairs(pairs):
+                details[pair.pair_address] = pair
+        except budget.Deferred:
+            budget.defer("refresh", chunk, chain_id)
+        except Exception as e:
+            print(f"⚠️ Failed to fetch pair data for {len(chunk)} pairs: {e}")
+    return details
@@ -0,0 +1,285 @@
+# shard.py
+"""
+Distributed mode: N scanner workers split the discovered tokens, and one
+leader merges their results into the tracker and sends the digest.
+
+    python shard.py --id w1                  # worker (may also become leader)
+    python shard.py --id w2 --no-leader      # worker only
+
+Every worker heartbeats into the shared state DB (bot_state.db; point
+every host at the same file, or at a copy of it on shared storage) and
+builds a consistent-hash ring over the live workers. A token is scanned
+only by the worker that owns "<chain>:<address>" on the ring, so a
+worker joining or leaving moves about 1/N of the tokens.
+
+Results are written per cycle (a CYCLE_SEC window of wall time) keyed by
+(cycle, pairAddress): a pair scanned by two workers while the ring
+changes is stored once. The leader (a lease in the same DB) merges each
+finished cycle exactly once, in the same transaction that bumps `count`,
+and rejects results that arrive after their cycle was merged.
+"""
+from bisect import bisect
+from threading import Event, Thread
+from typing import Dict, Iterable, List, Optional
+import argparse
+import hashlib
+import os
+import socket
+import sys
+import time
+
+import budget
+import metrics
+import priority
+import recorder
+import trader
+from pair_snapshot import PairSnapshot
+from screener import get_token_candidates
+from scan import (
+    CHAINS, DEFERRED_SOURCE, Funnel, select_candidates, run_multichain_scan, save_reject_cache,
+    with_deferred, save_deferred,
+)
+from rugcheck import drain_refreshes, save_rugcheck_cache
+from state_store import get_store
+from tracker import STATE_LOCK, covers_all_tracked, record_passed_pairs, load_tracked_views
+from telegram_bot import send_alert, flush
+from trader import encode_meta, load_trade_meta_from_tracked
+
+# ---- Configs you can tune ----
+CYCLE_SEC = 600              # one scan per worker per cycle; `count` moves once per cycle
+TICK_SEC = 5                 # heartbeat / lease renewal / leader poll interval (also while scanning)
+WORKER_TTL_SEC = 60          # a worker silent this long leaves the ring
+LEADER_LEASE_SEC = 60        # leader must renew within this window
+MERGE_GRACE_SEC = 120        # wait this long after a cycle ends for slow workers
+SHARD_BUDGET_SEC = CYCLE_SEC - MERGE_GRACE_SEC   # scan deadline; what is left is deferred to the next cycle
+VNODES = 160                 # ring points per worker (smooths the split)
+
+LEADER_LEASE = "leader"
+
+
+# ---------- consistent hashing ----------
+def _hash(key: str) -> int:
+    # stable across processes and hosts (unlike hash())
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent-hash ring; owner(key) is the first worker point clockwise of hash(key)."""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = VNODES):
+        points = sorted((_hash(f"{node}#{i}"), node) for node in set(nodes) for i in range(vnodes))
+        self._keys = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._nodes:
+            return None
+        return self._nodes[bisect(self._keys, _hash(key)) % len(self._nodes)]
+
+def shard_of(candidates: Dict[str, dict], chain_id: str, ring: HashRing, worker_id: str) -> Dict[str, dict]:
+    return {addr: c for addr, c in candidates.items() if ring.owner(f"{chain_id}:{addr}") == worker_id}
+
+def cycle_of(ts: float) -> int:
+    return int(ts // CYCLE_SEC)
+
+
+# ---------- worker ----------
+def scan_shard(worker_id: str, cycle: int, store=None) -> int:
+    """
+    Scans this worker's share of discovery and stores the passed pairs for
+    `cycle`. Requests stop at SHARD_BUDGET_SEC (and before the leader merges
+    the cycle); tokens left without a verdict go first next cycle.
+    """
+    store = store or get_store()
+    now = time.time()
+    budget_sec = min(SHARD_BUDGET_SEC, (cycle + 1) * CYCLE_SEC + MERGE_GRACE_SEC - now)
+    with budget.cycle(budget_sec):
+        stored = _scan_shard(worker_id, cycle, store, now)
+
+    deferred = save_deferred(store)
+    if deferred:
+        print(f"⏱️ [{worker_id}] cycle {cycle}: deferred to the next cycle: {budget.deferred_summary()}")
+    metrics.current().set_counters("deferred", {k: len(set(v)) for k, v in budget.deferred().items()})
+    return stored
+
+def _scan_shard(worker_id: str, cycle: int, store, now: float) -> int:
+    members = store.live_workers(now - WORKER_TTL_SEC)
+    ring = HashRing(set(members) | {worker_id})
+
+    with metrics.stage("discovery"):
+        # carried-over tokens are shared by every worker: keep ours, hand the rest back
+        candidates = with_deferred(get_token_candidates(CHAINS), store)
+        shards = {chain_id: shard_of(candidates.get(chain_id, {}), chain_id, ring, worker_id)
+                  for chain_id in CHAINS}
+        others = [(chain_id, addr) for chain_id, chain in candidates.items() for addr, c in chain.items()
+                  if DEFERRED_SOURCE in c.get("sources", ()) and addr not in shards.get(chain_id, {})]
+        if others:
+            store.defer_tokens(others)
+    with metrics.stage("load_state"):
+        load_trade_meta_from_tracked(store)
+
+    funnels = {chain_id: Funnel() for chain_id in CHAINS}
+    with metrics.stage("scan"):
+        tokens_by_chain = {
+            chain_id: select_candidates(shards[chain_id], funnels[chain_id], chain_id)
+            for chain_id in CHAINS
+        }
+        passed_pairs = run_multichain_scan(tokens_by_chain, funnels=funnels)
+        save_rugcheck_cache()
+        save_reject_cache()
+        priority.save_first_seen()
+    for chain_id, funnel in funnels.items():
+        for st in funnel.stages:
+            metrics.current().record_stage(f"scan.{chain_id}.{st.name}", st.seconds, st.seen, st.kept)
+    metrics.current().set_counters("priority", priority.report(passed_pairs))
+
+    with metrics.stage("shard.put"):
+        stored = store.put_shard_results(cycle, worker_id, [p.to_dict() for p in passed_pairs])
+        # histories for this shard's pairs only; the leader prunes untracked ones
+        metas = trader.TRADE_META
+        store.save_trade_meta({p.pair_address: encode_meta(metas[p.pair_address])
+                               for p in passed_pairs if p.pair_address in metas})
+
+    total = sum(len(tokens) for tokens in tokens_by_chain.values())
+    if stored < len(passed_pairs):
+        print(f"⚠️ [{worker_id}] cycle {cycle} was already merged; {len(passed_pairs)} results dropped")
+    print(f"🧩 [{worker_id}] cycle {cycle}: {total} tokens in shard ({len(members)} workers) -> {stored} passed")
+    return stored
+
+
+# ---------- leader ----------
+def merge_due(now: Optional[float] = None, store=None) -> List[int]:
+    """
+    Merges every finished cycle (older than MERGE_GRACE_SEC) into the tracker:
+    one record_passed_pairs per cycle, in cycle order, atomically with taking
+    the results. Then sends the digest. Returns the merged cycles.
+    """
+    store = store or get_store()
+    now = time.time() if now is None else now
+    through = cycle_of(now - MERGE_GRACE_SEC) - 1
+
+    with metrics.stage("shard.merge"), STATE_LOCK, store.transaction():
+        by_cycle = store.take_shard_results(through)
+        for cycle in sorted(by_cycle):
+            record_passed_pairs([PairSnapshot.from_dict(p) for p in by_cycle[cycle]], store, chains=CHAINS)
+        if by_cycle:
+            store.save_trade_meta({}, keep_ids=store.tracked_ids())
+    if not by_cycle:
+        return []
+
+    for cycle in sorted(by_cycle):
+        print(f"🧩 Merged cycle {cycle}: {len(by_cycle[cycle])} pairs")
+    all_tracked = load_tracked_views(store)
+    with metrics.stage("alert"):
+        # a pair whose refresh failed is missing from the views, not untracked
+        send_alert(all_tracked, complete=covers_all_tracked(all_tracked, store))
+    return sorted(by_cycle)
+
+def prune_workers(now: float, store=None) -> List[str]:
+    store = store or get_store()
+    live = set(store.live_workers(now - WORKER_TTL_SEC))
+    dead = [w for w in store.live_workers(0) if w not in live]
+    if dead:
+        store.remove_workers(dead)
+        print(f"🧩 Workers left the ring: {', '.join(dead)}")
+    return dead
+
+
+# ---------- loop ----------
+def _timed(job: str, fn, *args):
+    cycle = metrics.start_cycle(job)
+    try:
+        return fn(*args)
+    except Exception as e:
+        print(f"❌ {job} failed: {e}")
+    finally:
+        cycle.write()
+        recorder.flush()
+
+class Keepalive:
+    """
+    Heartbeats every TICK_SEC on a background thread, and takes or renews
+    the leader lease (if `lead`), so a scan that blocks the loop for minutes
+    neither drops the worker from the ring nor lets the lease lapse.
+    """
+
+    def __init__(self, worker_id: str, store, lead: bool = True, tick_sec: Optional[float] = None):
+        self.worker_id = worker_id
+        self.store = store
+        self.lead = lead
+        self.tick_sec = TICK_SEC if tick_sec is None else tick_sec
+        self.is_leader = False
+        self._stop = Event()
+        self._thread = Thread(target=self._loop, name=f"shard-keepalive-{worker_id}", daemon=True)
+
+    def beat(self, now: Optional[float] = None) -> bool:
+        """One heartbeat (+ lease attempt). Returns whether this worker leads."""
+        now = time.time() if now is None else now
+        self.store.heartbeat(self.worker_id, now)
+        if self.lead:
+            was_leader = self.is_leader
+            self.is_leader = self.store.acquire_lease(LEADER_LEASE, self.worker_id, LEADER_LEASE_SEC, now)
+            if self.is_leader and not was_leader:
+                print(f"👑 [{self.worker_id}] is now the leader")
+        return self.is_leader
+
+    def _loop(self):
+        while not self._stop.wait(self.tick_sec):
+            try:
+                self.beat()
+            except Exception as e:
+                print(f"⚠️ [{self.worker_id}] heartbeat failed: {e}")
+
+    def start(self) -> "Keepalive":
+        self.beat()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def run(worker_id: str, lead: bool = True, once: bool = False):
+    store = get_store()
+    last_cycle = last_merge = None
+    keepalive = Keepalive(worker_id, store, lead).start()
+    try:
+        while True:
+            now = time.time()
+
+            if keepalive.is_leader:
+                merge_window = cycle_of(now - MERGE_GRACE_SEC)
+                if merge_window != last_merge:  # once per finished cycle
+                    last_merge = merge_window
+                    prune_workers(now, store)
+                    _timed("shard_leader", merge_due, now, store)
+
+            cycle = cycle_of(now)
+            if cycle != last_cycle:
+                last_cycle = cycle
+                _timed("shard_worker", scan_shard, worker_id, cycle, store)
+                if once:
+                    break
+                continue
+            time.sleep(TICK_SEC)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        keepalive.stop()
+        store.remove_workers([worker_id])
+        if keepalive.is_leader:
+            store.release_lease(LEADER_LEASE, worker_id)
+        drain_refreshes()  # background Rugcheck refreshes still in flight
+        save_rugcheck_cache()
+        flush()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sharded scanner worker (one of them also leads)")
+    parser.add_argument("--id", default=f"{socket.gethostname()}-{os.getpid()}", help="unique worker id")
+    parser.add_argument("--no-leader", action="store_true", help="never take the leader lease")
+    parser.add_argument("--once", action="store_true", help="scan one shard and exit")
+    args = parser.parse_args(argv)
+    run(args.id, lead=not args.no_leader, once=args.once)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
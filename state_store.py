@@ -0,0 +1,426 @@
+# state_store.py
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from threading import RLock
+from typing import Dict, Iterable, List, Optional
+import json
+import sqlite3
+import time
+
+STATE_DB = "bot_state.db"
+LEGACY_TRACKED_FILE = "tracked_pairs.json"
+LEGACY_TRADE_META_FILE = "trade_meta_store.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracked_pairs (
+    pair_address TEXT PRIMARY KEY,
+    count        INTEGER NOT NULL,
+    last_seen    TEXT,
+    state        TEXT NOT NULL,         -- JSON: rug/market/trade fields
+    chain        TEXT NOT NULL DEFAULT 'solana'
+);
+-- last alert delivered per pair (telegram_bot.py): restarts only send what changed
+CREATE TABLE IF NOT EXISTS alert_state (
+    pair_address TEXT PRIMARY KEY,
+    state        TEXT NOT NULL          -- JSON: log_formatter.alert_state()
+);
+CREATE TABLE IF NOT EXISTS trade_meta (
+    pair_address TEXT PRIMARY KEY,
+    meta         TEXT NOT NULL          -- JSON: trader histories + votes
+);
+CREATE TABLE IF NOT EXISTS pair_history (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    pair_address  TEXT NOT NULL,
+    ts            TEXT NOT NULL,
+    count         INTEGER,
+    trade_signal  TEXT,
+    market_score  REAL,
+    rug_score     INTEGER,
+    price_usd     REAL
+);
+CREATE INDEX IF NOT EXISTS idx_pair_history_pair ON pair_history (pair_address, ts);
+CREATE TABLE IF NOT EXISTS migrations (
+    name       TEXT PRIMARY KEY,
+    applied_at TEXT NOT NULL
+);
+-- sharded workers (shard.py)
+CREATE TABLE IF NOT EXISTS shard_workers (
+    worker_id  TEXT PRIMARY KEY,
+    heartbeat  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shard_results (
+    cycle        INTEGER NOT NULL,
+    pair_address TEXT NOT NULL,
+    worker_id    TEXT NOT NULL,
+    pair         TEXT NOT NULL,         -- JSON: scored + enriched pair
+    PRIMARY KEY (cycle, pair_address)
+);
+CREATE TABLE IF NOT EXISTS shard_cycles (
+    cycle      INTEGER PRIMARY KEY,     -- merged cycles; late results for these are rejected
+    merged_at  TEXT NOT NULL,
+    pairs      INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name     TEXT PRIMARY KEY,
+    holder   TEXT NOT NULL,
+    expires  REAL NOT NULL
+);
+-- tokens a cycle ran out of budget for (budget.py); scanned first next cycle
+CREATE TABLE IF NOT EXISTS deferred_tokens (
+    chain        TEXT NOT NULL,
+    address      TEXT NOT NULL,
+    deferred_at  REAL NOT NULL,
+    PRIMARY KEY (chain, address)
+);
+"""
+
+# columns kept out of the JSON blob
+_ENTRY_COLUMNS = ("count", "last_seen", "chain")
+DEFAULT_CHAIN = "solana"
+
+
+def _ids_json(ids: Iterable[str]) -> str:
+    return json.dumps([i for i in ids if i])
+
+
+class StateStore:
+    """
+    SQLite (WAL) store for tracker + trader state. Writes touch only the
+    rows that changed; decay is a single UPDATE; reads go by pairAddress.
+    """
+
+    def __init__(self, path=STATE_DB):
+        self.path = Path(path)
+        self._lock = RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._add_chain_column()
+
+    def _add_chain_column(self):
+        """Databases created before multi-chain support: every pair was Solana."""
+        cols = {row[1] for row in self._conn.execute("PRAGMA table_info(tracked_pairs)")}
+        if "chain" not in cols:
+            self._conn.execute(f"ALTER TABLE tracked_pairs ADD COLUMN chain TEXT NOT NULL DEFAULT '{DEFAULT_CHAIN}'")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tracked_pairs_chain ON tracked_pairs (chain)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """All-or-nothing write block; nests by joining the outer transaction."""
+        with self._lock:
+            if self._conn.in_transaction:
+                yield self._conn
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ---------- tracked pairs ----------
+    @staticmethod
+    def _row_to_entry(row) -> dict:
+        entry = json.loads(row["state"])
+        entry["count"] = row["count"]
+        entry["last_seen"] = row["last_seen"]
+        entry["chain"] = row["chain"]
+        return entry
+
+    def load_pairs(self, pair_ids: Optional[Iterable[str]] = None,
+                   chain: Optional[str] = None) -> Dict[str, dict]:
+        sql, args = "SELECT * FROM tracked_pairs WHERE 1=1", []
+        if pair_ids is not None:
+            sql += " AND pair_address IN (SELECT value FROM json_each(?))"
+            args.append(_ids_json(pair_ids))
+        if chain is not None:
+            sql += " AND chain = ?"
+            args.append(chain)
+        with self._lock:
+            return {row["pair_address"]: self._row_to_entry(row) for row in self._conn.execute(sql, args)}
+
+    def get_pair(self, pair_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM tracked_pairs WHERE pair_address = ?", (pair_id,)
+            ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def tracked_ids(self, chain: Optional[str] = None) -> set:
+        with self._lock:
+            if chain is None:
+                rows = self._conn.execute("SELECT pair_address FROM tracked_pairs")
+            else:
+                rows = self._conn.execute("SELECT pair_address FROM tracked_pairs WHERE chain = ?", (chain,))
+            return {row[0] for row in rows}
+
+    def upsert_pairs(self, entries: Dict[str, dict]):
+        rows = []
+        for pair_id, entry in entries.items():
+            state = {k: v for k, v in entry.items() if k not in _ENTRY_COLUMNS}
+            rows.append((pair_id, int(entry.get("count", 0)), entry.get("last_seen"), json.dumps(state),
+                         entry.get("chain") or DEFAULT_CHAIN))
+        with self.transaction() as conn:
+            conn.executemany(
+                """INSERT INTO tracked_pairs (pair_address, count, last_seen, state, chain)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(pair_address) DO UPDATE SET
+                       count = excluded.count,
+                       last_seen = excluded.last_seen,
+                       state = excluded.state,
+                       chain = excluded.chain""",
+                rows,
+            )
+
+    def decay_unseen(self, seen_ids: Iterable[str], chains: Optional[Iterable[str]] = None) -> int:
+        """
+        count - 1 for every pair not seen this round (only on `chains`, if given);
+        drops those reaching 0. Returns #dropped.
+        """
+        sql = "UPDATE tracked_pairs SET count = count - 1 WHERE pair_address NOT IN (SELECT value FROM json_each(?))"
+        args = [_ids_json(seen_ids)]
+        if chains is not None:
+            sql += " AND chain IN (SELECT value FROM json_each(?))"
+            args.append(_ids_json(chains))
+        with self.transaction() as conn:
+            conn.execute(sql, args)
+            return conn.execute("DELETE FROM tracked_pairs WHERE count <= 0").rowcount
+
+    def decay_seen_before(self, cutoff_iso: str) -> int:
+        """count - 1 for pairs whose last_seen is older than cutoff; drops those reaching 0."""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE tracked_pairs SET count = count - 1 WHERE last_seen IS NULL OR last_seen < ?",
+                (cutoff_iso,),
+            )
+            return conn.execute("DELETE FROM tracked_pairs WHERE count <= 0").rowcount
+
+    def append_history(self, rows: Iterable[dict]):
+        with self.transaction() as conn:
+            conn.executemany(
+                """INSERT INTO pair_history
+                   (pair_address, ts, count, trade_signal, market_score, rug_score, price_usd)
+                   VALUES (:pair_address, :ts, :count, :trade_signal, :market_score, :rug_score, :price_usd)""",
+                list(rows),
+            )
+
+    def history(self, pair_id: str, limit: int = 100) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM pair_history WHERE pair_address = ? ORDER BY ts DESC, id DESC LIMIT ?",
+                (pair_id, limit),
+            )
+            return [dict(row) for row in rows]
+
+    # ---------- trade meta ----------
+    def load_trade_meta(self, pair_ids: Iterable[str]) -> Dict[str, dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT pair_address, meta FROM trade_meta WHERE pair_address IN (SELECT value FROM json_each(?))",
+                (_ids_json(pair_ids),),
+            )
+            return {row[0]: json.loads(row[1]) for row in rows}
+
+    def save_trade_meta(self, metas: Dict[str, dict], keep_ids: Optional[Iterable[str]] = None):
+        """Upserts `metas`; if keep_ids is given, deletes every other row."""
+        with self.transaction() as conn:
+            conn.executemany(
+                """INSERT INTO trade_meta (pair_address, meta) VALUES (?, ?)
+                   ON CONFLICT(pair_address) DO UPDATE SET meta = excluded.meta""",
+                [(pid, json.dumps(meta)) for pid, meta in metas.items()],
+            )
+            if keep_ids is not None:
+                conn.execute(
+                    "DELETE FROM trade_meta WHERE pair_address NOT IN (SELECT value FROM json_each(?))",
+                    (_ids_json(keep_ids),),
+                )
+
+    # ---------- sent alerts ----------
+    def load_alert_state(self) -> Dict[str, tuple]:
+        with self._lock:
+            rows = self._conn.execute("SELECT pair_address, state FROM alert_state")
+            return {row[0]: tuple(json.loads(row[1])) for row in rows}
+
+    def save_alert_state(self, sent: Optional[Dict[str, tuple]] = None, drop_ids: Iterable[str] = (),
+                         keep_ids: Optional[Iterable[str]] = None):
+        """Upserts `sent`, deletes `drop_ids` and, if keep_ids is given, every row not in it."""
+        with self.transaction() as conn:
+            conn.executemany(
+                """INSERT INTO alert_state (pair_address, state) VALUES (?, ?)
+                   ON CONFLICT(pair_address) DO UPDATE SET state = excluded.state""",
+                [(pid, json.dumps(list(state))) for pid, state in (sent or {}).items()],
+            )
+            conn.executemany("DELETE FROM alert_state WHERE pair_address = ?", [(pid,) for pid in drop_ids])
+            if keep_ids is not None:
+                conn.execute(
+                    "DELETE FROM alert_state WHERE pair_address NOT IN (SELECT value FROM json_each(?))",
+                    (_ids_json(keep_ids),),
+                )
+
+    # ---------- sharded workers ----------
+    def heartbeat(self, worker_id: str, now: Optional[float] = None):
+        with self.transaction() as conn:
+            conn.execute(
+                """INSERT INTO shard_workers (worker_id, heartbeat) VALUES (?, ?)
+                   ON CONFLICT(worker_id) DO UPDATE SET heartbeat = excluded.heartbeat""",
+                (worker_id, time.time() if now is None else now),
+            )
+
+    def live_workers(self, since: float) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT worker_id FROM shard_workers WHERE heartbeat >= ? ORDER BY worker_id", (since,)
+            )
+            return [row[0] for row in rows]
+
+    def remove_workers(self, worker_ids: Iterable[str]):
+        with self.transaction() as conn:
+            conn.execute(
+                "DELETE FROM shard_workers WHERE worker_id IN (SELECT value FROM json_each(?))",
+                (_ids_json(worker_ids),),
+            )
+
+    def acquire_lease(self, name: str, holder: str, ttl_sec: float, now: Optional[float] = None) -> bool:
+        """Takes or renews `name` for `holder` unless someone else holds an unexpired lease."""
+        now = time.time() if now is None else now
+        with self.transaction() as conn:
+            row = conn.execute("SELECT holder, expires FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row["holder"] != holder and row["expires"] > now:
+                return False
+            conn.execute(
+                """INSERT INTO leases (name, holder, expires) VALUES (?, ?, ?)
+                   ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires = excluded.expires""",
+                (name, holder, now + ttl_sec),
+            )
+            return True
+
+    def release_lease(self, name: str, holder: str):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+    def put_shard_results(self, cycle: int, worker_id: str, pairs: Iterable[dict]) -> int:
+        """
+        Stores a worker's passed pairs (PairSnapshot.to_dict()) for `cycle`.
+        The same pair from two workers in one cycle (shards moving mid-cycle)
+        is kept once; results for a cycle that was already merged are
+        rejected. Returns #stored.
+        """
+        rows = [(cycle, p["pair_address"], worker_id, json.dumps(p, default=str))
+                for p in pairs if p.get("pair_address")]
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM shard_cycles WHERE cycle = ?", (cycle,)).fetchone():
+                return 0
+            conn.executemany(
+                """INSERT INTO shard_results (cycle, pair_address, worker_id, pair) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(cycle, pair_address) DO UPDATE SET
+                       worker_id = excluded.worker_id,
+                       pair = excluded.pair""",
+                rows,
+            )
+        return len(rows)
+
+    def take_shard_results(self, through_cycle: int) -> Dict[int, List[dict]]:
+        """
+        Removes and returns {cycle: [pair, ...]} for every cycle <= through_cycle
+        and marks those cycles merged. Run it inside the transaction that applies
+        the results, so a crash either merges a cycle fully or not at all.
+        """
+        by_cycle: Dict[int, List[dict]] = {}
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT cycle, pair FROM shard_results WHERE cycle <= ? ORDER BY cycle, pair_address",
+                (through_cycle,),
+            )
+            for row in rows:
+                by_cycle.setdefault(row["cycle"], []).append(json.loads(row["pair"]))
+            now_iso = datetime.utcnow().isoformat()
+            conn.executemany(
+                "INSERT OR IGNORE INTO shard_cycles (cycle, merged_at, pairs) VALUES (?, ?, ?)",
+                [(cycle, now_iso, len(pairs)) for cycle, pairs in by_cycle.items()],
+            )
+            conn.execute("DELETE FROM shard_results WHERE cycle <= ?", (through_cycle,))
+        return by_cycle
+
+    def is_merged(self, cycle: int) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM shard_cycles WHERE cycle = ?", (cycle,)).fetchone() is not None
+
+    # ---------- deferred work ----------
+    def defer_tokens(self, tokens: Iterable[tuple], now: Optional[float] = None):
+        """tokens: (chain, address) pairs; a token deferred again keeps its first timestamp."""
+        now = time.time() if now is None else now
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO deferred_tokens (chain, address, deferred_at) VALUES (?, ?, ?)",
+                [(chain, address, now) for chain, address in tokens if chain and address],
+            )
+
+    def take_deferred_tokens(self, max_age_sec: float, now: Optional[float] = None) -> Dict[str, List[str]]:
+        """Removes every deferred token; returns {chain: [address, ...]} (oldest first) for those newer than max_age_sec."""
+        cutoff = (time.time() if now is None else now) - max_age_sec
+        by_chain: Dict[str, List[str]] = {}
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT chain, address FROM deferred_tokens WHERE deferred_at >= ? ORDER BY deferred_at, address",
+                (cutoff,),
+            )
+            for row in rows:
+                by_chain.setdefault(row["chain"], []).append(row["address"])
+            conn.execute("DELETE FROM deferred_tokens")
+        return by_chain
+
+    # ---------- one-time JSON migration ----------
+    def migrate_from_json(self, tracked_file=LEGACY_TRACKED_FILE,
+                          trade_meta_file=LEGACY_TRADE_META_FILE) -> bool:
+        """Imports the legacy JSON files once. Returns True if a migration ran."""
+        name = "json_v1"
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+                return False
+
+            tracked = _load_legacy_json(Path(tracked_file))
+            trade_meta = _load_legacy_json(Path(trade_meta_file))
+            if tracked:
+                self.upsert_pairs(tracked)
+            if trade_meta:
+                self.save_trade_meta(trade_meta)
+
+            conn.execute(
+                "INSERT INTO migrations (name, applied_at) VALUES (?, ?)",
+                (name, datetime.utcnow().isoformat()),
+            )
+        if tracked or trade_meta:
+            print(f"📦 Migrated {len(tracked)} tracked pairs and {len(trade_meta)} trade metas into {self.path}")
+        return True
+
+
+def _load_legacy_json(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Failed to load {path}: {e}")
+        return {}
+
+
+_STORE: Optional[StateStore] = None
+_STORE_LOCK = RLock()
+
+def get_store(path=STATE_DB) -> StateStore:
+    """Process-wide store; opened (and migrated from JSON) on first use."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None or _STORE.path != Path(path):
+            _STORE = StateStore(path)
+            _STORE.migrate_from_json()
+        return _STORE
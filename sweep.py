@@ -0,0 +1,286 @@
+# sweep.py
+"""
+Parameter sweep for the filters.py / trader.py tunables against recorded
+snapshots (recorder.py).
+
+    python sweep.py space.json --mode random --samples 10000 --top 20
+
+space.json maps "<module>.<CONSTANT>[.<key or index>]" to candidate values:
+
+    {
+      "filters.EARLY_TURNOVER_MIN": [1.0, 1.5, 2.0, 3.0],
+      "filters.EARLY_LIQ_BAND.1": [200000, 300000, 500000],
+      "filters.WEIGHTS.upside": {"uniform": [25, 45]},
+      "trader.ENTRY_RATIO": [1.5, 2.0, 2.5]
+    }
+
+A list is a grid axis (random mode picks from it); {"uniform": [a, b]} and
+{"int": [a, b]} are random-only ranges. A row "succeeds" if its price is up
+SUCCESS_GAIN_PCT after the horizon; a row "passes" if score_market labels it
+x10-ready / x100-candidate under its chain's profile (filters.chain_profile),
+with the combination's filters.* values applied on top. Filter-only combinations are pure column math;
+each distinct trader combination costs one replay (cached per worker).
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import csv
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import filters
+import trader
+from recorder import SNAPSHOT_DIR, load_snapshots, row_to_pair
+from replay import forward_returns, parse_horizon, replay_signals
+
+# ---- Configs you can tune ----
+HORIZON = "24h"
+SUCCESS_GAIN_PCT = 50.0
+RANK_BY = "f1"
+SIGNAL_CACHE_MAX = 32         # distinct trader combos kept per worker
+
+MODULES = {"filters": filters, "trader": trader}
+
+
+# ---------- search space ----------
+def grid(space: Dict[str, Any]) -> List[Dict[str, Any]]:
+    for key, values in space.items():
+        if not isinstance(values, list):
+            raise ValueError(f"{key}: grid mode needs a list of values")
+    keys = list(space)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(space[k] for k in keys))]
+
+def sample(space: Dict[str, Any], n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+
+    def draw(spec):
+        if isinstance(spec, list):
+            return rng.choice(spec)
+        if "uniform" in spec:
+            return rng.uniform(*spec["uniform"])
+        if "int" in spec:
+            return rng.randint(*spec["int"])
+        raise ValueError(f"unknown range spec {spec!r}")
+
+    return [{key: draw(spec) for key, spec in space.items()} for _ in range(n)]
+
+
+# ---------- applying parameters ----------
+def _resolve(key: str) -> Tuple[Any, str, Optional[str]]:
+    parts = key.split(".")
+    if len(parts) not in (2, 3) or parts[0] not in MODULES:
+        raise ValueError(f"bad parameter {key!r}; expected <{'|'.join(MODULES)}>.<NAME>[.<key>]")
+    module = MODULES[parts[0]]
+    if not hasattr(module, parts[1]):
+        raise ValueError(f"{parts[0]} has no {parts[1]}")
+    return module, parts[1], (parts[2] if len(parts) == 3 else None)
+
+def _with_item(container, sub: str, value):
+    if isinstance(container, dict):
+        updated = dict(container)
+        updated[sub] = value
+        return updated
+    items = list(container)
+    items[int(sub)] = value
+    return tuple(items)
+
+def profile_for(chain_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """filters.chain_profile(chain_id) with the filters.* parameters of a combination applied."""
+    profile = filters.chain_profile(chain_id)
+    for key, value in params.items():
+        module, name, sub = _resolve(key)
+        if module is not filters:
+            continue
+        if isinstance(value, list):
+            value = tuple(value)
+        profile[name] = value if sub is None else _with_item(profile[name], sub, value)
+    return profile
+
+@contextmanager
+def overrides(params: Dict[str, Any]):
+    """Temporarily sets module constants (this process only); trader.* parameters use this."""
+    saved = []
+    try:
+        for key, value in params.items():
+            module, name, sub = _resolve(key)
+            current = getattr(module, name)
+            saved.append((module, name, current))
+            if isinstance(value, list):
+                value = tuple(value)
+            setattr(module, name, value if sub is None else _with_item(current, sub, value))
+        filters.invalidate_profiles()
+        yield
+    finally:
+        for module, name, value in reversed(saved):
+            setattr(module, name, value)
+        filters.invalidate_profiles()
+
+
+# ---------- dataset (loaded once in the parent, inherited read-only by forked workers) ----------
+_DATA: Dict[str, Any] = {}
+_SIGNALS: Dict[tuple, np.ndarray] = {}
+
+def load_dataset(root=SNAPSHOT_DIR, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 horizon: str = HORIZON) -> Dict[str, Any]:
+    frame = load_snapshots(root, start, end)
+    fwd = forward_returns(frame, parse_horizon(horizon))
+    valid = np.isfinite(fwd)
+    chains = frame["chain"].astype(str)
+    return {
+        "frame": frame,
+        "cols": filters.market_columns([row_to_pair(frame, i) for i in range(len(frame["ts"]))]),
+        "now_ms": frame["ts"] * 1000.0,
+        "by_chain": {chain_id: np.flatnonzero(chains == chain_id) for chain_id in np.unique(chains).tolist()},
+        "fwd": fwd,
+        "valid": valid,
+        "success": valid & (np.nan_to_num(fwd, nan=-np.inf) >= SUCCESS_GAIN_PCT),
+    }
+
+def _init_worker(loader_args):
+    if not _DATA:  # spawn platforms: no inherited memory, load our own copy
+        _DATA.update(load_dataset(*loader_args))
+
+def _signals(trader_params: Dict[str, Any]) -> np.ndarray:
+    key = tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in trader_params.items()))
+    if key not in _SIGNALS:
+        if len(_SIGNALS) >= SIGNAL_CACHE_MAX:
+            _SIGNALS.pop(next(iter(_SIGNALS)))
+        with overrides(trader_params):
+            _SIGNALS[key] = replay_signals(_DATA["frame"])
+    return _SIGNALS[key]
+
+
+# ---------- evaluation ----------
+def _mean(values: np.ndarray) -> Optional[float]:
+    return round(float(values.mean()), 3) if len(values) else None
+
+def evaluate(params: Dict[str, Any]) -> Dict[str, Any]:
+    d = _DATA
+    trader_params = {k: v for k, v in params.items() if k.startswith("trader.")}
+
+    passed = np.zeros(len(d["valid"]), dtype=bool)
+    for chain_id, rows in d["by_chain"].items():  # each row scores under its own chain's profile
+        res = filters.score_columns(d["cols"][rows], d["now_ms"][rows], exact=False,
+                                    profile=profile_for(chain_id, params))
+        passed[rows] = res["passed"]
+    passed &= d["valid"]
+    success = d["success"]
+
+    hits = int((passed & success).sum())
+    n_pass = int(passed.sum())
+    n_success = int(success.sum())
+    precision = hits / n_pass if n_pass else 0.0
+    recall = hits / n_success if n_success else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    entries = passed & (_signals(trader_params) == "Entry")
+    entry_fwd = d["fwd"][entries]
+    return {
+        "params": params,
+        "passed": n_pass,
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "pass_mean_pct": _mean(d["fwd"][passed]),
+        "entries": int(entries.sum()),
+        "entry_mean_pct": _mean(entry_fwd),
+        "entry_hit_rate": _mean(entry_fwd > 0),
+    }
+
+def _evaluate_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [evaluate(params) for params in chunk]
+
+def run_sweep(combos: List[Dict[str, Any]], loader_args: tuple, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Evaluates every combination on a process pool; same-trader combos share a chunk (and a replay)."""
+    workers = workers or os.cpu_count() or 1
+    combos = sorted(combos, key=lambda p: json.dumps({k: v for k, v in p.items() if k.startswith("trader.")}, sort_keys=True))
+    size = max(1, math.ceil(len(combos) / (workers * 4)))
+    chunks = [combos[i:i + size] for i in range(0, len(combos), size)]
+
+    if workers == 1:
+        return [r for chunk in chunks for r in _evaluate_chunk(chunk)]
+
+    method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(method),
+                             initializer=_init_worker, initargs=(loader_args,)) as pool:
+        return [r for results in pool.map(_evaluate_chunk, chunks) for r in results]
+
+def rank(results: List[Dict[str, Any]], by: str = RANK_BY) -> List[Dict[str, Any]]:
+    return sorted(results, key=lambda r: (r[by] is not None, r[by] or 0), reverse=True)
+
+def format_table(results: List[Dict[str, Any]], top: int) -> str:
+    cols = ("passed", "precision", "recall", "f1", "pass_mean_pct", "entries", "entry_mean_pct", "entry_hit_rate")
+    lines = ["#    " + " ".join(f"{c:>14}" for c in cols) + "  params"]
+    for i, r in enumerate(results[:top], 1):
+        cells = " ".join(f"{'-' if r[c] is None else r[c]:>14}" for c in cols)
+        params = ", ".join(f"{k}={round(v, 4) if isinstance(v, float) else v}" for k, v in r["params"].items())
+        lines.append(f"{i:<4} {cells}  {params}")
+    return "\n".join(lines)
+
+def _write(results: List[Dict[str, Any]], path: str):
+    if path.endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        keys = [k for k in results[0] if k != "params"]
+        param_keys = list(results[0]["params"])
+        writer.writerow(param_keys + keys)
+        for r in results:
+            writer.writerow([r["params"][k] for k in param_keys] + [r[k] for k in keys])
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sweep filter/trader thresholds over recorded snapshots")
+    parser.add_argument("space", help="JSON search space")
+    parser.add_argument("--mode", choices=("grid", "random"), default="grid")
+    parser.add_argument("--samples", type=int, default=1000, help="random mode: combinations to try")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--root", default=str(SNAPSHOT_DIR))
+    parser.add_argument("--start", help="UTC start, ISO format")
+    parser.add_argument("--end", help="UTC end, ISO format")
+    parser.add_argument("--horizon", default=HORIZON)
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--rank-by", default=RANK_BY)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="write every result to .csv or .json")
+    args = parser.parse_args(argv)
+
+    with open(args.space, "r", encoding="utf-8") as f:
+        space = json.load(f)
+    for key in space:
+        _resolve(key)  # fail fast on typos
+    combos = grid(space) if args.mode == "grid" else sample(space, args.samples, args.seed)
+
+    loader_args = (args.root, datetime.fromisoformat(args.start) if args.start else None,
+                   datetime.fromisoformat(args.end) if args.end else None, args.horizon)
+    t0 = time.perf_counter()
+    _DATA.update(load_dataset(*loader_args))
+    rows = len(_DATA["fwd"])
+    if not rows:
+        print(f"⚠️ No snapshots under {args.root} for that window")
+        return 1
+    print(f"📦 {rows:,} snapshots ({int(_DATA['valid'].sum()):,} with a {args.horizon} outcome, "
+          f"{int(_DATA['success'].sum()):,} up ≥ {SUCCESS_GAIN_PCT:g}%) loaded in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    results = rank(run_sweep(combos, loader_args, args.workers), args.rank_by)
+    print(f"🧪 {len(results):,} combinations in {time.perf_counter() - t0:.1f}s")
+    print(format_table(results, args.top))
+    if args.out:
+        _write(results, args.out)
+        print(f"💾 Results written to {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,189 @@
 import os
-from telegram import Bot
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from http_client import TokenBucket
+from log_formatter import alert_state, chunk_messages, render_pair
+from pair_snapshot import PairSnapshot
+from state_store import get_store
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "<your_bot_token>")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "<your_chat_id>")
 
-bot = Bot(token=TELEGRAM_BOT_TOKEN)
+# ---- Delivery ----
+MESSAGE_LIMIT = 4000           # Telegram rejects > 4096 chars; keep headroom
+SEND_RATE = (1.0, 3)           # messages/sec, burst (Telegram: ~1/s per chat)
+SEND_RETRIES = 3
+ALERT_FORMAT = "plain"         # plain | markdown | html | compact (see log_formatter.FORMATS)
+PARSE_MODES = {"markdown": "MarkdownV2", "html": "HTML"}
 
-def send_telegram_message(text: str):
+# Print alerts to stdout instead of sending them (cli.py --dry-run sets this)
+DRY_RUN = os.getenv("TELEGRAM_DRY_RUN", "0") == "1"
+
+_BOT = None
+
+# (text, parse_mode, {pairAddress: alert_state()} the message carries, or None)
+_QUEUE: "queue.Queue[Tuple[str, Optional[str], Optional[dict]]]" = queue.Queue()
+_BUCKET = TokenBucket(*SEND_RATE)
+_WORKER_LOCK = threading.Lock()
+_WORKER = None
+
+# pairAddress -> alert_state() last delivered (kept in the state store, so one-shot
+# runs diff against the previous run); PENDING_STATE: queued, not delivered yet
+SENT_STATE: Dict[str, tuple] = {}
+PENDING_STATE: Dict[str, tuple] = {}
+_STATE_LOCK = threading.Lock()
+_STATE_LOADED = False
+
+
+def get_bot():
+    """The Telegram client, created on the first send (python-telegram-bot is slow to import)."""
+    global _BOT
+    if _BOT is None:
+        from telegram import Bot
+        _BOT = Bot(token=TELEGRAM_BOT_TOKEN)
+    return _BOT
+
+def _deliver(text: str, parse_mode: Optional[str] = None):
+    if DRY_RUN:
+        print(f"📨 [dry-run] Telegram message:\n{text}")
+        return
+    from telegram.error import RetryAfter
+
+    for attempt in range(SEND_RETRIES + 1):
+        _BUCKET.acquire()
+        try:
+            get_bot().send_message(chat_id=TELEGRAM_CHAT_ID, text=text, parse_mode=parse_mode,
+                             disable_web_page_preview=True)
+            return
+        except RetryAfter as e:  # flood control: Telegram tells us how long to back off
+            if attempt >= SEND_RETRIES:
+                raise
+            time.sleep(float(e.retry_after))
+
+def _load_sent_state():
+    """Fills SENT_STATE from the store once per process (call with _STATE_LOCK held)."""
+    global _STATE_LOADED
+    if _STATE_LOADED:
+        return
+    _STATE_LOADED = True
     try:
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=text, disable_web_page_preview=True)
+        SENT_STATE.update(get_store().load_alert_state())
     except Exception as e:
-        print(f"[Telegram] Failed to send message: {e}")
+        print(f"⚠️ Failed to load sent alert state: {e}")
+
+def _persist(**changes):
+    try:
+        get_store().save_alert_state(**changes)
+    except Exception as e:
+        print(f"⚠️ Failed to save sent alert state: {e}")
+
+def _settle(states: Optional[dict], delivered: bool):
+    """
+    Marks a message's pairs as sent once it is delivered. On failure they
+    are forgotten instead, so the next send_alert() alerts them again.
+    """
+    if not states:
+        return
+    sent, dropped = {}, []
+    with _STATE_LOCK:
+        for pair_id, state in states.items():
+            # a different pending state: re-queued since, or forgotten (untracked) meanwhile
+            if PENDING_STATE.get(pair_id) == state:
+                del PENDING_STATE[pair_id]
+                if delivered:
+                    SENT_STATE[pair_id] = sent[pair_id] = state
+            if not delivered and SENT_STATE.get(pair_id) == state:
+                del SENT_STATE[pair_id]  # an earlier piece of an oversized block got through
+                dropped.append(pair_id)
+        if sent or dropped:
+            _persist(sent=sent, drop_ids=dropped)
+
+def _worker():
+    while True:
+        text, parse_mode, states = _QUEUE.get()
+        try:
+            _deliver(text, parse_mode)
+            _settle(states, delivered=True)
+        except Exception as e:
+            print(f"[Telegram] Failed to send message: {e}")
+            _settle(states, delivered=False)
+        finally:
+            _QUEUE.task_done()
+
+def _ensure_worker():
+    global _WORKER
+    with _WORKER_LOCK:
+        if _WORKER is None or not _WORKER.is_alive():
+            _WORKER = threading.Thread(target=_worker, name="telegram-sender", daemon=True)
+            _WORKER.start()
+
+def send_telegram_message(text: str):
+    """Queues `text` (split under the size limit) for background delivery; returns immediately."""
+    if not text:
+        return
+    _ensure_worker()
+    for message in chunk_messages(text.split("\n"), MESSAGE_LIMIT):
+        _QUEUE.put((message, None, None))
+
+def changed_pairs(pairs: List[PairSnapshot]) -> List[PairSnapshot]:
+    """Pairs whose signal, count tier or rug status differ from what was last sent (or queued)."""
+    def last(pair_id):
+        return PENDING_STATE.get(pair_id, SENT_STATE.get(pair_id))
+    return [p for p in pairs if last(p.pair_address) != alert_state(p)]
+
+def pack_messages(pairs: List[PairSnapshot], fmt: str = ALERT_FORMAT) -> List[Tuple[str, List[PairSnapshot]]]:
+    """Like chunk_messages() over the rendered blocks, but keeps which pairs each message carries."""
+    packed, text, members = [], "", []
+    for pair in pairs:
+        block = render_pair(pair, fmt)
+        candidate = f"{text}\n{block}" if text else block
+        if len(candidate) <= MESSAGE_LIMIT:
+            text, members = candidate, members + [pair]
+            continue
+        if text:
+            packed.append((text, members))
+        text, members = (block, [pair]) if len(block) <= MESSAGE_LIMIT else ("", [])
+        if not members:  # a block over the limit on its own: split, every piece carries the pair
+            packed.extend((piece, [pair]) for piece in chunk_messages([block], MESSAGE_LIMIT))
+    if text:
+        packed.append((text, members))
+    return packed
+
+def send_alert(pairs: List[PairSnapshot], complete: bool = True, fmt: str = ALERT_FORMAT) -> int:
+    """
+    Diff-only alert: queues only pairs that changed since the last alert,
+    packed into as few messages as fit. A pair counts as sent once its
+    message is delivered. complete=True means `pairs` is every tracked
+    pair, so the others are forgotten (a comeback is alerted again).
+    Returns how many pairs were queued.
+    """
+    with _STATE_LOCK:
+        _load_sent_state()
+        changed = changed_pairs(pairs)
+        if complete:
+            tracked = {p.pair_address for p in pairs}
+            for states in (SENT_STATE, PENDING_STATE):
+                for pair_id in [pid for pid in states if pid not in tracked]:
+                    del states[pair_id]
+            _persist(keep_ids=tracked)
+        for p in changed:
+            PENDING_STATE[p.pair_address] = alert_state(p)
+
+    if not changed:
+        return 0
+    _ensure_worker()
+    for message, members in pack_messages(changed, fmt):
+        _QUEUE.put((message, PARSE_MODES.get(fmt), {p.pair_address: alert_state(p) for p in members}))
+    return len(changed)
+
+def flush(timeout: float = 30.0) -> bool:
+    """Waits until queued messages are delivered (e.g. before a one-shot run exits)."""
+    deadline = time.monotonic() + timeout
+    while _QUEUE.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
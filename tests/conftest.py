@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+FIXTURES = ROOT / "fixtures"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A fresh StateStore in a temp working dir; get_store() returns it."""
+    import state_store
+
+    monkeypatch.chdir(tmp_path)
+    s = state_store.StateStore(state_store.STATE_DB)
+    monkeypatch.setattr(state_store, "_STORE", s)
+    yield s
+    s.close()
@@ -0,0 +1,94 @@
+import pytest
+
+import budget
+
+
+def test_breaker_opens_after_the_failure_limit():
+    breaker = budget.CircuitBreaker("api", failures=3, open_sec=60)
+    for _ in range(2):
+        breaker.failure(now=0)
+    assert breaker.state == "closed" and breaker.allow(now=0)
+
+    breaker.failure(now=0)
+    assert breaker.state == "open"
+    assert not breaker.allow(now=59)
+    assert breaker.skipped == 1
+
+
+def test_a_success_resets_the_count():
+    breaker = budget.CircuitBreaker("api", failures=3)
+    breaker.failure(now=0)
+    breaker.failure(now=0)
+    breaker.success()
+    breaker.failure(now=0)
+    assert breaker.state == "closed"
+
+
+@pytest.mark.parametrize("probe_ok, state", [(True, "closed"), (False, "open")])
+def test_one_half_open_probe_after_open_sec(probe_ok, state):
+    breaker = budget.CircuitBreaker("api", failures=1, open_sec=60)
+    breaker.failure(now=0)
+
+    assert breaker.allow(now=60)
+    assert breaker.state == "half_open"
+    assert not breaker.allow(now=61)  # only one probe at a time
+    if probe_ok:
+        breaker.success()
+    else:
+        breaker.failure(now=62)
+    assert breaker.state == state
+    assert breaker.allow(now=63) is probe_ok
+    if not probe_ok:  # re-opened: the next probe waits a full open_sec again
+        assert not breaker.allow(now=121)
+        assert breaker.allow(now=122)
+
+
+def test_a_lost_probe_frees_its_slot():
+    breaker = budget.CircuitBreaker("api", failures=1, open_sec=60)
+    breaker.failure(now=0)
+    assert breaker.allow(now=60)  # the probe never reports back
+    assert not breaker.allow(now=100)
+    assert breaker.allow(now=120)
+
+
+def test_check_defers_past_the_deadline(monkeypatch):
+    monkeypatch.setattr(budget, "_BREAKERS", {})
+    assert budget.check("api", 10) == 10  # no cycle: no deadline
+    with budget.cycle(5):
+        assert budget.check("api", 10) <= 5  # timeouts are capped at the time left
+    with budget.cycle(budget.MIN_REQUEST_SEC / 2):
+        with pytest.raises(budget.Deferred) as e:
+            budget.check("api", 10)
+    assert e.value.reason == "deadline"
+
+    breaker = budget.breaker_for("api")
+    for _ in range(budget.BREAKER_FAILURES):
+        breaker.failure()
+    with pytest.raises(budget.Deferred) as e:
+        budget.check("api", 10)
+    assert e.value.reason == "circuit_open"
+
+
+def test_nested_cycles_only_tighten_the_deadline():
+    with budget.cycle(100):
+        with budget.cycle(1000):
+            assert budget.time_left() <= 100
+        with budget.cycle(10):
+            assert budget.time_left() <= 10
+        assert 10 < budget.time_left() <= 100
+    assert budget.time_left() is None
+
+
+def test_defer_is_a_no_op_outside_a_cycle():
+    with budget.cycle(60):
+        budget.defer("hydrate", ["A", "", None, "B"], "solana")
+        budget.defer("rugcheck", ["C"], "solana")
+    assert budget.deferred() == {"hydrate": [("solana", "A"), ("solana", "B")], "rugcheck": [("solana", "C")]}
+    assert budget.deferred_summary() == "hydrate 2, rugcheck 1"
+
+    budget.defer("hydrate", ["D"], "solana")  # after the cycle: dropped
+    assert budget.deferred()["hydrate"] == [("solana", "A"), ("solana", "B")]
+
+    with budget.cycle(60):  # a new cycle starts empty
+        assert budget.deferred() == {}
+        assert budget.deferred_summary() == "nothing"
@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import filters
+import sweep
+from pair_snapshot import PairSnapshot
+
+NOW_MS = 1_760_000_000_000
+
+
+def _pair(chain_id, liq, fdv):
+    return PairSnapshot(
+        pair_address=f"{chain_id}-{liq:.0f}", chain_id=chain_id, created_ms=NOW_MS - 10 * 3_600_000,
+        liq=liq, fdv=fdv, v1h=150_000, v6h=700_000, v24h=6_000_000,
+        buys_h1=100, sells_h1=100, buys_h6=500, sells_h6=500, m5=3, h1c=10, h24c=80,
+    )
+
+
+def test_chain_profile_leaves_the_module_alone():
+    base = filters.chain_profile("base", X10_MIN_SCORE=1)
+    assert base["EARLY_FDV_MAX"] == filters.CHAIN_PROFILES["base"]["EARLY_FDV_MAX"]
+    assert base["X10_MIN_SCORE"] == 1
+    assert filters.EARLY_FDV_MAX == filters.chain_profile("solana")["EARLY_FDV_MAX"]
+    assert filters.X10_MIN_SCORE != 1
+
+
+def test_profiles_score_side_by_side():
+    # over the Solana FDV cap, inside the Base one
+    pair = _pair("base", 400_000, 2_500_000)
+    solana, base = filters.chain_profile("solana"), filters.chain_profile("base")
+    assert filters.score_market(pair, NOW_MS, profile=solana)["label"] == "reject"
+    assert filters.score_market(pair, NOW_MS, profile=base)["label"] == "x10-ready"
+
+    # threads scoring different chains at once don't see each other's constants
+    jobs = [solana, base] * 200
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        labels = list(pool.map(lambda p: filters.score_market(pair, NOW_MS, profile=p)["label"], jobs))
+    assert labels == ["reject", "x10-ready"] * 200
+
+    batch = filters.score_market_batch([pair], NOW_MS, profile=base)
+    assert batch.result(0) == filters.score_market(pair, NOW_MS, profile=base)
+
+
+def test_sweep_values_apply_on_top_of_the_chain_profile():
+    profile = sweep.profile_for("base", {"filters.EARLY_LIQ_BAND.1": 600_000, "trader.ENTRY_RATIO": 9})
+    assert profile["EARLY_LIQ_BAND"] == (filters.CHAIN_PROFILES["base"]["EARLY_LIQ_BAND"][0], 600_000)
+    assert profile["EARLY_FDV_MAX"] == filters.CHAIN_PROFILES["base"]["EARLY_FDV_MAX"]
+
+
+def test_profile_names_cover_every_tunable():
+    # a new constant must be listed in PROFILE_NAMES (or here, if scoring doesn't read it)
+    not_scoring = {"CHAIN_PROFILES", "MARKET_FIELDS", "PASS_LABELS", "PROFILE_NAMES", "RULES_FILE", "RULE_FIELDS"}
+    constants = {n for n in vars(filters) if n.isupper() and not n.startswith("_")}
+    assert constants - not_scoring == set(filters.PROFILE_NAMES)
+
+
+def test_default_profile_follows_sweep_overrides():
+    pair = _pair("solana", 400_000, 2_500_000)
+    assert filters.score_market(pair, NOW_MS)["label"] == "reject"  # caches the default profile
+    with sweep.overrides({"filters.EARLY_FDV_MAX": 3_000_000, "filters.EARLY_LIQ_BAND.1": 500_000}):
+        assert filters.score_market(pair, NOW_MS)["label"] == "x10-ready"
+    assert filters.score_market(pair, NOW_MS)["label"] == "reject"
@@ -0,0 +1,99 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import budget
+import http_client
+
+URL = "https://api.dexscreener.com/tokens/v1/solana/Mint"
+ENDPOINT = http_client.endpoint_name(URL)
+
+
+class FakeSession:
+    """Answers get() with the queued (status, headers) in turn; the last one repeats."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        status, headers = self.replies[min(self.calls, len(self.replies) - 1)]
+        self.calls += 1
+        return SimpleNamespace(status_code=status, headers=headers, url=url)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """http_client with a fake clock (sleep advances it), fresh buckets / stats / breakers and a settable session."""
+    clock = SimpleNamespace(now=1000.0, slept=[])
+
+    def sleep(sec):
+        clock.slept.append(sec)
+        clock.now += sec
+    monkeypatch.setattr(http_client, "time", SimpleNamespace(
+        monotonic=lambda: clock.now, sleep=sleep, perf_counter=time.perf_counter, time=time.time))
+    monkeypatch.setattr(http_client.random, "uniform", lambda low, high: high)  # the jitter's upper bound
+    monkeypatch.setattr(http_client, "_BUCKETS", {})
+    monkeypatch.setattr(budget, "_BREAKERS", {})
+    http_client.reset_stats()
+
+    def use(replies):
+        session = FakeSession(replies)
+        monkeypatch.setattr(http_client, "session_for", lambda url: session)
+        return session
+    return clock, use
+
+
+def test_429_waits_for_retry_after(client):
+    clock, use = client
+    session = use([(429, {"Retry-After": "2"}), (429, {"Retry-After": "600"}), (200, {})])
+
+    assert http_client.http_get(URL).status_code == 200
+    assert session.calls == 3
+    assert clock.slept == [2.0, http_client.RETRY_AFTER_MAX_SEC]  # the server's delay, capped
+    stats = http_client.get_stats()[ENDPOINT]
+    assert (stats["requests"], stats["retries"], stats["errors"]) == (3, 2, 2)
+    assert budget.breaker_for(ENDPOINT).state == "closed"
+
+
+def test_5xx_backs_off_up_to_the_retry_limit(client):
+    clock, use = client
+    session = use([(503, {})])
+
+    assert http_client.http_get(URL).status_code == 503  # the last response, after every retry
+    assert session.calls == http_client.MAX_RETRIES + 1
+    assert clock.slept == [http_client.BACKOFF_BASE_SEC * 2 ** a for a in range(http_client.MAX_RETRIES)]
+    stats = http_client.get_stats()[ENDPOINT]
+    assert (stats["requests"], stats["retries"], stats["errors"]) == (4, 3, 4)
+    assert budget.breaker_for(ENDPOINT).failures == 4
+
+    # one more failed attempt opens the breaker: later calls are skipped without a request
+    session.calls = 0
+    assert http_client.http_get(URL, retries=0).status_code == 503
+    with pytest.raises(budget.Deferred):
+        http_client.http_get(URL)
+    assert session.calls == 1
+    assert http_client.get_stats()[ENDPOINT]["deferred"] == 1
+
+
+def test_backoff_never_exceeds_the_cap(client):
+    assert http_client.backoff_delay(10) == http_client.BACKOFF_MAX_SEC
+    assert http_client.backoff_delay(0, retry_after=1.5) == 1.5
+
+
+def test_bucket_throttles_past_the_burst(client):
+    clock, use = client
+    use([(200, {})])
+    rate, burst = http_client.RATE_LIMITS["api.dexscreener.com"]
+
+    for _ in range(burst + 2):  # all at the same instant
+        http_client.http_get(URL)
+    assert http_client.get_stats()[ENDPOINT]["throttled"] == 2
+    assert clock.slept == [pytest.approx(1 / rate)] * 2
+
+    # profiles/boosts have their own, slower bucket
+    boosts = "https://api.dexscreener.com/token-boosts/latest/v1"
+    for _ in range(http_client.RATE_LIMITS["api.dexscreener.com/token-boosts"][1]):
+        http_client.http_get(boosts)
+    assert http_client.get_stats()[http_client.endpoint_name(boosts)]["throttled"] == 0
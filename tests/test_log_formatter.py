@@ -0,0 +1,95 @@
+import json
+import re
+from html.parser import HTMLParser
+
+import pytest
+
+import log_formatter
+from conftest import FIXTURES
+from pair_snapshot import PairSnapshot
+
+MD_RESERVED = set("_*[]()~`>#+-=|{}.!\\")
+MD_LINK = re.compile(r"\[((?:\\.|[^\]\\])*)\]\(((?:\\.|[^)\\])*)\)")
+
+
+def _fixture_pairs():
+    raw = json.loads((FIXTURES / "dexscreener_pairs.json").read_text(encoding="utf-8"))
+    no_change = {k: v for k, v in raw[0].items() if k != "priceChange"}
+    no_change["pairAddress"] = "NoPriceChange"
+    pairs = [PairSnapshot.from_api(p) for p in raw + [no_change]]
+    for i, pair in enumerate(pairs):
+        pair.count = 5 * (i % 2)
+        pair.trade_signal = ("Entry", "Watching", "Exit", "No Signal")[i % 4]
+        pair.trade_reasons = ["Buy/Sell ratio ≥ 2.0", "1h price in -5%…20% band"]
+        pair.rug_status, pair.rug_score = "✅ Good (v1.2)", 91
+        pair.rug_reasons = ["Top_10 holders > 30%", "Mint authority (enabled)!"]
+        pair.rug_link = f"https://rugcheck.xyz/tokens/{pair.base_address}"
+        pair.market_label, pair.market_score, pair.potential_multiple = "Early+", 72.5, 12.0
+        pair.market_checks = {"liq": True, "fdv": False}
+    # link targets with the two characters that are special inside (...)
+    pairs[0].url = "https://dexscreener.com/solana/pair_(v2)\\x"
+    return pairs
+
+
+def _unescaped_reserved(text: str) -> list:
+    """Reserved MarkdownV2 characters that are neither escaped nor part of *bold* / [link](url) markup."""
+    found = []
+    for line in text.split("\n"):
+        for link in MD_LINK.finditer(line):
+            assert re.fullmatch(r"(?:\\[)\\]|[^)\\])*", link.group(2)), link.group(2)
+        line = MD_LINK.sub(lambda m: m.group(1), line)
+        if line.startswith("*") and line.endswith("*") and len(line) > 1:
+            line = line[1:-1]
+        i = 0
+        while i < len(line):
+            if line[i] == "\\":
+                assert i + 1 < len(line) and line[i + 1] in MD_RESERVED, line
+                i += 2
+                continue
+            if line[i] in MD_RESERVED:
+                found.append((line[i], line))
+            i += 1
+    return found
+
+
+@pytest.mark.parametrize("fmt", sorted(log_formatter.RENDERERS))
+def test_every_format_renders_fixture_pairs(fmt):
+    for pair in _fixture_pairs():
+        text = log_formatter.render_pair(pair, fmt)
+        assert pair.base_symbol in text.replace("\\", "")
+
+
+@pytest.mark.parametrize("fmt", sorted(log_formatter.RENDERERS))
+def test_missing_24h_change_shows_na(fmt):
+    pairs = _fixture_pairs()
+    missing = pairs[-1]
+    assert missing.h24c is None
+    text = log_formatter.render_pair(missing, fmt).replace("\\", "")
+    assert re.search(r"24H (Change: )?N/A\b(?!%)", text)
+    missing.h24c = 0.0  # a real 0% move still reads as a number
+    assert re.search(r"24H (Change: )?0%", log_formatter.render_pair(missing, fmt).replace("\\", ""))
+
+
+def test_markdown_escapes_every_reserved_character():
+    for pair in _fixture_pairs():
+        text = log_formatter.render_pair(pair, "markdown")
+        assert _unescaped_reserved(text) == []
+        assert "\\|" in text.split("\n")[0]  # the header separator
+
+
+def test_markdown_link_targets_are_escaped():
+    text = log_formatter.render_pair(_fixture_pairs()[0], "markdown")
+    assert "(https://dexscreener.com/solana/pair_(v2\\)\\\\x)" in text
+
+
+def test_html_only_uses_bold_and_links():
+    tags = []
+
+    class Collect(HTMLParser):
+        def handle_starttag(self, tag, attrs):
+            tags.append(tag)
+
+    for pair in _fixture_pairs():
+        pair.base_symbol = "<b>&DOGE"
+        Collect().feed(log_formatter.render_pair(pair, "html"))
+    assert set(tags) == {"b", "a"}
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+import cache
+import onchain
+
+EXPECTED_MINTS = {
+    "9jiLWMq51Wgd75bEZH9Py5yGQKBVvbnLgtia1jucLj7y",   # pump.fun, created twice in the recording
+    "6anbDQNCcVh2f6okexjaX1VGj6tEnizJ1kV5UTBS8Zhi",   # pump.fun
+    "4ibv16qwGBTYXExSz4BR1RHssWKUmoscjnYADKE4epb4",   # Raydium initialize2
+    "h82pJGF9p7kpzb6eU326EFZf2cDnimbTFVeJtx1qtBmU",   # Raydium initialize2 through a router
+}
+FAILED_TX_MINT = "DZWrf1AwHskfZCF1ncTYEyCqLqHzBGrD5yWK4evaumKq"
+
+
+@pytest.fixture
+def events():
+    return onchain.load_events()
+
+def _source(event):
+    return {address: name for name, address in onchain.PROGRAMS.items()}[event["program"]]
+
+
+def test_decoders_find_the_recorded_mints(events):
+    assert len(events["events"]) == 9
+    found = []
+    for event in events["events"]:
+        logs = event["value"]["logs"]
+        if _source(event) == "pumpfun":
+            found += onchain.pumpfun_mints(logs)
+        elif onchain.is_raydium_init(logs):
+            found += onchain.raydium_mints(events["transactions"][event["value"]["signature"]])
+    assert set(found) == EXPECTED_MINTS | {FAILED_TX_MINT}  # the decoders don't look at err
+    assert not set(found) & onchain.QUOTE_MINTS
+
+    assert onchain.pumpfun_mints(["Program data: not base64!", "Program log: x"]) == []
+    assert onchain.raydium_mints(None) == []
+
+
+def test_listener_reports_each_new_mint_once(events, monkeypatch):
+    monkeypatch.setattr(onchain, "SEEN", cache.TTLCache(onchain.SEEN_TTL_SEC))
+    monkeypatch.setattr(onchain, "STATS", dict.fromkeys(onchain.STATS, 0))
+    onchain.drain()
+
+    class FixtureListener(onchain.PoolListener):
+        async def get_transaction(self, session, signature):
+            return events["transactions"].get(signature)
+
+    async def replay():
+        listener = FixtureListener("ws://127.0.0.1:8900/")
+        for event in events["events"]:
+            await listener.handle(None, _source(event), event["value"])
+        await asyncio.gather(*listener._tasks)
+
+    asyncio.run(replay())
+    found = onchain.drain()
+    assert set(found) == EXPECTED_MINTS  # not the failed transaction's
+    assert {found[m]["source"] for m in found} == {"pumpfun", "raydium"}
+    assert onchain.stats() == {"notifications": 9, "pools": 5, "mints": 4, "failed_tx": 0, "reconnects": 0}
@@ -0,0 +1,67 @@
+import pytest
+
+import cache
+import priority
+from pair_snapshot import PairSnapshot
+
+NOW = 1_760_000_000.0
+CANDIDATES = {  # discovery order
+    "Profile":  {"boost": 0.0, "sources": ["profiles_latest"]},
+    "Latest":   {"boost": 5.0, "sources": ["boosts_latest"]},
+    "Deferred": {"boost": 0.0, "sources": ["deferred"]},
+    "TopBoost": {"boost": 500.0, "sources": ["boosts_top", "profiles_latest"]},
+    "Tracked":  {"boost": 0.0, "sources": ["profiles_latest"]},
+}
+
+
+@pytest.fixture
+def ranking(store, tmp_path, monkeypatch):
+    """priority.py on a temp first_seen file and store; "Tracked" is tracked with market score 90."""
+    path = tmp_path / priority.FIRST_SEEN_FILE
+    monkeypatch.setattr(priority, "FIRST_SEEN", cache.PersistentTTLCache(path, stale_ttl_sec=0))
+    monkeypatch.setattr(priority, "_RANKER", None)
+    monkeypatch.setattr(priority, "_STATS", dict.fromkeys(priority._STATS, 0))
+    monkeypatch.setattr(priority, "_POSITIONS", {})
+    store.upsert_pairs({"PTracked": {"count": 2, "last_seen": "2026-10-01T00:00:00", "chain": "solana",
+                                     "mint": "Tracked", "market_score": 90}})
+    return path
+
+
+def test_expected_value_order(ranking):
+    assert priority.rank("solana", CANDIDATES, now=NOW) == ["Tracked", "TopBoost", "Deferred", "Latest", "Profile"]
+
+    # half an hour later a new profile listing outranks the old one
+    fresh = dict(CANDIDATES, Newer={"boost": 0.0, "sources": ["profiles_latest"]})
+    order = priority.rank("solana", fresh, now=NOW + priority.RECENCY_HALF_LIFE_SEC)
+    assert order.index("Newer") < order.index("Profile")
+
+    stats = priority.report([PairSnapshot(chain_id="solana", base_address="Tracked")])
+    assert (stats["tokens"], stats["tracked"], stats["new"], stats["passed"]) == (11, 2, 6, 1)
+    assert stats["passed_mean_rank_pct"] == 0.0
+
+
+def test_discovery_order_and_custom_rankers(ranking, monkeypatch, capsys):
+    monkeypatch.setattr(priority, "PRIORITY_RANKER", "discovery_order")
+    assert priority.rank("solana", CANDIDATES, now=NOW) == list(CANDIDATES)
+
+    priority.set_ranker(lambda s: s["boost"])  # ties keep discovery order
+    assert priority.rank("solana", CANDIDATES, now=NOW) == ["TopBoost", "Latest", "Profile", "Deferred", "Tracked"]
+    priority.set_ranker(lambda s: 1 / 0)
+    assert priority.rank("solana", CANDIDATES, now=NOW) == list(CANDIDATES)
+    assert "keeping discovery order" in capsys.readouterr().out
+
+    priority.set_ranker(None)
+    monkeypatch.setattr(priority, "PRIORITY_RANKER", "no_such_ranker")
+    assert priority.rank("solana", CANDIDATES, now=NOW)[0] == "Tracked"  # falls back to expected_value
+    assert "Unknown PRIORITY_RANKER" in capsys.readouterr().out
+
+
+def test_first_seen_survives_a_restart(ranking, monkeypatch):
+    priority.rank("solana", CANDIDATES, now=NOW)
+    priority.save_first_seen()
+
+    monkeypatch.setattr(priority, "FIRST_SEEN", cache.PersistentTTLCache(ranking, stale_ttl_sec=0))
+    sigs = priority.signals("solana", dict(CANDIDATES, Newer={}), now=NOW + 600)
+    assert sigs["TopBoost"]["age_sec"] == 600
+    assert sigs["Newer"]["age_sec"] == 0
+    assert priority.signals("base", {"TopBoost": {}}, now=NOW + 600)["TopBoost"]["age_sec"] == 0  # per chain
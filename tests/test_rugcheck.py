@@ -0,0 +1,85 @@
+import json
+import time
+from threading import Event
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+import rugcheck
+
+SAFE = {"topHolders": [{"pct": 2}] * 10, "totalHolders": 1000, "markets": [{"lp": {"lpLockedPct": 100}}],
+        "creatorBalance": 0}
+RISKY = {}                                                  # no holders / LP data: 50
+DANGER = {"mintAuthority": "x", "transferFee": {"pct": 10}}  # 30
+RUGGED = {"rugged": True}
+
+
+def _report(mint, body):
+    return dict(body, mint=mint)
+
+
+@pytest.fixture
+def rug_cache(tmp_path, monkeypatch):
+    """rugcheck.RUG_CACHE on a temp file with a settable clock."""
+    clock = SimpleNamespace(now=time.time())
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=lambda: clock.now, monotonic=time.monotonic))
+    path = tmp_path / rugcheck.RUG_CACHE_FILE
+    monkeypatch.setattr(rugcheck, "RUG_CACHE", cache.PersistentTTLCache(path, stale_ttl_sec=rugcheck.RUG_STALE_SEC))
+    return path, clock
+
+
+@pytest.mark.parametrize("status, body", [("safe", SAFE), ("risky", RISKY), ("danger", DANGER), ("rugged", RUGGED)])
+def test_each_status_is_cached_for_its_ttl(rug_cache, monkeypatch, status, body):
+    _, clock = rug_cache
+    start = clock.now
+    evaluation = rugcheck.store_rugcheck_report("Mint", _report("Mint", body))
+    assert evaluation[0].split()[-1].lower() == status
+    monkeypatch.setattr(rugcheck, "get_rugcheck_report", lambda mint: pytest.fail("fetched while fresh"))
+
+    clock.now = start + rugcheck.RUG_TTL_SEC[status] - 1
+    assert rugcheck.get_rugcheck_evaluation("Mint") == evaluation
+    assert rugcheck.RUG_CACHE.get("Mint")[1]  # still fresh
+    clock.now = start + rugcheck.RUG_TTL_SEC[status] + 1
+    assert not rugcheck.RUG_CACHE.get("Mint")[1]
+
+
+def test_stale_entries_are_served_while_refreshing(rug_cache, monkeypatch):
+    path, clock = rug_cache
+    risky = rugcheck.store_rugcheck_report("Mint", _report("Mint", RISKY))
+    clock.now += rugcheck.RUG_TTL_SEC["risky"] + 60
+
+    release = Event()
+    fetched = []
+    def slow_report(mint):
+        release.wait(5)
+        fetched.append(mint)
+        return _report(mint, SAFE)
+    monkeypatch.setattr(rugcheck, "get_rugcheck_report", slow_report)
+
+    # the stale verdict comes back at once; one refresh runs however often it is asked for
+    assert rugcheck.get_rugcheck_evaluation("Mint") == risky
+    assert rugcheck.get_rugcheck_evaluation("Mint") == risky
+    release.set()
+    assert rugcheck.drain_refreshes(timeout=5) == 0
+    assert fetched == ["Mint"]
+
+    safe = rugcheck.get_rugcheck_evaluation("Mint")
+    assert safe[0] == "🟩 Safe"
+    rugcheck.save_rugcheck_cache()
+    assert json.loads(path.read_text(encoding="utf-8"))["Mint"]["value"]["evaluation"] == list(safe)
+
+
+def test_a_failed_refresh_keeps_the_stale_entry(rug_cache, monkeypatch):
+    _, clock = rug_cache
+    risky = rugcheck.store_rugcheck_report("Mint", _report("Mint", RISKY))
+    monkeypatch.setattr(rugcheck, "get_rugcheck_report", lambda mint: None)  # Rugcheck is down
+
+    clock.now += rugcheck.RUG_TTL_SEC["risky"] + 60
+    assert rugcheck.get_rugcheck_evaluation("Mint") == risky
+    assert rugcheck.drain_refreshes(timeout=5) == 0
+    assert rugcheck.get_cached_evaluation("Mint") == risky
+
+    # past the stale window it is a miss and is fetched again
+    clock.now += rugcheck.RUG_STALE_SEC
+    assert rugcheck.get_cached_evaluation("Mint") is None
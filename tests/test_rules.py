@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import filters
+import rules
+from pair_snapshot import PairSnapshot
+
+NOW_MS = 1_760_000_000_000
+
+# name: chain, age_h (None = no creation time), liq, fdv, v1h, v6h, v24h,
+#       (buys, sells) h1, (buys, sells) h6, m5, h1c, h24c
+PAIRS = {
+    "early_x100":       ("solana", 10,  80_000,    400_000,    120_000, 600_000, 1_200_000, (100, 100), (500, 480), 5, 20, 150),
+    "early_band_top":   ("solana", 10,  250_000,   1_400_000,  150_000, 700_000, 3_000_000, (110, 100), (520, 500), 3, 10, 80),
+    "early_weak_mkt":   ("solana", 10,  60_000,    1_000_000,  20_000,  100_000, 2_100_000, (300, 100), (900, 300), 40, 90, 500),
+    "early_liq_low":    ("solana", 10,  20_000,    100_000,    150_000, 600_000, 1_500_000, (100, 100), (500, 500), 1, 5, 30),
+    "early_fdv_high":   ("solana", 10,  200_000,   2_000_000,  150_000, 600_000, 5_000_000, (100, 100), (500, 500), 1, 5, 30),
+    "early_turnover":   ("solana", 10,  100_000,   600_000,    150_000, 600_000, 1_000_000, (100, 100), (500, 500), 1, 5, 30),
+    "old_x10":          ("solana", 200, 400_000,   2_000_000,  80_000,  400_000, 1_500_000, (100, 100), (500, 500), 1, 5, 40),
+    "old_liq_fdv_out":  ("solana", 200, 1_500_000, 2_000_000,  80_000,  400_000, 1_500_000, (100, 100), (500, 500), 1, 5, 40),
+    "old_fdv_high":     ("solana", 200, 900_000,   12_000_000, 80_000,  400_000, 9_000_000, (100, 100), (500, 500), 1, 5, 40),
+    "old_over_cap":     ("solana", 200, 6_000_000, 20_000_000, 80_000,  400_000, 20_000_000, (100, 100), (500, 500), 1, 5, 40),
+    "old_low_upside":   ("solana", 200, 900_000,   9_000_000,  80_000,  400_000, 6_000_000, (100, 100), (500, 500), 1, 5, 40),
+    "no_created":       ("solana", None, 400_000,  2_000_000,  80_000,  400_000, 1_500_000, (100, 100), (500, 500), 1, 5, 40),
+    "zero_fdv":         ("solana", 10,  80_000,    0,          120_000, 600_000, 1_200_000, (100, 0),   (500, 0),   5, 20, 150),
+    "base_early":       ("base",   10,  400_000,   2_500_000,  150_000, 700_000, 6_000_000, (100, 100), (500, 500), 3, 10, 80),
+    "sol_same_as_base": ("solana", 10,  400_000,   2_500_000,  150_000, 700_000, 6_000_000, (100, 100), (500, 500), 3, 10, 80),
+    "bsc_old_liq":      ("bsc",    200, 120_000,   1_000_000,  80_000,  400_000, 1_500_000, (100, 100), (500, 500), 1, 5, 40),
+    "sol_old_liq":      ("solana", 200, 120_000,   1_000_000,  80_000,  400_000, 1_500_000, (100, 100), (500, 500), 1, 5, 40),
+}
+
+# name: label, score, potential_multiple, prefilter_market, failed reported rules
+EXPECTED = {
+    "early_x100": ("x100-candidate", 100.0, 500.0, True, []),
+    "early_band_top": ("x100-candidate", 100.0, 142.9, True, []),
+    "early_weak_mkt": ("reject", 65.59, 200.0, True, ["bs_h1_ok", "bs_h6_ok", "liq_fdv_ok", "momentum_ok", "vol1h_ok", "vol6h_ok"]),
+    "early_liq_low": ("reject", 93.33, 2000.0, False, ["liq_ok"]),
+    "early_fdv_high": ("reject", 85.39, 100.0, False, ["fdv_ok", "liq_fdv_ok"]),
+    "early_turnover": ("reject", 94.71, 333.3, True, ["turnover_ok"]),
+    "old_x10": ("x10-ready", 85.42, 25.0, True, []),
+    "old_liq_fdv_out": ("x10-ready", 77.48, 25.0, True, ["liq_fdv_ok"]),
+    "old_fdv_high": ("reject", 61.84, 4.2, False, ["fdv_ok"]),
+    "old_over_cap": ("reject", 47.92, 2.5, False, ["fdv_ok", "liq_ok", "within_liq_cap_ok"]),
+    "old_low_upside": ("reject", 73.86, 5.6, False, []),
+    "no_created": ("x10-ready", 85.42, 25.0, True, []),
+    "zero_fdv": ("reject", 76.18, 200000000.0, True, ["bs_h1_ok", "bs_h6_ok", "liq_fdv_ok", "turnover_ok"]),
+    "base_early": ("x10-ready", 88.33, 40.0, True, []),
+    "sol_same_as_base": ("reject", 82.78, 80.0, False, ["fdv_ok", "liq_ok"]),
+    "bsc_old_liq": ("reject", 79.72, 30.0, False, ["liq_ok"]),
+    "sol_old_liq": ("x10-ready", 90.28, 50.0, True, []),
+}
+
+
+def _pair(name):
+    chain, age_h, liq, fdv, v1h, v6h, v24h, h1, h6, m5, h1c, h24c = PAIRS[name]
+    return PairSnapshot(
+        pair_address=name, chain_id=chain, created_ms=0 if age_h is None else NOW_MS - age_h * 3_600_000,
+        liq=liq, fdv=fdv, v1h=v1h, v6h=v6h, v24h=v24h, buys_h1=h1[0], sells_h1=h1[1],
+        buys_h6=h6[0], sells_h6=h6[1], m5=m5, h1c=h1c, h24c=h24c,
+    )
+
+def _summary(res):
+    failed = sorted(k for k, v in res["market"].items() if v is False)
+    return res["label"], res["score"], res["potential_multiple"], failed
+
+
+@pytest.mark.parametrize("name", sorted(PAIRS))
+def test_scalar_batch_and_prefilter_agree_with_the_table(name):
+    pair = _pair(name)
+    profile = filters.chain_profile(pair.chain_id)
+    label, score, multiple, prefilter, failed = EXPECTED[name]
+
+    scalar = filters.score_market(pair, NOW_MS, profile=profile)
+    assert _summary(scalar) == (label, score, multiple, failed)
+    assert filters.score_market_batch([pair], NOW_MS, profile=profile).result(0) == scalar
+    assert filters.prefilter_market(pair, now_ms=NOW_MS, profile=profile) is prefilter
+    if not prefilter:  # lossless: only pairs that score_market rejects
+        assert label == "reject"
+
+
+def test_one_batch_per_chain_matches_the_scalar_path():
+    for chain in {spec[0] for spec in PAIRS.values()}:
+        names = sorted(n for n, spec in PAIRS.items() if spec[0] == chain)
+        pairs = [_pair(n) for n in names]
+        profile = filters.chain_profile(chain)
+        batch = filters.score_market_batch(pairs, NOW_MS, profile=profile)
+        for i, pair in enumerate(pairs):
+            assert batch.result(i) == filters.score_market(pair, NOW_MS, profile=profile)
+            assert batch.labels[i] == EXPECTED[names[i]][0]
+
+
+@pytest.fixture
+def loader(tmp_path):
+    path = tmp_path / "market_rules.json"
+    shutil.copy(rules.RULES_FILE, path)
+    return path, rules.RuleLoader(path, vars(filters), filters.RULE_FIELDS, check_sec=0)
+
+def _rewrite(path, text):
+    path.write_text(text, encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))  # a new mtime even on coarse clocks
+
+
+def test_broken_rules_file_keeps_the_previous_rules(loader, capsys):
+    path, rule_loader = loader
+    good = rule_loader.get()
+    spec = json.loads(path.read_text(encoding="utf-8"))
+
+    _rewrite(path, path.read_text(encoding="utf-8")[:-20])  # truncated JSON
+    assert rule_loader.get() is good
+    assert "keeping the previous rules" in capsys.readouterr().out
+
+    spec["rules"][0]["all"][0]["max"] = "NO_SUCH_CONSTANT"
+    _rewrite(path, json.dumps(spec))
+    assert rule_loader.get() is good
+    assert "NO_SUCH_CONSTANT" in capsys.readouterr().out
+
+    # the broken file is reported once, not on every check
+    assert rule_loader.get() is good
+    assert capsys.readouterr().out == ""
+
+    spec["rules"][0]["all"][0]["max"] = "liq_limit"
+    spec["rules"] = spec["rules"][1:]
+    _rewrite(path, json.dumps(spec))
+    fixed = rule_loader.get()
+    assert fixed is not good
+    assert fixed.names == good.names[1:]
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import budget
+import cache
+import http_client
+import rugcheck
+import scan
+import screener
+import trader
+from conftest import FIXTURES
+from offline import FixtureTransport
+from pair_snapshot import PairSnapshot
+
+
+def _pair(token, liq, fdv):
+    """An early Solana pair: liq 80k / FDV 400k passes score_market, liq 20k doesn't."""
+    return PairSnapshot(
+        pair_address=f"P{token}", chain_id="solana", base_address=token,
+        created_ms=int(time.time() * 1000) - 10 * 3_600_000, liq=liq, fdv=fdv,
+        v1h=120_000, v6h=600_000, v24h=1_200_000, buys_h1=100, sells_h1=100,
+        buys_h6=500, sells_h6=480, m5=5, h1c=20, h24c=150,
+    )
+
+
+@pytest.fixture
+def rejects(tmp_path, monkeypatch):
+    """scan.REJECT_CACHE on a temp file, with a settable clock and fresh hit/add counters."""
+    clock = SimpleNamespace(now=time.time())
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=lambda: clock.now, monotonic=time.monotonic))
+    path = tmp_path / scan.REJECT_CACHE_FILE
+    monkeypatch.setattr(scan, "REJECT_CACHE", cache.PersistentTTLCache(path, stale_ttl_sec=0))
+    monkeypatch.setattr(scan, "REJECT_HITS", {})
+    monkeypatch.setattr(scan, "REJECT_ADDED", {})
+    return path, clock
+
+
+@pytest.mark.parametrize("reason", sorted(scan.REJECT_TTL_SEC))
+def test_each_reason_expires_after_its_ttl(rejects, reason):
+    _, clock = rejects
+    start = clock.now
+    scan.remember_reject("solana", "Mint", reason)
+
+    clock.now = start + scan.REJECT_TTL_SEC[reason] - 1
+    assert scan.is_rejected("solana", "Mint")
+    assert not scan.is_rejected("base", "Mint")  # per chain
+    clock.now = start + scan.REJECT_TTL_SEC[reason] + 1
+    assert not scan.is_rejected("solana", "Mint")
+    assert scan.reject_stats() == {"hits": {reason: 1}, "added": {reason: 1}}
+
+
+def test_a_rejected_token_is_skipped_next_cycle(rejects, monkeypatch):
+    path, _ = rejects
+    pairs = {"Weak": _pair("Weak", 20_000, 100_000), "Rugged": _pair("Rugged", 80_000, 400_000)}
+    monkeypatch.setattr(scan, "get_rugcheck_evaluation",
+                        lambda mint: ("💀 Rugged", 0, [], f"https://rugcheck.xyz/tokens/{mint}"))
+
+    assert scan.scan_tokens(list(pairs), pairs=pairs) == []
+    assert scan.reject_stats(reset=True)["added"] == {"market": 1, "rugged": 1}
+    scan.save_reject_cache()
+
+    # the next cycle (a new process) reads the file and asks for nothing
+    monkeypatch.setattr(scan, "REJECT_CACHE", cache.PersistentTTLCache(path, stale_ttl_sec=0))
+    funnel = scan.Funnel()
+    assert scan.scan_tokens(list(pairs), funnel=funnel, pairs={}) == []
+    rejected = next(st for st in funnel.stages if st.name == "rejected")
+    assert (rejected.seen, rejected.kept) == (2, 0)
+    assert scan.reject_stats()["hits"] == {"market": 1, "rugged": 1}
+
+
+def test_a_deferred_token_is_not_cached_as_rejected(rejects, monkeypatch):
+    def out_of_time(mint):
+        raise budget.Deferred("deadline", "rugcheck")
+    monkeypatch.setattr(scan, "get_rugcheck_evaluation", out_of_time)
+
+    pairs = {"Good": _pair("Good", 80_000, 400_000)}
+    with budget.cycle(60):
+        assert scan.scan_tokens(["Good"], pairs=pairs) == []
+        assert scan.deferred_tokens() == {("solana", "Good")}
+    assert not scan.is_rejected("solana", "Good")
+    assert scan.reject_stats()["added"] == {}
+
+
+class _FixtureReply:
+    """The part of an aiohttp response _get_json reads, from a FixtureResponse."""
+
+    def __init__(self, res):
+        self._res = res
+        self.status = res.status_code
+        self.headers = res.headers
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        self._res.raise_for_status()
+
+    async def json(self, content_type=None):
+        return self._res.json()
+
+class _FixtureSession:
+    """aiohttp.ClientSession stand-in: the concurrent path reads the same fixtures as offline mode."""
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get(self, url, timeout=None):
+        return _FixtureReply(self.transport.get(url))
+
+
+@pytest.fixture
+def fixture_scan(tmp_path, monkeypatch):
+    """Runs one scan from a clean slate (caches, trade meta) over fixtures/; returns (passed, funnel counts)."""
+    import aiohttp
+
+    monkeypatch.chdir(tmp_path)
+    transport = FixtureTransport()
+    monkeypatch.setattr(aiohttp, "ClientSession", lambda: _FixtureSession(transport))
+    raw = json.loads((FIXTURES / "dexscreener_pairs.json").read_text(encoding="utf-8"))
+    tokens_by_chain = {
+        "solana": [p["baseToken"]["address"] for p in raw] + ["NoSuchToken"],
+        "base": ["0xNoSuchToken"],
+    }
+
+    def run(scanner):
+        monkeypatch.setattr(scan, "REJECT_CACHE", cache.PersistentTTLCache(tmp_path / "rejects.json", stale_ttl_sec=0))
+        monkeypatch.setattr(rugcheck, "RUG_CACHE", cache.PersistentTTLCache(tmp_path / "rug.json"))
+        monkeypatch.setattr(trader, "TRADE_META", {})
+        screener.PAIR_CACHE.clear()
+        funnels = {chain_id: scan.Funnel() for chain_id in tokens_by_chain}
+        passed = scanner(tokens_by_chain, funnels)
+        summary = [(p.pair_address, p.market_label, p.market_score, p.rug_score, p.trade_signal) for p in passed]
+        counts = {c: [(st.name, st.seen, st.kept) for st in f.stages] for c, f in funnels.items()}
+        return summary, counts
+
+    return transport, run
+
+
+def test_concurrent_scan_matches_the_serial_scan(fixture_scan, monkeypatch):
+    transport, run = fixture_scan
+
+    def serial(tokens_by_chain, funnels):
+        with monkeypatch.context() as m:
+            m.setattr(http_client, "_TRANSPORT", transport)
+            return [pair for chain_id, tokens in tokens_by_chain.items()
+                    for pair in scan.scan_tokens(tokens, chain_id, funnel=funnels[chain_id])]
+
+    def solana_only(tokens_by_chain, funnels):
+        return asyncio.run(scan.scan_tokens_async(tokens_by_chain["solana"], "solana", funnels["solana"]))
+
+    expected, expected_counts = run(serial)
+    assert expected and expected_counts["solana"][0] == ("rejected", 7, 7)
+    assert {st[0]: st[2] for st in expected_counts["solana"]}["hydrate"] == 6
+
+    assert not http_client.is_offline()  # the aiohttp path, not the serial fallback
+    assert run(scan.run_multichain_scan) == (expected, expected_counts)
+    assert run(solana_only) == (expected, {**expected_counts, "base": []})
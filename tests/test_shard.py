@@ -0,0 +1,166 @@
+import time
+
+import pytest
+
+from pair_snapshot import PairSnapshot
+import shard
+
+TOKENS = [f"T{i:03d}" for i in range(90)]
+
+
+@pytest.fixture
+def cluster(store, monkeypatch):
+    """shard.py against a temp StateStore, with the network faked out (every discovered token passes)."""
+    monkeypatch.setattr(shard, "CHAINS", ("solana",))
+    monkeypatch.setattr(shard, "get_token_candidates", lambda chains: {
+        "solana": {t: {"boost": 10.0, "sources": ["boosts_top"]} for t in TOKENS}})
+    monkeypatch.setattr(shard, "run_multichain_scan", lambda tokens_by_chain, funnels=None: [
+        PairSnapshot(pair_address=f"P{t}", chain_id=chain_id, base_address=t, price=1.0)
+        for chain_id, tokens in tokens_by_chain.items() for t in tokens])
+    monkeypatch.setattr(shard, "load_tracked_views", lambda store: [
+        PairSnapshot(pair_address=pid) for pid in store.tracked_ids()])
+    alerts = []
+    monkeypatch.setattr(shard, "send_alert", lambda pairs, complete=True: alerts.append((len(pairs), complete)))
+    return store, alerts
+
+def _counts(store):
+    return {pid: entry["count"] for pid, entry in store.load_pairs().items()}
+
+def _merge_time(cycle):
+    return (cycle + 1) * shard.CYCLE_SEC + shard.MERGE_GRACE_SEC + 1
+
+
+def test_ring_moves_about_one_nth_when_a_worker_joins():
+    keys = [f"solana:T{i}" for i in range(10_000)]
+    before = shard.HashRing(["w1", "w2", "w3"])
+    after = shard.HashRing(["w1", "w2", "w3", "w4"])
+    moved = [k for k in keys if before.owner(k) != after.owner(k)]
+    assert 0.18 < len(moved) / len(keys) < 0.32
+    assert {after.owner(k) for k in moved} == {"w4"}  # only the new worker's share moves
+
+
+def test_workers_split_the_tokens(cluster):
+    store, _ = cluster
+    now = time.time()
+    cycle = shard.cycle_of(now)
+    for w in ("w1", "w2", "w3"):
+        store.heartbeat(w, now)
+    stored = [shard.scan_shard(w, cycle, store) for w in ("w1", "w2", "w3")]
+    assert sum(stored) == len(TOKENS)
+    assert all(stored)
+
+    by_cycle = store.take_shard_results(cycle)
+    assert sorted(p["pair_address"] for p in by_cycle[cycle]) == sorted(f"P{t}" for t in TOKENS)
+
+
+def test_count_moves_once_per_cycle_across_a_ring_change(cluster):
+    store, alerts = cluster
+    now = time.time()
+    cycle = shard.cycle_of(now)
+    for w in ("w1", "w2", "w3"):
+        store.heartbeat(w, now)
+    for w in ("w1", "w2", "w3"):
+        shard.scan_shard(w, cycle, store)
+
+    # w3 leaves mid-cycle: w1 and w2 rescan and pick up its share for the same cycle
+    store.remove_workers(["w3"])
+    for w in ("w1", "w2"):
+        shard.scan_shard(w, cycle, store)
+
+    assert shard.merge_due(now, store) == []  # the cycle is still open
+    assert shard.merge_due(_merge_time(cycle), store) == [cycle]
+    assert set(_counts(store).values()) == {1}
+    assert len(_counts(store)) == len(TOKENS)
+    assert alerts == [(len(TOKENS), True)]
+
+    # a second merge of the same window changes nothing
+    assert shard.merge_due(_merge_time(cycle), store) == []
+    assert set(_counts(store).values()) == {1}
+
+    for w in ("w1", "w2"):
+        shard.scan_shard(w, cycle + 1, store)
+    assert shard.merge_due(_merge_time(cycle + 1), store) == [cycle + 1]
+    assert set(_counts(store).values()) == {2}
+
+
+def test_results_after_the_merge_are_rejected(cluster):
+    store, _ = cluster
+    now = time.time()
+    cycle = shard.cycle_of(now)
+    store.heartbeat("w1", now)
+    shard.scan_shard("w1", cycle, store)
+    assert shard.merge_due(_merge_time(cycle), store) == [cycle]
+
+    # a slow worker reports after the leader merged its cycle
+    assert store.put_shard_results(cycle, "w2", [{"pair_address": "Plate"}]) == 0
+    assert shard.scan_shard("w1", cycle, store) == 0
+    assert shard.merge_due(_merge_time(cycle), store) == []
+    assert "Plate" not in _counts(store)
+    assert set(_counts(store).values()) == {1}
+
+
+def test_leader_lease_hands_over(cluster):
+    store, _ = cluster
+    now = time.time()
+    cycle = shard.cycle_of(now)
+    lease, ttl = shard.LEADER_LEASE, shard.LEADER_LEASE_SEC
+    for w in ("w1", "w2"):
+        store.heartbeat(w, now)
+
+    assert store.acquire_lease(lease, "w1", ttl, now)
+    assert not store.acquire_lease(lease, "w2", ttl, now + ttl / 2)
+    assert store.acquire_lease(lease, "w1", ttl, now + ttl / 2)  # renewed
+
+    for w in ("w1", "w2"):
+        shard.scan_shard(w, cycle, store)
+    assert shard.merge_due(_merge_time(cycle), store) == [cycle]  # w1 merges
+
+    # w1 stops renewing: w2 takes over once the lease runs out, and w1 can't take it back
+    expired = now + ttl / 2 + ttl + 1
+    assert store.acquire_lease(lease, "w2", ttl, expired)
+    assert not store.acquire_lease(lease, "w1", ttl, expired + 1)
+
+    for w in ("w1", "w2"):
+        shard.scan_shard(w, cycle + 1, store)
+    assert shard.merge_due(_merge_time(cycle + 1), store) == [cycle + 1]  # w2 merges only the new cycle
+    assert set(_counts(store).values()) == {2}
+
+    # a released lease is free at once
+    store.release_lease(lease, "w2")
+    assert store.acquire_lease(lease, "w1", ttl, expired + 2)
+
+
+def test_digest_is_partial_when_a_tracked_view_is_missing(cluster, monkeypatch):
+    store, alerts = cluster
+    now = time.time()
+    cycle = shard.cycle_of(now)
+    store.heartbeat("w1", now)
+    shard.scan_shard("w1", cycle, store)
+    # one pair's refresh fails: it must not look untracked to send_alert
+    monkeypatch.setattr(shard, "load_tracked_views", lambda store: [
+        PairSnapshot(pair_address=pid) for pid in sorted(store.tracked_ids())[1:]])
+    assert shard.merge_due(_merge_time(cycle), store) == [cycle]
+    assert alerts == [(len(TOKENS) - 1, False)]
+
+
+def test_a_long_scan_keeps_the_worker_and_the_lease(cluster, monkeypatch):
+    store, _ = cluster
+    monkeypatch.setattr(shard, "TICK_SEC", 0.05)
+    monkeypatch.setattr(shard, "WORKER_TTL_SEC", 0.3)
+    monkeypatch.setattr(shard, "LEADER_LEASE_SEC", 0.3)
+    seen = {}
+
+    def slow_scan(tokens_by_chain, funnels=None):
+        time.sleep(3 * shard.WORKER_TTL_SEC)  # longer than both TTLs
+        now = time.time()
+        seen["live"] = store.live_workers(now - shard.WORKER_TTL_SEC)
+        seen["pruned"] = shard.prune_workers(now, store)
+        seen["w2_leads"] = store.acquire_lease(shard.LEADER_LEASE, "w2", shard.LEADER_LEASE_SEC, now)
+        return []
+    monkeypatch.setattr(shard, "run_multichain_scan", slow_scan)
+
+    shard.run("w1", once=True)
+    assert seen == {"live": ["w1"], "pruned": [], "w2_leads": False}
+    # a stopped worker leaves the ring and frees the lease
+    assert store.live_workers(0) == []
+    assert store.acquire_lease(shard.LEADER_LEASE, "w2", shard.LEADER_LEASE_SEC)
@@ -0,0 +1,58 @@
+import json
+
+import state_store
+
+LEGACY_TRACKED = {
+    "PairA": {"count": 3, "last_seen": "2026-10-01T12:00:00", "trade_signal": "Entry", "rug_score": 85,
+              "market_label": "x10-ready"},
+    "PairB": {"count": 1, "last_seen": "2026-10-01T12:10:00", "chain": "base", "trade_signal": "No Signal"},
+}
+LEGACY_META = {
+    "PairA": {"price_hist": [1.0, 1.1], "cooldown": 0},
+    "Gone": {"price_hist": [2.0]},
+}
+
+
+def _write_legacy(tmp_path):
+    (tmp_path / state_store.LEGACY_TRACKED_FILE).write_text(json.dumps(LEGACY_TRACKED), encoding="utf-8")
+    (tmp_path / state_store.LEGACY_TRADE_META_FILE).write_text(json.dumps(LEGACY_META), encoding="utf-8")
+
+
+def test_legacy_json_is_migrated_once(store, tmp_path):
+    _write_legacy(tmp_path)
+    assert store.migrate_from_json()
+
+    pairs = store.load_pairs()
+    assert set(pairs) == {"PairA", "PairB"}
+    assert pairs["PairA"] == dict(LEGACY_TRACKED["PairA"], chain=state_store.DEFAULT_CHAIN)  # no chain: Solana
+    assert pairs["PairB"] == LEGACY_TRACKED["PairB"]
+    assert store.tracked_ids("base") == {"PairB"}
+    assert store.load_trade_meta(["PairA", "PairB", "Gone"]) == LEGACY_META
+
+    # the files are not read again, even if they change
+    (tmp_path / state_store.LEGACY_TRACKED_FILE).write_text(json.dumps({"PairC": {"count": 1}}), encoding="utf-8")
+    store.upsert_pairs({"PairA": dict(pairs["PairA"], count=4)})
+    assert not store.migrate_from_json()
+    assert store.tracked_ids() == {"PairA", "PairB"}
+    assert store.get_pair("PairA")["count"] == 4
+
+
+def test_get_store_migrates_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(state_store, "_STORE", None)
+    _write_legacy(tmp_path)
+    store = state_store.get_store(tmp_path / "fresh.db")
+    try:
+        assert store.tracked_ids() == {"PairA", "PairB"}
+        assert state_store.get_store(tmp_path / "fresh.db") is store
+    finally:
+        store.close()
+
+
+def test_a_broken_legacy_file_is_skipped(store, tmp_path, capsys):
+    (tmp_path / state_store.LEGACY_TRACKED_FILE).write_text("{not json", encoding="utf-8")
+    (tmp_path / state_store.LEGACY_TRADE_META_FILE).write_text(json.dumps(LEGACY_META), encoding="utf-8")
+    assert store.migrate_from_json()
+    assert "Failed to load" in capsys.readouterr().out
+    assert store.tracked_ids() == set()
+    assert set(store.load_trade_meta(LEGACY_META)) == set(LEGACY_META)
@@ -0,0 +1,73 @@
+import pytest
+
+import telegram_bot
+from pair_snapshot import PairSnapshot
+
+
+@pytest.fixture
+def bot(store, monkeypatch):
+    """send_alert() with a scripted _deliver; yields (delivered texts, markers that fail)."""
+    sent, failing = [], set()
+
+    def deliver(text, parse_mode=None):
+        if any(marker in text for marker in failing):
+            raise RuntimeError("BadRequest")
+        sent.append(text)
+
+    monkeypatch.setattr(telegram_bot, "_deliver", deliver)
+    monkeypatch.setattr(telegram_bot, "SENT_STATE", {})
+    monkeypatch.setattr(telegram_bot, "PENDING_STATE", {})
+    monkeypatch.setattr(telegram_bot, "_STATE_LOADED", False)
+    yield sent, failing
+
+
+def _pair(address, signal="Entry"):
+    return PairSnapshot(pair_address=address, base_symbol=address, quote_symbol="SOL",
+                        trade_signal=signal, count=1, url=f"https://dexscreener.com/solana/{address}")
+
+
+def test_pair_is_sent_once_delivered(bot):
+    assert telegram_bot.send_alert([_pair("AAA")]) == 1
+    assert telegram_bot.flush(5)
+    assert "AAA" in telegram_bot.SENT_STATE and not telegram_bot.PENDING_STATE
+    assert telegram_bot.send_alert([_pair("AAA")]) == 0
+
+
+def test_failed_delivery_is_alerted_again(bot, monkeypatch):
+    _, failing = bot
+    failing.add("BBB")
+    monkeypatch.setattr(telegram_bot, "MESSAGE_LIMIT", 200)  # one pair per message
+    assert telegram_bot.send_alert([_pair("AAA"), _pair("BBB")]) == 2
+    assert telegram_bot.flush(5)
+    assert set(telegram_bot.SENT_STATE) == {"AAA"}
+    assert not telegram_bot.PENDING_STATE
+
+    failing.clear()
+    assert telegram_bot.send_alert([_pair("AAA"), _pair("BBB")]) == 1  # only the one that never arrived
+    assert telegram_bot.flush(5)
+    assert set(telegram_bot.SENT_STATE) == {"AAA", "BBB"}
+
+
+def test_pack_messages_keeps_members():
+    pairs = [_pair(f"P{i}") for i in range(30)]
+    packed = telegram_bot.pack_messages(pairs, "plain")
+    assert [p.pair_address for _, members in packed for p in members] == [p.pair_address for p in pairs]
+    assert all(len(text) <= telegram_bot.MESSAGE_LIMIT for text, _ in packed)
+
+
+def test_sent_state_survives_a_restart(bot, store, monkeypatch):
+    telegram_bot.send_alert([_pair("AAA"), _pair("BBB")])
+    assert telegram_bot.flush(5)
+    assert store.load_alert_state() == {"AAA": telegram_bot.alert_state(_pair("AAA")),
+                                        "BBB": telegram_bot.alert_state(_pair("BBB"))}
+
+    # a new process (cron-style run): nothing in memory, same store
+    monkeypatch.setattr(telegram_bot, "SENT_STATE", {})
+    monkeypatch.setattr(telegram_bot, "_STATE_LOADED", False)
+    assert telegram_bot.send_alert([_pair("AAA"), _pair("BBB", "Exit")]) == 1
+    assert telegram_bot.flush(5)
+    assert store.load_alert_state()["BBB"][0] == "Exit"
+
+    # a complete alert without AAA forgets it, on disk too
+    telegram_bot.send_alert([_pair("BBB", "Exit")], complete=True)
+    assert set(store.load_alert_state()) == {"BBB"}
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+from pair_snapshot import PairSnapshot
+import tracker
+
+
+def test_covers_all_tracked(store):
+    store.upsert_pairs({pid: {"count": 1, "last_seen": "2026-01-01T00:00:00", "chain": "solana"}
+                        for pid in ("A", "B")})
+    assert tracker.covers_all_tracked([PairSnapshot(pair_address="A"), PairSnapshot(pair_address="B")])
+    # B's refresh failed: it is missing from the views, not untracked
+    assert not tracker.covers_all_tracked([PairSnapshot(pair_address="A")])
+
+
+def test_decay_stale_only_touches_pairs_past_the_threshold(store):
+    now = datetime.utcnow()
+    ago = lambda sec: (now - timedelta(seconds=sec)).isoformat()
+    store.upsert_pairs({
+        "fresh":      {"count": 3, "last_seen": ago(60), "chain": "solana"},
+        "stale":      {"count": 3, "last_seen": ago(3600), "chain": "solana"},
+        "stale_last": {"count": 1, "last_seen": ago(3600), "chain": "base"},
+        "never_seen": {"count": 2, "last_seen": None, "chain": "solana"},
+    })
+
+    assert tracker.decay_stale(600, store) == 1  # stale_last reached 0
+    assert {pid: e["count"] for pid, e in store.load_pairs().items()} == {"fresh": 3, "stale": 2, "never_seen": 1}
+
+    # another round drops the next one; the fresh pair is never touched
+    assert tracker.decay_stale(600, store) == 1
+    assert {pid: e["count"] for pid, e in store.load_pairs().items()} == {"fresh": 3, "stale": 1}
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+import json
+
+import trader
+from pair_snapshot import PairSnapshot
+
+
+def _entry_pair(price=1.0):
+    # passes _meets_entry_quality: ratio 3, volume and txns over the floors, 1h change in band
+    return PairSnapshot(pair_address="P", price=price, buys_h1=300, sells_h1=100,
+                        v1h=200_000, v6h=600_000, h1c=5.0, m5=1.0, h24c=10.0)
+
+
+def _refresh(meta, every_sec, minutes, start=datetime(2026, 1, 1)):
+    """update_histories + get_trade_signal every `every_sec` for `minutes`; returns the signals."""
+    signals = []
+    for i in range(int(minutes * 60 // every_sec) + 1):
+        with trader.use_clock(lambda: start + timedelta(seconds=i * every_sec)):
+            trader.update_histories(meta, _entry_pair(1.0 + i / 1000))
+            signals.append(trader.get_trade_signal(meta)[0])
+    return signals
+
+
+def test_bars_stay_ten_minutes_apart_under_60s_refreshes():
+    meta = {}
+    _refresh(meta, every_sec=60, minutes=60)
+    # 61 refreshes over an hour -> one bar per 10 min (t = 0, 10, ..., 60)
+    assert len(meta["price_hist"]) == 7
+    assert meta["last_bar_at"] == datetime(2026, 1, 1, 1, 0).timestamp()
+    # the newest bar holds the latest reading
+    assert meta["price_hist"][-1] == meta["last_snapshot"]["price"] == 1.06
+
+
+def test_entry_needs_two_bars_not_two_refreshes():
+    signals = _refresh({}, every_sec=60, minutes=10)
+    assert signals[:10] == ["Watching"] * 10   # the whole first bar is one confirmation
+    assert signals[10] == "Entry"              # the second bar, 10 min later
+
+
+def test_history_spans_twelve_hours():
+    meta = {}
+    _refresh(meta, every_sec=60, minutes=13 * 60)
+    assert len(meta["price_hist"]) == trader.HISTORY_LEN
+
+
+def test_set_last_overwrites_newest_value():
+    hist = trader.RingHistory(3, [1, 2, 3, 4])
+    hist.set_last(9)
+    assert hist.tolist() == [2, 3, 9]
+    assert trader.RingHistory.from_bytes(hist.to_bytes()).tolist() == [2, 3, 9]
+
+
+def test_ring_history_wraps_around():
+    hist = trader.RingHistory(5)
+    pushed = []
+    for v in range(13):  # more than twice the capacity
+        hist.append(v)
+        pushed.append(float(v))
+        assert hist.tolist() == pushed[-5:]
+        assert len(hist) == min(len(pushed), 5)
+    assert hist.view(3).tolist() == [10.0, 11.0, 12.0]  # newest n, oldest first
+    assert hist.view(0).tolist() == []
+    assert hist.view(99).tolist() == pushed[-5:]
+    assert (hist[0], hist[-1]) == (8.0, 12.0)
+    assert hist.resized(3).tolist() == [10.0, 11.0, 12.0]
+    assert hist.resized(8).tolist() == pushed[-5:]  # growing keeps what is there
+    assert trader.RingHistory.from_bytes(hist.to_bytes()).tolist() == pushed[-5:]
+
+
+def test_meta_survives_encode_and_decode():
+    meta = {}
+    _refresh(meta, every_sec=600, minutes=30)
+    stored = json.loads(json.dumps(trader.encode_meta(meta)))  # as it goes through the state store
+    decoded = trader.decode_meta(stored)
+
+    assert decoded.keys() == meta.keys()
+    for key, _ in trader.HIST_KEYS:
+        assert decoded[key].tolist() == meta[key].tolist()
+        assert decoded[key].capacity == meta[key].capacity
+    assert decoded["last_snapshot"] == meta["last_snapshot"]
+    assert {k: v for k, v in decoded.items() if k not in dict(trader.HIST_KEYS)} == \
+           {k: v for k, v in meta.items() if k not in dict(trader.HIST_KEYS)}
+    assert trader.encode_meta(decoded) == stored
+
+    # the legacy layout (plain lists) decodes too
+    legacy = trader.decode_meta({"price_hist": [1.0, 2.0], "last_snapshot": meta["last_snapshot"]})
+    assert legacy["price_hist"].tolist() == [1.0, 2.0]
+    assert legacy["last_snapshot"] == meta["last_snapshot"]
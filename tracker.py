@@ -1,121 +1,243 @@
 # tracker.py
-from pathlib import Path
-from datetime import datetime
-import json
-from screener import get_pair_details
-from trader import update_histories, get_trade_signal
+from datetime import datetime, timedelta
+from threading import RLock
+import metrics
+from screener import get_pairs_details
+from state_store import DEFAULT_CHAIN, get_store
+from trader import update_histories, get_trade_signal, encode_meta, decode_meta
 
-TRACKED_FILE = Path("tracked_pairs.json")
 COUNT_CAP = 5
-
-def load_json(path: Path):
-    if not path.exists():
-        return {}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"⚠️ Failed to load {path}: {e}")
-        return {}
-
-def save_json(path: Path, data: dict):
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        print(f"⚠️ Failed to save {path}: {e}")
-
-def update_pair_tracking(passed_pairs, file_path="tracked_pairs.json"):
+HISTORY_BARS = 72  # ~12h of 10‑min bars
+
+# What makes a tracked pair "hot" (refreshed on the fast loop)
+HOT_SIGNALS = ("Entry", "Watching")
+HOT_CHG_5M_PCT = 10.0
+
+# Serializes read-modify-write of tracked entries between scheduler jobs
+STATE_LOCK = RLock()
+
+def _history_row(pair_id, entry, trade_meta, now_iso):
+    return {
+        "pair_address": pair_id,
+        "ts": now_iso,
+        "count": entry["count"],
+        "trade_signal": entry["trade_signal"],
+        "market_score": entry.get("market_score"),
+        "rug_score": entry.get("rug_score"),
+        "price_usd": trade_meta.get("last_snapshot", {}).get("price"),
+    }
+
+def _latest(value, prev_entry, key):
+    return prev_entry.get(key) if value is None else value
+
+def record_passed_pairs(passed_pairs, store=None, decay=True, chains=None):
     """
-    Stores minimal state per pair:
-      - count (capped) + Rugcheck + Trade signal/meta + Market fields
-    Increments count for seen pairs, decays for unseen pairs,
-    then fetches latest pair details and merges stored fields.
+    Steps 1-3 of update_pair_tracking: increments count for pairs that
+    passed, decays the unseen ones (unless decay=False; only on `chains`
+    if given) and logs history. Returns the passed pair ids in order.
     """
-    file_path = Path(file_path)
-    previous = load_json(file_path)  # {pairAddress: {...}}
-    updated = {}
+    store = store or get_store()
+    seen_ids = [p.pair_address for p in passed_pairs if p.pair_address]
+    upserts, rows = {}, []
 
     now_iso = datetime.utcnow().isoformat()
 
-    # 1) Upsert pairs that passed this round
-    for pair in passed_pairs:
-        pair_id = pair.get("pairAddress")
-        if not pair_id:
-            continue
-
-        prev_entry = previous.get(pair_id, {})
-        prev_count = int(prev_entry.get("count", 0))
-        new_count = min(COUNT_CAP, prev_count + 1)
-
-        # --- keep & update compact trade history ---
-        trade_meta = prev_entry.get("trade_meta", {})
-        trade_meta = update_histories(trade_meta, pair, max_len=72)  # ~12h of 10‑min bars
-        signal, reasons = get_trade_signal(trade_meta)
-
-        updated[pair_id] = {
-            "count": new_count,
-            "last_seen": now_iso,
-
-            # Rugcheck fields (prefer latest if present)
-            "rug_status": pair.get("rug_status", prev_entry.get("rug_status")),
-            "rug_score": pair.get("rug_score", prev_entry.get("rug_score")),
-            "rug_reasons": pair.get("rug_reasons", prev_entry.get("rug_reasons")),
-            "rug_link": pair.get("rug_link", prev_entry.get("rug_link")),
-
-            # Market fields (persisted)
-            "market_label": pair.get("market_label", prev_entry.get("market_label")),
-            "market_score": pair.get("market_score", prev_entry.get("market_score")),
-            "potential_multiple": pair.get("potential_multiple", prev_entry.get("potential_multiple")),
-            "market_checks": pair.get("market_checks", prev_entry.get("market_checks")),
-
-            # Trade fields
-            "trade_signal": signal,
-            "trade_reasons": reasons,
-            "trade_meta": trade_meta,
-            "last_signal_at": now_iso,
-        }
-
-    # 2) Decay or keep pairs that did not pass this round
-    for pair_id, old_entry in previous.items():
-        if pair_id in updated:
-            continue
-        new_count = max(0, int(old_entry.get("count", 1)) - 1)
-        if new_count > 0:
-            old_entry["count"] = new_count
-            # keep their last trade/rug/market state
-            updated[pair_id] = old_entry
-        # else drop
-
-    # 3) Save compact tracking state
-    save_json(file_path, updated)
-
-    # 4) Fetch latest details for ALL tracked pairs, merge fields, return
+    with STATE_LOCK:
+        previous = store.load_pairs(seen_ids)  # {pairAddress: {...}}, passed pairs only
+
+        # 1) Upsert pairs that passed this round
+        for pair in passed_pairs:
+            pair_id = pair.pair_address
+            if not pair_id:
+                continue
+
+            prev_entry = previous.get(pair_id, {})
+            prev_count = int(prev_entry.get("count", 0))
+            new_count = min(COUNT_CAP, prev_count + 1)
+
+            # --- keep & update compact trade history ---
+            trade_meta = decode_meta(prev_entry.get("trade_meta", {}))
+            trade_meta = update_histories(trade_meta, pair, max_len=HISTORY_BARS)
+            signal, reasons = get_trade_signal(trade_meta)
+
+            upserts[pair_id] = {
+                "count": new_count,
+                "last_seen": now_iso,
+                "chain": pair.chain_id or prev_entry.get("chain") or DEFAULT_CHAIN,
+                "mint": pair.base_address or prev_entry.get("mint"),
+
+                # Rugcheck fields (prefer latest if present)
+                "rug_status": _latest(pair.rug_status, prev_entry, "rug_status"),
+                "rug_score": _latest(pair.rug_score, prev_entry, "rug_score"),
+                "rug_reasons": _latest(pair.rug_reasons, prev_entry, "rug_reasons"),
+                "rug_link": _latest(pair.rug_link, prev_entry, "rug_link"),
+
+                # Market fields (persisted)
+                "market_label": _latest(pair.market_label, prev_entry, "market_label"),
+                "market_score": _latest(pair.market_score, prev_entry, "market_score"),
+                "potential_multiple": _latest(pair.potential_multiple, prev_entry, "potential_multiple"),
+                "market_checks": _latest(pair.market_checks, prev_entry, "market_checks"),
+
+                # Trade fields
+                "trade_signal": signal,
+                "trade_reasons": reasons,
+                "trade_meta": encode_meta(trade_meta),
+                "last_signal_at": now_iso,
+            }
+            rows.append(_history_row(pair_id, upserts[pair_id], trade_meta, now_iso))
+
+        # 2) + 3) One transaction: upsert passed pairs, decay the rest (dropped at 0), log history
+        with metrics.stage("tracker.upsert"), store.transaction():
+            store.upsert_pairs(upserts)
+            if decay:
+                store.decay_unseen(upserts.keys(), chains)
+            store.append_history(rows)
+
+    return list(upserts)
+
+def merge_latest(entries, latest_by_id):
+    """Latest pair snapshots with the stored count/rug/market/trade fields merged in."""
     full_pairs = []
-    for pair_id, meta in updated.items():
-        latest = get_pair_details("solana", pair_id)
+    for pair_id, meta in entries.items():
+        latest = latest_by_id.get(pair_id)
         if not latest:
             continue
 
         # counts
-        latest["count"] = meta.get("count", 0)
+        latest.count = meta.get("count", 0)
 
         # rug fields
-        latest["rug_status"] = meta.get("rug_status")
-        latest["rug_score"] = meta.get("rug_score")
-        latest["rug_reasons"] = meta.get("rug_reasons")
-        latest["rug_link"] = meta.get("rug_link")
+        latest.rug_status = meta.get("rug_status")
+        latest.rug_score = meta.get("rug_score")
+        latest.rug_reasons = meta.get("rug_reasons")
+        latest.rug_link = meta.get("rug_link")
 
         # market fields
-        latest["market_label"] = meta.get("market_label")
-        latest["market_score"] = meta.get("market_score")
-        latest["potential_multiple"] = meta.get("potential_multiple")
-        latest["market_checks"] = meta.get("market_checks")
+        latest.market_label = meta.get("market_label")
+        latest.market_score = meta.get("market_score")
+        latest.potential_multiple = meta.get("potential_multiple")
+        latest.market_checks = meta.get("market_checks")
 
         # trade fields
-        latest["trade_signal"] = meta.get("trade_signal", "No Signal")
-        latest["trade_reasons"] = meta.get("trade_reasons", [])
+        latest.trade_signal = meta.get("trade_signal", "No Signal")
+        latest.trade_reasons = meta.get("trade_reasons", [])
 
         full_pairs.append(latest)
-
     return full_pairs
+
+def fetch_latest(entries, fresh=False):
+    """Latest pair details for tracked entries, one batched lookup per chain."""
+    by_chain = {}
+    for pair_id, entry in entries.items():
+        by_chain.setdefault(entry.get("chain") or DEFAULT_CHAIN, []).append(pair_id)
+
+    latest_by_id = {}
+    with metrics.stage("tracker.refresh"):
+        for chain_id, ids in by_chain.items():
+            latest_by_id.update(get_pairs_details(chain_id, ids, fresh=fresh))  # 30 pairs per request
+    return latest_by_id
+
+def load_tracked_views(store=None, first_ids=()):
+    """Step 4: fetch latest details for ALL tracked pairs (first_ids first) and merge."""
+    store = store or get_store()
+    tracked = store.load_pairs()
+    updated = {pid: tracked[pid] for pid in first_ids if pid in tracked}
+    updated.update(tracked)
+    return merge_latest(updated, fetch_latest(updated))
+
+def covers_all_tracked(views, store=None) -> bool:
+    """True if `views` has every tracked pair (a failed or deferred refresh leaves some out)."""
+    store = store or get_store()
+    return {p.pair_address for p in views} >= store.tracked_ids()
+
+def update_pair_tracking(passed_pairs, store=None, chains=None):
+    """
+    Stores minimal state per pair:
+      - count (capped) + Rugcheck + Trade signal/meta + Market fields
+    Increments count for seen pairs, decays for unseen pairs (of the scanned
+    chains only), then fetches latest pair details and merges stored fields.
+    """
+    store = store or get_store()
+    passed_ids = record_passed_pairs(passed_pairs, store, chains=chains)
+    return load_tracked_views(store, first_ids=passed_ids)
+
+
+# ---------- tiered refresh (see scheduler.py) ----------
+def decay_stale(max_age_sec, store=None):
+    """Time-based decay: count - 1 for pairs that have not passed within max_age_sec."""
+    store = store or get_store()
+    cutoff = (datetime.utcnow() - timedelta(seconds=max_age_sec)).isoformat()
+    with STATE_LOCK:
+        return store.decay_seen_before(cutoff)
+
+def _is_hot(entry):
+    if entry.get("trade_signal") in HOT_SIGNALS:
+        return True
+    snap = decode_meta(entry.get("trade_meta", {})).get("last_snapshot") or {}
+    return float(snap.get("chg_5m", 0) or 0) >= HOT_CHG_5M_PCT
+
+def split_hot_cold(store=None):
+    """(hot_ids, cold_ids) among tracked pairs."""
+    store = store or get_store()
+    hot, cold = [], []
+    for pair_id, entry in store.load_pairs().items():
+        (hot if _is_hot(entry) else cold).append(pair_id)
+    return hot, cold
+
+def refresh_tracked(pair_ids, store=None):
+    """
+    Fetches fresh details for the given tracked pairs and advances their
+    trade history + signal. Counts and last_seen are left alone.
+    Returns the merged views, like update_pair_tracking.
+    """
+    store = store or get_store()
+    pair_ids = list(pair_ids)
+    if not pair_ids:
+        return []
+
+    latest_by_id = fetch_latest(store.load_pairs(pair_ids), fresh=True)
+
+    now_iso = datetime.utcnow().isoformat()
+    with STATE_LOCK:
+        entries = store.load_pairs(pair_ids)
+        changed = {}
+        for pair_id, entry in entries.items():
+            latest = latest_by_id.get(pair_id)
+            if not latest:
+                continue
+            trade_meta = update_histories(decode_meta(entry.get("trade_meta", {})), latest, max_len=HISTORY_BARS)
+            signal, reasons = get_trade_signal(trade_meta)
+            entry.update({
+                "trade_signal": signal,
+                "trade_reasons": reasons,
+                "trade_meta": encode_meta(trade_meta),
+                "last_signal_at": now_iso,
+                "last_refreshed": now_iso,
+            })
+            changed[pair_id] = entry
+        store.upsert_pairs(changed)
+
+    ordered = {pid: entries[pid] for pid in pair_ids if pid in entries}
+    return merge_latest(ordered, latest_by_id)
+
+def update_rug_fields(evaluations, store=None):
+    """evaluations: {pairAddress: (status, score, reasons, link)} from rugcheck.get_rugcheck_evaluation."""
+    store = store or get_store()
+    with STATE_LOCK:
+        entries = store.load_pairs(evaluations.keys())
+        for pair_id, (status, score, reasons, link) in evaluations.items():
+            if pair_id in entries:
+                entries[pair_id].update({
+                    "rug_status": status, "rug_score": score, "rug_reasons": reasons, "rug_link": link,
+                })
+        store.upsert_pairs(entries)
+
+def tracked_mints(store=None):
+    """{pairAddress: mint} for tracked Solana pairs (older entries: parsed from rug_link)."""
+    store = store or get_store()
+    mints = {}
+    for pair_id, entry in store.load_pairs(chain="solana").items():  # Rugcheck is Solana-only
+        mint = entry.get("mint") or (entry.get("rug_link") or "").rsplit("/", 1)[-1]
+        if mint and mint != "None":
+            mints[pair_id] = mint
+    return mints
@@ -1,13 +1,15 @@
 # trader.py
 
+from array import array
+from contextlib import contextmanager
 from statistics import median
-from typing import Dict, Tuple, List, Set
+from typing import Dict, Iterable, Tuple, List, Set
 from datetime import datetime, timedelta
-from pathlib import Path
-import json
+import base64
+import struct
+from pair_snapshot import PairSnapshot
+from state_store import get_store
 
-History = Dict[str, List[float]]
-TRADE_META_FILE = Path("trade_meta_store.json")
 TRADE_META: Dict[str, dict] = {}
 
 # --- Tunables ---
@@ -24,16 +26,151 @@ DUMP_1H_PCT = -10
 DUMP_5M_PCT = -8
 COOLDOWN_BARS = 3
 ENTRY_VOTES_NEED = 2
+HISTORY_LEN = 72  # ~12h of 10-min bars
+BAR_SEC = 600     # a new bar at most this often; refreshes in between update the newest bar
+BAR_SLACK_SEC = 30  # scheduler jitter: a refresh this early still opens the next bar
+
+
+# --- Compact history ---
+class RingHistory:
+    """
+    Fixed-capacity float history with O(1) append. Every value is written
+    twice (slot i and i + capacity) so the newest n values are always one
+    contiguous run and view() is a zero-copy memoryview.
+    """
+    __slots__ = ("_buf", "_cap", "_pos", "_len")
+
+    _HEADER = struct.Struct("<HH")
+
+    def __init__(self, capacity: int = HISTORY_LEN, values: Iterable[float] = ()):
+        self._cap = max(1, int(capacity))
+        self._buf = array("d", bytes(16 * self._cap))  # 2 * capacity doubles
+        self._pos = 0
+        self._len = 0
+        for v in values:
+            self.append(v)
+
+    @property
+    def capacity(self) -> int:
+        return self._cap
+
+    def append(self, value: float):
+        value = float(value)
+        self._buf[self._pos] = value
+        self._buf[self._pos + self._cap] = value
+        self._pos = (self._pos + 1) % self._cap
+        if self._len < self._cap:
+            self._len += 1
+
+    def set_last(self, value: float):
+        """Overwrites the newest value (appends if empty)."""
+        if not self._len:
+            return self.append(value)
+        value = float(value)
+        last = (self._pos - 1) % self._cap
+        self._buf[last] = value
+        self._buf[last + self._cap] = value
+
+    def view(self, n: int | None = None) -> memoryview:
+        """Newest n values (all if None), oldest first, without copying."""
+        n = self._len if n is None else max(0, min(n, self._len))
+        end = self._pos + self._cap
+        return memoryview(self._buf)[end - n:end]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, idx):
+        return self.view()[idx]
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def tolist(self) -> List[float]:
+        return self.view().tolist()
+
+    def resized(self, capacity: int) -> "RingHistory":
+        return self if capacity == self._cap else RingHistory(capacity, self.view(capacity))
+
+    def to_bytes(self) -> bytes:
+        return self._HEADER.pack(self._cap, self._len) + self.view().tobytes()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "RingHistory":
+        cap, n = cls._HEADER.unpack_from(raw)
+        values = array("d")
+        values.frombytes(raw[cls._HEADER.size:cls._HEADER.size + 8 * n])
+        return cls(cap, values)
+
+    def __repr__(self):
+        return f"RingHistory(capacity={self._cap}, values={self.tolist()})"
+
+def _as_history(value, capacity: int | None = None) -> RingHistory:
+    """
+    Accepts a RingHistory, a legacy list of floats or encoded bytes (base64 str).
+    Resizes only when a capacity is given.
+    """
+    if isinstance(value, str):
+        value = RingHistory.from_bytes(base64.b64decode(value))
+    if isinstance(value, RingHistory):
+        return value if capacity is None else value.resized(capacity)
+    capacity = capacity or HISTORY_LEN
+    return RingHistory(capacity, (value or [])[-capacity:])
+
+HIST_KEYS = (("price_hist", "price"), ("ratio_hist", "ratio_1h"), ("vol1h_hist", "vol_1h"))
+SNAPSHOT_FIELDS = ("price", "ratio_1h", "vol_1h", "vol_6h", "chg_5m", "chg_1h", "chg_24h",
+                   "txns_1h", "buys_1h", "sells_1h")
+
+def encode_meta(meta: dict) -> dict:
+    """JSON-safe, compact form: histories as packed doubles, snapshot as [epoch, *fields]."""
+    out = dict(meta)
+    for key, _ in HIST_KEYS:
+        if key in out:
+            out[key] = base64.b64encode(_as_history(out[key]).to_bytes()).decode("ascii")
+    snap = out.get("last_snapshot")
+    if isinstance(snap, dict) and snap:
+        ts = datetime.fromisoformat(snap["ts"]).timestamp() if snap.get("ts") else 0.0
+        out["last_snapshot"] = [ts] + [snap.get(f, 0.0) for f in SNAPSHOT_FIELDS]
+    return out
+
+def decode_meta(raw: dict) -> dict:
+    """Inverse of encode_meta(); also accepts the legacy list/dict layout."""
+    meta = dict(raw or {})
+    for key, _ in HIST_KEYS:
+        if key in meta:
+            meta[key] = _as_history(meta[key])
+    snap = meta.get("last_snapshot")
+    if isinstance(snap, list) and snap:
+        entry = {"ts": datetime.fromtimestamp(snap[0]).isoformat() if snap[0] else ""}
+        entry.update(zip(SNAPSHOT_FIELDS, snap[1:]))
+        meta["last_snapshot"] = entry
+    return meta
 
 
 # --- Helpers ---
-def _now(): return datetime.utcnow()
+_CLOCK = datetime.utcnow  # swapped for a simulated clock during replay
+
+def _now(): return _CLOCK()
+
+@contextmanager
+def use_clock(now_fn):
+    """Runs the signal engine on `now_fn()` instead of the wall clock (replay/backtests)."""
+    global _CLOCK
+    previous, _CLOCK = _CLOCK, now_fn
+    try:
+        yield
+    finally:
+        _CLOCK = previous
 
 def _safe_div(a, b, default=0.0): return a / b if b else default
 
 def _pct_change(new, old): return (new - old) / old * 100 if old else 0
 
-def _trend_up(seq, min_len=3): return len(seq) >= min_len and seq[-1] >= median(seq[-min_len:]) and seq[-1] >= seq[-2]
+def _trend_up(seq, min_len=3):
+    if len(seq) < min_len:
+        return False
+    window = seq.view(min_len) if isinstance(seq, RingHistory) else seq[-min_len:]
+    return window[-1] >= median(window) and window[-1] >= window[-2]
 
 def _is_cooldown(meta):
     until = meta.get("cooldown_until")
@@ -43,72 +180,67 @@ def _is_cooldown(meta):
         return False
 
 def _set_cooldown(meta, bars=COOLDOWN_BARS):
-    meta["cooldown_until"] = (_now() + timedelta(minutes=10 * bars)).isoformat()
-
-def _load_json(path: Path) -> dict:
-    if not path.exists():
-        return {}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return {}
-
-def _save_json(path: Path, data: dict):
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        print(f"⚠️ Failed to save {path}: {e}")
+    meta["cooldown_until"] = (_now() + timedelta(seconds=BAR_SEC * bars)).isoformat()
 
 
 # --- Persistence API ---
-def load_trade_meta_from_tracked(tracked_file="tracked_pairs.json") -> Set[str]:
-    tracked = _load_json(Path(tracked_file))
-    active_ids = set(tracked.keys())
-    disk_meta = _load_json(TRADE_META_FILE)
+def load_trade_meta_from_tracked(store=None) -> Set[str]:
+    store = store or get_store()
+    active_ids = store.tracked_ids()
+    disk_meta = store.load_trade_meta(active_ids)
 
     global TRADE_META
-    TRADE_META = {pid: disk_meta.get(pid, {}) for pid in active_ids}
+    TRADE_META = {pid: decode_meta(disk_meta.get(pid, {})) for pid in active_ids}
     return active_ids
 
-def save_trade_meta(active_ids: Set[str] | None = None):
-    to_save = {pid: meta for pid, meta in TRADE_META.items() if (active_ids is None or pid in active_ids)}
-    _save_json(TRADE_META_FILE, to_save)
+def save_trade_meta(active_ids: Set[str] | None = None, store=None):
+    store = store or get_store()
+    to_save = {pid: encode_meta(meta) for pid, meta in TRADE_META.items() if (active_ids is None or pid in active_ids)}
+    store.save_trade_meta(to_save, keep_ids=active_ids)
 
 
 # --- Signal engine ---
-def update_histories(meta: dict, pair: dict, max_len=72) -> dict:
-    txns = pair.get("txns", {}) or {}
-    vol = pair.get("volume", {}) or {}
-    price_change = pair.get("priceChange", {}) or {}
-
-    buys = float(txns.get("h1", {}).get("buys", 0))
-    sells = float(txns.get("h1", {}).get("sells", 0))
+def update_histories(meta: dict, pair: PairSnapshot, max_len=HISTORY_LEN) -> dict:
+    """
+    Opens a new bar when BAR_SEC have passed since the last one; a refresh
+    in between (hot loop, discovery) only updates the newest bar, so bar
+    counts (votes, cooldown, HISTORY_LEN) keep meaning 10 minutes.
+    """
+    buys, sells = pair.buys_h1, pair.sells_h1
     ratio = min(5.0, _safe_div(buys, sells, 0))
+    now = _now()
+    last_bar_at = meta.get("last_bar_at")
+    new_bar = last_bar_at is None or now.timestamp() - last_bar_at >= BAR_SEC - BAR_SLACK_SEC
 
     entry = {
-        "ts": _now().isoformat(),
-        "price": float(pair.get("priceUsd", 0)),
+        "ts": now.isoformat(),
+        "price": pair.price,
         "ratio_1h": ratio,
-        "vol_1h": float(vol.get("h1", 0)),
-        "vol_6h": float(vol.get("h6", 0)),
-        "chg_5m": float(price_change.get("m5", 0)),
-        "chg_1h": float(price_change.get("h1", 0)),
-        "chg_24h": float(price_change.get("h24", 0)),
+        "vol_1h": pair.v1h,
+        "vol_6h": pair.v6h,
+        "chg_5m": pair.m5,
+        "chg_1h": pair.h1c,
+        "chg_24h": pair.h24c or 0.0,
         "txns_1h": buys + sells,
         "buys_1h": buys,
         "sells_1h": sells,
     }
 
-    for key in ["price_hist", "ratio_hist", "vol1h_hist"]:
-        meta.setdefault(key, []).append(entry[key.replace("_hist", "")])
-        if len(meta[key]) > max_len:
-            meta[key] = meta[key][-max_len:]
+    for key, field in HIST_KEYS:
+        hist = _as_history(meta.get(key), max_len)
+        if new_bar:
+            hist.append(entry[field])
+        else:
+            hist.set_last(entry[field])
+        meta[key] = hist
 
     meta["last_snapshot"] = entry
     meta.setdefault("entry_votes", 0)
     meta.setdefault("exit_votes", 0)
+    if new_bar:
+        meta["last_bar_at"] = now.timestamp()
+        # votes are counted per bar: re-evaluations inside a bar start from these
+        meta["bar_votes"] = [meta["entry_votes"], meta["exit_votes"]]
     return meta
 
 
@@ -167,19 +299,20 @@ def get_trade_signal(meta: dict) -> Tuple[str, List[str]]:
     if _is_cooldown(meta):
         return "Watching", ["Cooldown active"]
 
-    price_hist = meta.get("price_hist", [])
-    ratio_hist = meta.get("ratio_hist", [])
-    vol1h_hist = meta.get("vol1h_hist", [])
+    price_hist = _as_history(meta.get("price_hist")).view()
+    ratio_hist = _as_history(meta.get("ratio_hist")).view()
+    vol1h_hist = _as_history(meta.get("vol1h_hist"))
 
+    entry_votes, exit_votes = meta.get("bar_votes") or (meta.get("entry_votes", 0), meta.get("exit_votes", 0))
     if _meets_exit_quality(snap, ratio_hist, price_hist)[0]:
         meta["entry_votes"] = 0
-        meta["exit_votes"] = meta.get("exit_votes", 0) + 1
+        meta["exit_votes"] = exit_votes + 1
         _set_cooldown(meta)
         return "Exit", _meets_exit_quality(snap, ratio_hist, price_hist)[1]
 
     entry_ok, reasons = _meets_entry_quality(snap, vol1h_hist, ratio_hist)
     if entry_ok:
-        meta["entry_votes"] = meta.get("entry_votes", 0) + 1
+        meta["entry_votes"] = entry_votes + 1
         meta["exit_votes"] = 0
         return ("Entry", reasons) if meta["entry_votes"] >= ENTRY_VOTES_NEED else ("Watching", ["1/2 entry confirmations"] + reasons)
 
@@ -188,15 +321,15 @@ def get_trade_signal(meta: dict) -> Tuple[str, List[str]]:
     return "No Signal", []
 
 
-def enrich_with_trade_signal(pair: dict) -> dict:
-    pair_id = pair.get("pairAddress")
+def enrich_with_trade_signal(pair: PairSnapshot) -> PairSnapshot:
+    pair_id = pair.pair_address
     if not pair_id:
         return pair
 
     meta_old = TRADE_META.get(pair_id, {})
     meta_new = update_histories(meta_old, pair)
     signal, reasons = get_trade_signal(meta_new)
-    pair["trade_signal"] = signal
-    pair["trade_reasons"] = reasons
+    pair.trade_signal = signal
+    pair.trade_reasons = reasons
     TRADE_META[pair_id] = meta_new
     return pair